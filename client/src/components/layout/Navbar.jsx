@@ -2,10 +2,14 @@ import { useState, useRef, useEffect } from 'react';
 import { Link, NavLink, useNavigate } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
 import { getInitials } from '../../services/constants';
+import { connectRealtime, getUnreadCount, markAllNotificationsRead } from '../../services/api';
+import { useToast } from '../../contexts/ToastContext';
 
 export default function Navbar() {
     const { user, role, logout } = useAuth();
     const [menuOpen, setMenuOpen] = useState(false);
+    const [unread, setUnread] = useState(0);
+    const showToast = useToast();
     const menuRef = useRef(null);
     const navigate = useNavigate();
 
@@ -30,6 +34,23 @@ export default function Navbar() {
         return () => document.removeEventListener('click', handleClick);
     }, []);
 
+    useEffect(() => {
+        if (!user) return;
+        getUnreadCount(user.id).then(setUnread).catch(() => {});
+        // New notifications arrive over the realtime socket instead of polling the count
+        return connectRealtime(user.id, (event) => {
+            if (event.type !== 'notification') return;
+            setUnread(n => n + 1);
+            showToast(event.notification.title, 'info');
+        });
+    }, [user, showToast]);
+
+    const clearUnread = async () => {
+        if (!unread) return;
+        setUnread(0);
+        await markAllNotificationsRead(user.id);
+    };
+
     const handleLogout = async () => {
         await logout();
         navigate('/');
@@ -49,8 +70,9 @@ export default function Navbar() {
                 ))}
             </div>
             <div className="navbar-actions">
-                <button className="btn-icon relative">
+                <button className="btn-icon relative" onClick={clearUnread} title={unread ? `${unread} unread notifications` : 'No new notifications'}>
                     <i className="fas fa-bell"></i>
+                    {unread > 0 && <span className="notification-dot"></span>}
                 </button>
                 <div className="relative" ref={menuRef}>
                     <div className="navbar-avatar" onClick={() => setMenuOpen(!menuOpen)}>{initials}</div>
@@ -2,7 +2,7 @@ import { useState, useEffect, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
 import { useToast } from '../../contexts/ToastContext';
-import { createSession, getUserSessions, sendChatMessage, addMessage, addUpload, updateSessionStatus } from '../../services/api';
+import { createSession, getUserSessions, getSession, streamChatMessage, addMessage, connectRealtime, mergeMessages, addUpload, updateSessionStatus } from '../../services/api';
 import { getInitials, formatTime, SPECIALIZATIONS, SEED_DOCTORS } from '../../services/constants';
 import Badge from '../../components/ui/Badge';
 
@@ -15,6 +15,7 @@ export default function SpecialistChat() {
     const [input, setInput] = useState('');
     const [uploads, setUploads] = useState([]);
     const [typing, setTyping] = useState(false);
+    const [streamed, setStreamed] = useState(null);
     const messagesRef = useRef(null);
     const fileRef = useRef(null);
     const imageRef = useRef(null);
@@ -31,16 +32,22 @@ export default function SpecialistChat() {
         const init = async () => {
             const sessions = await getUserSessions(user.id);
             let s = sessions.find(s => s.type === 'specialist' && s.specialization === specId && s.status === 'active');
-            if (!s) {
+            if (s) {
+                // Session lists don't carry messages — load the full conversation
+                s = await getSession(s.id);
+            } else {
                 s = await createSession(user.id, 'specialist', specId);
-                await updateSessionStatus(s.id, 'active', `doc_${specId}`);
-                const greeting = await addMessage(s.id, {
-                    sender: 'agent', senderName: `${spec.name} Specialist Assistant`,
-                    text: `Hello ${user.firstName || 'there'}! I am the ${spec.name} Assistant. I've reviewed the information from your triage phase.\n\nTo provide the most accurate assessment to the doctor, please share:\n• Current symptoms in detail\n• Previous prescriptions or medications\n• Old reports or test results (upload images/documents below)\n• Any voice notes describing your condition\n\nLet's start — how would you describe your current condition?`,
-                    type: 'text',
-                });
-                s.messages = [greeting];
-                s.assignedDoctor = `doc_${specId}`;
+                // Usually prepared in the background when triage routed, opening message included
+                if (!s.prewarmed) {
+                    await updateSessionStatus(s.id, 'active', `doc_${specId}`);
+                    const greeting = await addMessage(s.id, {
+                        sender: 'agent', senderName: `${spec.name} Specialist Assistant`,
+                        text: `Hello ${user.firstName || 'there'}! I am the ${spec.name} Assistant. I've reviewed the information from your triage phase.\n\nTo provide the most accurate assessment to the doctor, please share:\n• Current symptoms in detail\n• Previous prescriptions or medications\n• Old reports or test results (upload images/documents below)\n• Any voice notes describing your condition\n\nLet's start — how would you describe your current condition?`,
+                        type: 'text',
+                    });
+                    s.messages = [greeting];
+                    s.assignedDoctor = `doc_${specId}`;
+                }
             }
             setSession(s);
             setMessages(s.messages || []);
@@ -48,10 +55,20 @@ export default function SpecialistChat() {
         init();
     }, [user, specId]);
 
+    useEffect(() => {
+        if (!user || !session) return;
+        // Messages and status changes from elsewhere (another tab, a doctor's review) as they happen
+        return connectRealtime(user.id, (event) => {
+            if (event.sessionId !== session.id) return;
+            if (event.type === 'status') setSession(prev => ({ ...prev, status: event.status }));
+            if (event.type === 'message') setMessages(prev => mergeMessages(prev, [event.message]));
+        });
+    }, [user, session?.id]);
+
     const scrollToBottom = () => {
         if (messagesRef.current) setTimeout(() => { messagesRef.current.scrollTop = messagesRef.current.scrollHeight; }, 50);
     };
-    useEffect(scrollToBottom, [messages, typing]);
+    useEffect(scrollToBottom, [messages, typing, streamed]);
 
     const handleFileUpload = (e, type) => {
         const file = e.target.files[0];
@@ -89,21 +106,22 @@ export default function SpecialistChat() {
 
         try {
             // Send to backend — LangChain specialist agent processes and responds
-            const result = await sendChatMessage(session.id, {
+            const result = await streamChatMessage(session.id, {
                 sender: 'user', text, type: 'text', attachments,
-            });
+            }, token => setStreamed(prev => (prev || '') + token));
             // Replace optimistic data with definitive DB data
-            setMessages(prev => {
-                const filtered = prev.filter(m => m.id !== tempUserMsg.id);
-                return [...filtered, result.userMessage, result.agentMessage];
-            });
+            setMessages(prev => mergeMessages(prev.filter(m => m.id !== tempUserMsg.id), [result.userMessage, result.agentMessage]));
+            setStreamed(null);
             setTyping(false);
 
             // If report was generated
             if (result.reportGenerated) {
                 showToast('Report generated and sent for doctor review!', 'success');
+            } else if (result.reportPending) {
+                showToast('Preparing your report for doctor review...', 'info');
             }
         } catch (err) {
+            setStreamed(null);
             setTyping(false);
             setMessages(prev => [...prev, { id: Date.now(), sender: 'agent', text: 'Sorry, I encountered an error. Please try again.', timestamp: new Date().toISOString() }]);
         }
@@ -141,7 +159,13 @@ export default function SpecialistChat() {
                         </div>
                     </div>
                 ))}
-                {typing && (
+                {typing && streamed !== null && (
+                    <div className="chat-bubble agent">
+                        <div className="chat-bubble-avatar" style={{ background: spec.color }}><i className={`fas ${spec.icon}`}></i></div>
+                        <div className="chat-bubble-content">{streamed}</div>
+                    </div>
+                )}
+                {typing && streamed === null && (
                     <div className="chat-bubble agent">
                         <div className="chat-bubble-avatar" style={{ background: spec.color }}><i className={`fas ${spec.icon}`}></i></div>
                         <div className="chat-bubble-content">
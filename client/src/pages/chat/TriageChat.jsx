@@ -1,7 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
-import { createSession, getUserSessions, sendChatMessage, addMessage } from '../../services/api';
+import { createSession, getUserSessions, getSession, streamChatMessage, addMessage, connectRealtime, mergeMessages } from '../../services/api';
 import { getInitials, formatTime } from '../../services/constants';
 import Badge from '../../components/ui/Badge';
 
@@ -11,6 +11,7 @@ export default function TriageChat() {
     const [messages, setMessages] = useState([]);
     const [input, setInput] = useState('');
     const [typing, setTyping] = useState(false);
+    const [streamed, setStreamed] = useState(null);
     const messagesRef = useRef(null);
     const initialized = useRef(false);
     const navigate = useNavigate();
@@ -23,7 +24,10 @@ export default function TriageChat() {
         const init = async () => {
             const sessions = await getUserSessions(user.id);
             let s = sessions.find(s => s.type === 'triage' && s.status === 'active');
-            if (!s) {
+            if (s) {
+                // Session lists don't carry messages — load the full conversation
+                s = await getSession(s.id);
+            } else {
                 s = await createSession(user.id, 'triage');
                 // Add initial greeting via backend
                 const greeting = await addMessage(s.id, {
@@ -39,10 +43,20 @@ export default function TriageChat() {
         init();
     }, [user]);
 
+    useEffect(() => {
+        if (!user || !session) return;
+        // Messages and status changes from elsewhere (another tab, a doctor's review) as they happen
+        return connectRealtime(user.id, (event) => {
+            if (event.sessionId !== session.id) return;
+            if (event.type === 'status') setSession(prev => ({ ...prev, status: event.status }));
+            if (event.type === 'message') setMessages(prev => mergeMessages(prev, [event.message]));
+        });
+    }, [user, session?.id]);
+
     const scrollToBottom = () => {
         if (messagesRef.current) setTimeout(() => { messagesRef.current.scrollTop = messagesRef.current.scrollHeight; }, 50);
     };
-    useEffect(scrollToBottom, [messages, typing]);
+    useEffect(scrollToBottom, [messages, typing, streamed]);
 
     const sendMsg = async () => {
         if (!input.trim() || !session) return;
@@ -56,14 +70,12 @@ export default function TriageChat() {
 
         try {
             // Send to backend — LangChain agent processes and responds
-            const result = await sendChatMessage(session.id, {
+            const result = await streamChatMessage(session.id, {
                 sender: 'user', text, type: 'text',
-            });
+            }, token => setStreamed(prev => (prev || '') + token));
             // Replace optimistic data with definitive DB data
-            setMessages(prev => {
-                const filtered = prev.filter(m => m.id !== tempUserMsg.id);
-                return [...filtered, result.userMessage, result.agentMessage];
-            });
+            setMessages(prev => mergeMessages(prev.filter(m => m.id !== tempUserMsg.id), [result.userMessage, result.agentMessage]));
+            setStreamed(null);
             setTyping(false);
 
             // If agent wants to route to specialist
@@ -71,6 +83,7 @@ export default function TriageChat() {
                 setTimeout(() => navigate(`/chat/routing/${result.routeTo}`), 2000);
             }
         } catch (err) {
+            setStreamed(null);
             setTyping(false);
             setMessages(prev => [...prev, { id: Date.now(), sender: 'agent', text: 'Sorry, I encountered an error. Please try again.', timestamp: new Date().toISOString() }]);
         }
@@ -100,7 +113,13 @@ export default function TriageChat() {
                         </div>
                     </div>
                 ))}
-                {typing && (
+                {typing && streamed !== null && (
+                    <div className="chat-bubble agent">
+                        <div className="chat-bubble-avatar"><i className="fas fa-robot"></i></div>
+                        <div className="chat-bubble-content">{streamed}</div>
+                    </div>
+                )}
+                {typing && streamed === null && (
                     <div className="chat-bubble agent">
                         <div className="chat-bubble-avatar"><i className="fas fa-robot"></i></div>
                         <div className="chat-bubble-content">
@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
-import { getPendingReviews, getAllReports, getUserByIdSync } from '../../services/api';
+import { getReviewQueue, getQueueDepth, getAllReports, getReportStats, getUserByIdSync } from '../../services/api';
 import { SPECIALIZATIONS, formatRelative } from '../../services/constants';
 import Badge from '../../components/ui/Badge';
 import StatCard from '../../components/ui/StatCard';
@@ -9,15 +9,28 @@ import EmptyState from '../../components/ui/EmptyState';
 
 export default function DoctorDashboard() {
     const { user } = useAuth();
-    const [reports, setReports] = useState([]);
+    const [recentCompleted, setRecentCompleted] = useState([]);
+    const [stats, setStats] = useState({ total: 0, reviewed: 0, completedSince: 0 });
+    const [pendingReviews, setPendingReviews] = useState([]);
+    const [queueDepth, setQueueDepth] = useState(0);
     const [patients, setPatients] = useState({});
 
     useEffect(() => {
+        if (!user) return;
         const load = async () => {
-            const all = await getAllReports();
-            setReports(all);
+            const doctorId = user.doctorId || user.id;
+            const startOfDay = new Date();
+            startOfDay.setHours(0, 0, 0, 0);
+            const [recent, queue, depth, totals] = await Promise.all([
+                getAllReports(3, 'final'), getReviewQueue(doctorId, null, 5), getQueueDepth(doctorId),
+                getReportStats(doctorId, startOfDay.toISOString()),
+            ]);
+            setRecentCompleted(recent);
+            setStats(totals);
+            setPendingReviews(queue.items);
+            setQueueDepth(depth.waiting + depth.inReview + depth.expiredLeases);
             // Load patient names
-            const ids = [...new Set(all.map(r => r.userId))];
+            const ids = [...new Set([...recent, ...queue.items].map(r => r.userId))];
             const map = {};
             for (const id of ids) {
                 const p = await getUserByIdSync(id);
@@ -26,11 +39,7 @@ export default function DoctorDashboard() {
             setPatients(map);
         };
         load();
-    }, []);
-
-    const pendingReviews = reports.filter(r => r.status === 'ai_generated' || r.status === 'under_review');
-    const completedToday = reports.filter(r => r.status === 'final' && new Date(r.updatedAt).toDateString() === new Date().toDateString());
-    const totalPatients = [...new Set(reports.map(r => r.userId))].length;
+    }, [user]);
 
     return (
         <>
@@ -39,10 +48,10 @@ export default function DoctorDashboard() {
                 <p className="text-muted">Welcome back, <span className="gradient-text">{user?.firstName} {user?.lastName}</span></p>
             </div>
             <div className="stats-grid">
-                <StatCard icon="fa-clock" iconClass="amber" value={pendingReviews.length} label="Pending Reviews" />
-                <StatCard icon="fa-check-double" iconClass="teal" value={completedToday.length} label="Completed Today" />
-                <StatCard icon="fa-users" iconClass="purple" value={totalPatients} label="Total Patients" />
-                <StatCard icon="fa-file-medical" iconClass="blue" value={reports.length} label="Total Reports" />
+                <StatCard icon="fa-clock" iconClass="amber" value={queueDepth} label="Pending Reviews" />
+                <StatCard icon="fa-check-double" iconClass="teal" value={stats.completedSince} label="Completed Today" />
+                <StatCard icon="fa-user-md" iconClass="purple" value={stats.reviewed} label="Total Reviewed" />
+                <StatCard icon="fa-file-medical" iconClass="blue" value={stats.total} label="Assigned Reports" />
             </div>
             <div className="section-header">
                 <h3>Pending Reviews</h3>
@@ -51,7 +60,7 @@ export default function DoctorDashboard() {
             <div className="consultation-list">
                 {pendingReviews.length === 0 ? (
                     <EmptyState icon="fa-check-circle" title="All caught up!" message="No reports pending review." />
-                ) : pendingReviews.slice(0, 5).map(r => {
+                ) : pendingReviews.map(r => {
                     const patient = patients[r.userId];
                     const spec = SPECIALIZATIONS.find(s => s.id === r.specialization);
                     return (
@@ -73,7 +82,7 @@ export default function DoctorDashboard() {
             </div>
             <div className="section-header" style={{ marginTop: 32 }}><h3>Recent Activity</h3></div>
             <div className="consultation-list">
-                {reports.filter(r => r.status === 'final').slice(0, 3).map(r => {
+                {recentCompleted.map(r => {
                     const patient = patients[r.userId];
                     return (
                         <div key={r.id} className="consultation-card glass-card">
@@ -88,7 +97,7 @@ export default function DoctorDashboard() {
                         </div>
                     );
                 })}
-                {reports.filter(r => r.status === 'final').length === 0 && <p className="text-muted text-sm" style={{ padding: 16 }}>No completed reviews yet.</p>}
+                {recentCompleted.length === 0 && <p className="text-muted text-sm" style={{ padding: 16 }}>No completed reviews yet.</p>}
             </div>
         </>
     );
@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { getReport, getSession, getUserByIdSync, submitDoctorReview } from '../../services/api';
+import { getReport, getSession, getUserByIdSync, submitDoctorReview, claimReport, renewReportLease, releaseReport } from '../../services/api';
 import { SPECIALIZATIONS, formatDate, formatTime, getInitials } from '../../services/constants';
 import { useAuth } from '../../contexts/AuthContext';
 import { useToast } from '../../contexts/ToastContext';
@@ -17,15 +17,37 @@ export default function DoctorReview() {
     const [corrections, setCorrections] = useState('');
     const [recommendations, setRecommendations] = useState('');
     const [submitting, setSubmitting] = useState(false);
+    const [lockedBy, setLockedBy] = useState(null);
+    const lease = useRef(null);
 
     useEffect(() => {
         const load = async () => {
-            const r = await getReport(id);
+            let r = await getReport(id);
+            // Claim the report so no other doctor opens it for review at the same time
+            if (r && (r.status === 'ai_generated' || r.status === 'under_review')) {
+                const claimed = await claimReport(id, user?.doctorId || user?.id);
+                if (claimed) {
+                    r = claimed;
+                    lease.current = claimed.lease.token;
+                } else if (r.lease?.doctorId !== (user?.doctorId || user?.id)) {
+                    setLockedBy(r.lease?.doctorId || 'another doctor');
+                }
+            }
             setReport(r);
             if (r?.sessionId) setSession(await getSession(r.sessionId));
             if (r?.userId) setPatient(await getUserByIdSync(r.userId));
         };
         load();
+
+        // Keep the lease alive while the page is open; hand the report back on leave
+        const renew = setInterval(() => {
+            if (lease.current) renewReportLease(id, lease.current);
+        }, 5 * 60 * 1000);
+        return () => {
+            clearInterval(renew);
+            if (lease.current) releaseReport(id, lease.current);
+            lease.current = null;
+        };
     }, [id]);
 
     if (!report) return <div className="empty-state"><h3>Loading report...</h3></div>;
@@ -37,12 +59,18 @@ export default function DoctorReview() {
     const handleSubmit = async (e) => {
         e.preventDefault();
         setSubmitting(true);
-        await submitDoctorReview(id, {
-            notes, corrections, recommendations,
-            doctorId: user?.doctorId || user?.id,
-            doctorName: user ? `Dr. ${user.firstName} ${user.lastName}` : 'Doctor',
-        });
-        showToast('Review submitted! Patient has been notified.', 'success');
+        try {
+            await submitDoctorReview(id, {
+                notes, corrections, recommendations,
+                doctorId: user?.doctorId || user?.id,
+                doctorName: user ? `Dr. ${user.firstName} ${user.lastName}` : 'Doctor',
+                leaseToken: lease.current,
+            });
+            showToast('Review submitted! Patient has been notified.', 'success');
+        } catch (err) {
+            showToast(err.message, 'error');
+        }
+        lease.current = null;
         const updated = await getReport(id);
         setReport(updated);
         setSubmitting(false);
@@ -154,6 +182,7 @@ export default function DoctorReview() {
                     ) : (
                         <div className="glass-card">
                             <h3 style={{ marginBottom: 20 }}><i className="fas fa-pen" style={{ marginRight: 8, color: 'var(--accent)' }}></i>Your Review</h3>
+                            {lockedBy && <p className="text-sm text-muted" style={{ marginBottom: 16 }}><i className="fas fa-lock" style={{ marginRight: 6 }}></i>This report is currently being reviewed by {lockedBy}.</p>}
                             <form className="review-form" onSubmit={handleSubmit}>
                                 <div className="form-group">
                                     <label className="form-label">Notes & Observations</label>
@@ -168,7 +197,7 @@ export default function DoctorReview() {
                                     <textarea className="form-input" rows="4" placeholder="Provide recommendations..." required value={recommendations} onChange={e => setRecommendations(e.target.value)}></textarea>
                                 </div>
                                 <div className="review-actions">
-                                    <button type="submit" className="btn btn-primary" disabled={submitting}>
+                                    <button type="submit" className="btn btn-primary" disabled={submitting || !!lockedBy}>
                                         {submitting ? <><i className="fas fa-spinner fa-spin"></i> Submitting...</> : <><i className="fas fa-check"></i> Submit Review</>}
                                     </button>
                                     <button type="button" className="btn btn-secondary" onClick={() => showToast('Request sent (simulated)', 'info')}><i className="fas fa-question-circle"></i> Request More Info</button>
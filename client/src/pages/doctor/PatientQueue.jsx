@@ -1,17 +1,20 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { getAllReports, getUserByIdSync } from '../../services/api';
+import { useAuth } from '../../contexts/AuthContext';
+import { getReviewQueue, getUserByIdSync } from '../../services/api';
 import { SPECIALIZATIONS, formatDate, getInitials } from '../../services/constants';
 import Badge from '../../components/ui/Badge';
 import EmptyState from '../../components/ui/EmptyState';
 
 export default function PatientQueue() {
+    const { user } = useAuth();
     const [reports, setReports] = useState([]);
     const [patients, setPatients] = useState({});
 
     useEffect(() => {
+        if (!user) return;
         const load = async () => {
-            const r = await getAllReports();
+            const { items: r } = await getReviewQueue(user.doctorId || user.id);
             setReports(r);
             const ids = [...new Set(r.map(rep => rep.userId))];
             const map = {};
@@ -22,7 +25,7 @@ export default function PatientQueue() {
             setPatients(map);
         };
         load();
-    }, []);
+    }, [user]);
 
     if (reports.length === 0) {
         return (
@@ -71,7 +74,7 @@ export default function PatientQueue() {
                                             {spec ? spec.name : 'General'}
                                         </div>
                                     </td>
-                                    <td><Badge status={r.status} /></td>
+                                    <td><Badge status={r.status} />{r.reviewer && r.reviewer !== (user?.doctorId || user?.id) && <div className="text-xs text-muted">In review</div>}</td>
                                     <td className="text-muted">{formatDate(r.createdAt)}</td>
                                     <td className={`priority-${priority}`}>{hrs > 0 ? `${hrs}h ` : ''}{mins}m</td>
                                     <td><Link to={`/doctor/review/${r.id}`} className="btn btn-primary btn-sm">Review</Link></td>
@@ -39,7 +39,7 @@ export default function ChatHistory() {
                 const icon = spec ? spec.icon : 'fa-comment-medical';
                 const color = spec ? spec.color : 'var(--accent)';
                 const label = spec ? spec.name : (s.type === 'triage' ? 'Triage Agent' : 'Consultation');
-                const lastMsg = s.messages.length > 0 ? s.messages[s.messages.length - 1].text : 'No messages';
+                const lastMsg = s.lastMessage ? s.lastMessage.text : 'No messages';
                 return (
                     <Link to={`/patient/chat-history/${s.id}`} key={s.id} className="history-card glass-card" style={{ textDecoration: 'none', color: 'inherit' }}>
                         <div className="history-card-icon" style={{ background: `${color}20`, color }}><i className={`fas ${icon}`}></i></div>
@@ -50,7 +50,7 @@ export default function ChatHistory() {
                             </div>
                             <p className="text-sm text-muted" style={{ marginTop: 4 }}>{lastMsg.substring(0, 80)}{lastMsg.length > 80 ? '...' : ''}</p>
                             <div className="text-xs text-muted" style={{ marginTop: 6 }}>
-                                <i className="fas fa-comment" style={{ marginRight: 4 }}></i>{s.messages.length} messages ·
+                                <i className="fas fa-comment" style={{ marginRight: 4 }}></i>{s.messageCount || 0} messages ·
                                 <i className="fas fa-clock" style={{ margin: '0 4px' }}></i>{formatRelative(s.updatedAt)}
                                 {s.uploads.length > 0 && <> · <i className="fas fa-paperclip" style={{ margin: '0 4px' }}></i>{s.uploads.length} files</>}
                             </div>
@@ -61,7 +61,7 @@ export default function Dashboard() {
                                         <div className="consultation-icon"><i className={`fas ${info.icon}`}></i></div>
                                         <div className="consultation-info">
                                             <div className="consultation-title">{info.label}</div>
-                                            <div className="consultation-meta">{s.messages.length} messages · {formatRelative(s.updatedAt)}</div>
+                                            <div className="consultation-meta">{s.messageCount || 0} messages · {formatRelative(s.updatedAt)}</div>
                                         </div>
                                         <Badge status={s.status} />
                                     </Link>
@@ -53,16 +53,69 @@ export async function updateSessionStatus(sessionId, status, assignedDoctor = nu
 // ===== CHAT (LangChain Agent Endpoint) =====
 
 export async function sendChatMessage(sessionId, message) {
-    const res = await fetch(`${API_BASE}/chat/${sessionId}/send`, {
+    // One key per message: a retry after a dropped connection gets the original reply
+    const key = crypto.randomUUID();
+    const send = () => fetch(`${API_BASE}/chat/${sessionId}/send`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': key },
         body: JSON.stringify(message),
     });
+    let res;
+    try {
+        res = await send();
+    } catch {
+        res = await send();
+    }
     return await res.json();
 }
 
-export async function getChatMessages(sessionId) {
-    const res = await fetch(`${API_BASE}/chat/${sessionId}/messages`);
+export async function streamChatMessage(sessionId, message, onToken) {
+    // Same reply as sendChatMessage (the `done` event), with the agent's text passed to
+    // onToken as it is generated; a retry with the same key replays the original reply
+    const key = crypto.randomUUID();
+    const open = () => fetch(`${API_BASE}/chat/${sessionId}/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': key },
+        body: JSON.stringify(message),
+    });
+    let res;
+    try {
+        res = await open();
+    } catch {
+        res = await open();
+    }
+    if (!res.ok) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error(data.detail || `Chat stream failed (${res.status})`);
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    try {
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, end);
+                buffer = buffer.slice(end + 2);
+                const event = frame.match(/^event: (.*)$/m)?.[1];
+                const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || '{}');
+                if (event === 'token') onToken?.(data.text);
+                else if (event === 'error') throw new Error(data.detail);
+                else if (event === 'done') return data;
+            }
+        }
+    } finally {
+        reader.cancel().catch(() => {});
+    }
+    throw new Error('Chat stream ended before the reply');
+}
+
+export async function getChatMessages(sessionId, afterSeq = 0, wait = 0) {
+    // afterSeq: pass `lastSeq` from the previous poll; wait: long-poll seconds
+    const res = await fetch(`${API_BASE}/chat/${sessionId}/messages?after_seq=${afterSeq}&wait=${wait}`);
     return await res.json();
 }
 
@@ -79,13 +132,23 @@ export async function getReport(reportId) {
     return await res.json();
 }
 
-export async function getUserReports(userId) {
-    const res = await fetch(`${API_BASE}/reports?user_id=${userId}`);
-    return await res.json();
+// Report lists are paginated summaries ({ items, nextCursor }); use getReport for the full document
+
+export async function getUserReports(userId, limit = 100) {
+    const res = await fetch(`${API_BASE}/reports?user_id=${userId}&limit=${limit}`);
+    const data = await res.json();
+    return data.items;
+}
+
+export async function getAllReports(limit = 100, status = null) {
+    const res = await fetch(`${API_BASE}/reports?limit=${limit}${status ? `&status=${status}` : ''}`);
+    const data = await res.json();
+    return data.items;
 }
 
-export async function getAllReports() {
-    const res = await fetch(`${API_BASE}/reports`);
+export async function getReportStats(doctorId, completedSince) {
+    // Returns { total, reviewed, completedSince } for this doctor, counted on the server
+    const res = await fetch(`${API_BASE}/reports/stats?doctor_id=${doctorId}&completed_since=${encodeURIComponent(completedSince)}`);
     return await res.json();
 }
 
@@ -94,8 +157,37 @@ export async function getPendingReviews() {
     return await res.json();
 }
 
+export async function getReviewQueue(doctorId, cursor = null, limit = 50) {
+    // Returns { items, nextCursor } — oldest reports first
+    const res = await fetch(`${API_BASE}/reports/queue/${doctorId}?limit=${limit}${cursor ? `&cursor=${cursor}` : ''}`);
+    return await res.json();
+}
+
+export async function getQueueDepth(doctorId) {
+    const res = await fetch(`${API_BASE}/reports/queue/${doctorId}/depth`);
+    return await res.json();
+}
+
+export async function claimReport(reportId, doctorId) {
+    // Returns the report with its lease, or null if another doctor is reviewing it
+    const res = await fetch(`${API_BASE}/reports/${reportId}/claim?doctor_id=${doctorId}`, { method: 'POST' });
+    if (!res.ok) return null;
+    const data = await res.json();
+    return data.report;
+}
+
+export async function renewReportLease(reportId, token) {
+    const res = await fetch(`${API_BASE}/reports/${reportId}/lease/renew?token=${token}`, { method: 'POST' });
+    return res.ok;
+}
+
+export async function releaseReport(reportId, token) {
+    await fetch(`${API_BASE}/reports/${reportId}/lease/release?token=${token}`, { method: 'POST' });
+}
+
 export async function submitDoctorReview(reportId, review) {
-    const res = await fetch(`${API_BASE}/reports/${reportId}/review?doctor_id=${review.doctorId}&doctor_name=${encodeURIComponent(review.doctorName)}`, {
+    const lease = review.leaseToken ? `&lease_token=${review.leaseToken}` : '';
+    const res = await fetch(`${API_BASE}/reports/${reportId}/review?doctor_id=${review.doctorId}&doctor_name=${encodeURIComponent(review.doctorName)}${lease}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -104,16 +196,23 @@ export async function submitDoctorReview(reportId, review) {
             recommendations: review.recommendations,
         }),
     });
-    return await res.json();
+    const data = await res.json();
+    if (!res.ok) throw new Error(data.detail || `Review failed (${res.status})`);
+    return data;
 }
 
 // ===== NOTIFICATIONS =====
 
-export async function getUserNotifications(userId) {
-    const res = await fetch(`${API_BASE}/notifications?user_id=${userId}`);
+export async function getUserNotifications(userId, cursor = null, limit = 20) {
+    // Returns { items, nextCursor } — pass nextCursor back to load the next page
+    const res = await fetch(`${API_BASE}/notifications?user_id=${userId}&limit=${limit}${cursor ? `&cursor=${cursor}` : ''}`);
     return await res.json();
 }
 
+export async function markAllNotificationsRead(userId) {
+    await fetch(`${API_BASE}/notifications/mark-all-read?user_id=${userId}`, { method: 'PUT' });
+}
+
 export async function getUnreadCount(userId) {
     const res = await fetch(`${API_BASE}/notifications/unread-count?user_id=${userId}`);
     const data = await res.json();
@@ -124,6 +223,52 @@ export async function markNotificationRead(notifId) {
     await fetch(`${API_BASE}/notifications/${notifId}/read`, { method: 'PUT' });
 }
 
+// ===== REALTIME (WebSocket push) =====
+
+const realtime = new Map();
+
+function openRealtime(userId, channel) {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    channel.ws = new WebSocket(`${protocol}://${window.location.host}${API_BASE}/ws/${userId}`);
+    channel.ws.onmessage = (e) => {
+        const event = JSON.parse(e.data);
+        if (event.type !== 'ping') channel.listeners.forEach(listener => listener(event));
+    };
+    channel.ws.onclose = () => {
+        // Reconnect while anything is still listening
+        if (realtime.get(userId) === channel) setTimeout(() => realtime.get(userId) === channel && openRealtime(userId, channel), 3000);
+    };
+}
+
+export function connectRealtime(userId, onEvent) {
+    // Pushes notifications, new session messages and status changes; returns an unsubscribe
+    // function. Every subscriber of a user shares one socket, closed with the last of them
+    let channel = realtime.get(userId);
+    if (!channel) {
+        channel = { listeners: new Set(), ws: null };
+        realtime.set(userId, channel);
+        openRealtime(userId, channel);
+    }
+    channel.listeners.add(onEvent);
+    return () => {
+        channel.listeners.delete(onEvent);
+        if (channel.listeners.size === 0 && realtime.get(userId) === channel) {
+            realtime.delete(userId);
+            channel.ws.close();
+        }
+    };
+}
+
+// Append chat messages not shown yet — the realtime socket and the send response may both
+// deliver the same message
+export function mergeMessages(prev, incoming) {
+    const known = new Set(prev.map(m => m.id));
+    const fresh = incoming.filter(m => !known.has(m.id));
+    // A pushed copy of our own message replaces its optimistic placeholder
+    const pending = prev.filter(m => !(String(m.id).startsWith('temp_') && fresh.some(f => f.sender === m.sender && f.text === m.text)));
+    return fresh.length ? [...pending, ...fresh] : prev;
+}
+
 // ===== DOCTORS =====
 
 export async function getDoctors() {
@@ -142,6 +287,17 @@ export async function getDoctorById(docId) {
     return await res.json();
 }
 
+export async function updateDoctorStatus(docId, status) {
+    // status: 'available' | 'busy' | 'offline'
+    const res = await fetch(`${API_BASE}/doctors/${docId}/status`, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ status }),
+    });
+    if (!res.ok) return null;
+    return await res.json();
+}
+
 // ===== SPECIALIZATIONS =====
 
 export async function getSpecializations() {
@@ -0,0 +1,124 @@
+"""
+Bounded-context prompt assembly.
+Keeps the system prompt and the most recent turns verbatim within a per-agent token
+budget, and folds older turns into a rolling summary that is stored on the session
+document (`contextSummary`: {"text", "coveredSeq"}) and updated incrementally.
+"""
+from langchain_core.messages import HumanMessage, SystemMessage
+from config import settings
+from agents.llm import get_llm, ainvoke_observed
+
+# Rough per-message overhead for role/formatting tokens
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = """You maintain a running clinical summary of a patient conversation for an AI medical assistant.
+Merge the earlier summary with the new conversation turns into ONE concise summary (at most 200 words).
+Keep: symptoms, onset and duration, severity, medications, relevant history, uploaded files, and open questions.
+Drop greetings and small talk. Write plain sentences, no headings."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def message_tokens(msg: dict) -> int:
+    tokens = estimate_tokens(msg.get("text", "")) + MESSAGE_OVERHEAD
+    if msg.get("attachments"):
+        tokens += 8 * len(msg["attachments"])
+    return tokens
+
+
+def is_conversation(msg: dict) -> bool:
+    return msg.get("sender") in ("user", "agent")
+
+
+def select_context(messages: list[dict], summary: dict | None, budget: int, system_tokens: int,
+                   pinned_tokens: int = 0) -> dict:
+    """
+    Pick which conversation messages go into the prompt.
+
+    Args:
+        messages: Session history (at least every message after the summary's coveredSeq)
+        summary: The session's `contextSummary` ({"text", "coveredSeq"}) or None
+        budget: Token budget for the whole prompt
+        system_tokens: Tokens used by the system prompt
+        pinned_tokens: Tokens used by other always-included context (e.g. triage handoff)
+
+    Returns:
+        dict with 'messages' (verbatim turns to send), 'summary' (text or ""),
+        'fold' (older turns that should be merged into the summary after this turn),
+        'foldUpto' (seq the summary will cover once folded) and 'stats'.
+    """
+    conversation = [m for m in messages if is_conversation(m)]
+    summary_text = summary.get("text", "") if summary else ""
+    covered_seq = summary.get("coveredSeq", 0) if summary else 0
+    pending = [m for m in conversation if m.get("seq", 0) > covered_seq]
+
+    summary_tokens = estimate_tokens(summary_text) + MESSAGE_OVERHEAD if summary_text else 0
+    available = budget - system_tokens - pinned_tokens - summary_tokens
+    keep_recent = settings.CONTEXT_RECENT_MESSAGES
+
+    # Newest first: always keep the recent window, then whatever else fits
+    kept = []
+    used = 0
+    for i, msg in enumerate(reversed(pending)):
+        cost = message_tokens(msg)
+        if i >= keep_recent and used + cost > available:
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+
+    # Fold ahead of the hard limit so the summary catches up before anything is dropped
+    fold = []
+    pending_tokens = sum(message_tokens(m) for m in pending)
+    if pending_tokens > available * settings.CONTEXT_FOLD_RATIO and len(pending) > keep_recent:
+        fold = pending[:len(pending) - keep_recent]
+
+    # What the prompt would cost without the budget (summarized turns come from the summary's totals)
+    full_tokens = system_tokens + pinned_tokens + sum(message_tokens(m) for m in pending)
+    if summary:
+        full_tokens += summary.get("coveredTokens", 0)
+    prompt_tokens = system_tokens + pinned_tokens + summary_tokens + used
+    return {
+        "messages": kept,
+        "summary": summary_text,
+        "fold": fold,
+        "foldUpto": fold[-1].get("seq", covered_seq) if fold else covered_seq,
+        "foldTokens": sum(message_tokens(m) for m in fold),
+        "stats": {
+            "promptTokens": prompt_tokens,
+            "fullTokens": full_tokens,
+            "savedTokens": max(0, full_tokens - prompt_tokens),
+            "droppedMessages": len(pending) - len(kept),
+            "summarizedMessages": summary.get("coveredMessages", 0) if summary else 0,
+        },
+    }
+
+
+def summary_message(summary_text: str) -> SystemMessage:
+    return SystemMessage(content=f"Summary of the earlier conversation:\n{summary_text}")
+
+
+def transcript(messages: list[dict]) -> str:
+    lines = []
+    for m in messages:
+        speaker = "Patient" if m.get("sender") == "user" else "Assistant"
+        lines.append(f"{speaker}: {m.get('text', '')}")
+    return "\n".join(lines)
+
+
+async def summarize_turns(previous: str, turns: list[dict]) -> str:
+    """Fold `turns` into the previous summary. Falls back to a plain extract if the LLM fails."""
+    llm = get_llm(settings.SUMMARY_MODEL, temperature=0.0, max_output_tokens=512)
+    prompt = f"Earlier summary:\n{previous or '(none)'}\n\nNew conversation turns:\n{transcript(turns)}"
+    try:
+        response = await ainvoke_observed("summarizer", llm, [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=prompt)])
+        text = response.content.strip() if isinstance(response.content, str) else ""
+        if text:
+            return text
+    except Exception as e:
+        print(f"⚠️ Context summary failed, using extract: {e}")
+    patient_lines = [f"Patient said: {m.get('text', '')[:200]}" for m in turns if m.get("sender") == "user"]
+    return "\n".join(filter(None, [previous, *patient_lines]))
@@ -0,0 +1,152 @@
+"""
+Triage → specialist handoff summary.
+
+Built once, on the triage turn that routes the patient (routes.chat.finish_turn), and stored
+on the triage session as `handoff`. A new specialist session reads it with one indexed,
+projected lookup and pins the rendered text as its hidden context message, instead of
+re-reading the whole triage chat and pasting the transcript into every specialist prompt.
+
+Rule-based, from what the patient said (plus the triage rolling summary), so routing costs
+no extra LLM call:
+- chiefComplaint: the patient's first message, trimmed (kept on the summary once folded away)
+- symptoms: known symptom terms the patient mentioned
+- durations: onset / duration phrases ("for two weeks", "since yesterday", "a week ago")
+- severity: "7/10", "7 out of 10", or mild / moderate / severe
+- redFlags: findings that warrant urgent attention, unless negated ("no chest pain")
+"""
+import re
+from datetime import datetime
+from bson import ObjectId
+
+MAX_COMPLAINT_CHARS = 200
+MAX_ITEMS = 8
+
+SYMPTOM_TERMS = [
+    "chest pain", "chest tightness", "chest feels tight", "palpitations", "racing heart", "high blood pressure",
+    "shortness of breath", "short of breath", "breathless", "wheezing", "wheeze", "cough", "coughing",
+    "phlegm", "sore throat", "fever", "chills", "night sweats", "fatigue", "tired", "weakness",
+    "headache", "migraine", "migraines", "dizziness", "dizzy", "lightheaded", "fainting", "blurred vision",
+    "numbness", "tingling", "confusion", "memory problems", "seizure", "tremor", "insomnia",
+    "rash", "itching", "itchy", "hives", "acne", "eczema", "mole", "swelling", "bruising", "hair loss",
+    "back pain", "neck pain", "joint pain", "knee pain", "stiffness", "muscle pain", "cramps",
+    "nausea", "vomiting", "diarrhea", "constipation", "stomach pain", "abdominal pain", "bloating",
+    "loss of appetite", "weight loss", "weight gain", "anxiety", "low mood", "pain",
+]
+
+# Variants reported under one name
+SYMPTOM_ALIASES = {
+    "chest feels tight": "chest tightness", "short of breath": "shortness of breath",
+    "breathless": "shortness of breath", "wheeze": "wheezing", "coughing": "cough", "tired": "fatigue",
+    "migraines": "migraine", "dizzy": "dizziness", "lightheaded": "dizziness", "itchy": "itching",
+}
+
+RED_FLAG_TERMS = [
+    "chest pain", "crushing", "radiating to my arm", "radiates to my arm", "pain in my jaw",
+    "can't breathe", "cannot breathe", "struggling to breathe", "shortness of breath at rest",
+    "coughing blood", "coughing up blood", "blood in", "vomiting blood", "black stool",
+    "fainted", "fainting", "passed out", "loss of consciousness", "seizure",
+    "worst headache", "sudden headache", "thunderclap", "stiff neck", "slurred speech",
+    "face drooping", "weakness on one side", "numbness on one side", "sudden vision loss", "confusion",
+    "high fever", "suicidal", "self-harm", "severe bleeding", "can't move", "unable to walk",
+]
+
+NUMBER = r"(?:\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|a few|few|a couple of|couple of|several)"
+UNIT = r"(?:minutes?|hours?|days?|nights?|weeks?|months?|years?)"
+DURATION_RE = re.compile(
+    rf"\b(?:(?:for|over|about|around|almost|nearly|past|last|the past|the last)\s+)*{NUMBER}\s+{UNIT}(?:\s+(?:ago|now))?\b"
+    r"|\bsince\s+(?:yesterday|last\s+\w+|this\s+\w+|\w+day|childhood|\d{4})\b"
+    r"|\b(?:yesterday|this morning|last night|today|on and off|every (?:day|night|morning|evening))\b",
+    re.IGNORECASE,
+)
+SEVERITY_RE = re.compile(r"\b(\d{1,2})\s*(?:/|out of)\s*10\b|\b(mild|moderate|severe|unbearable)\b", re.IGNORECASE)
+NEGATION_RE = re.compile(r"\b(?:no|not|never|without|denies|don't have|haven't had|none)\b[^.,;!?]*$", re.IGNORECASE)
+
+
+def _terms_pattern(terms: list[str]) -> re.Pattern:
+    # Longest first, so "chest pain" wins over "pain"
+    alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+
+SYMPTOM_RE = _terms_pattern(SYMPTOM_TERMS)
+RED_FLAG_RE = _terms_pattern(RED_FLAG_TERMS)
+
+
+def _negated(text: str, start: int) -> bool:
+    """Whether the match at `start` sits in a negated clause ("I have no chest pain")."""
+    return bool(NEGATION_RE.search(text[max(0, start - 40):start]))
+
+
+def _collect(pattern: re.Pattern, texts: list[str], skip_negated: bool = True, aliases: dict = None) -> list[str]:
+    found = []
+    for text in texts:
+        for match in pattern.finditer(text):
+            term = match.group(0).lower()
+            term = (aliases or {}).get(term, term)
+            if term in found or (skip_negated and _negated(text, match.start())):
+                continue
+            found.append(term)
+    return found[:MAX_ITEMS]
+
+
+def build_handoff(messages: list[dict], route_to: str, summary: dict = None, user_messages: int = None) -> dict:
+    """
+    Compact structured summary of a triage conversation (patient messages + rolling summary).
+    `user_messages` is the session's patient message count, when `messages` starts after the summary.
+    """
+    patient = [m.get("text", "") for m in messages if m.get("sender") == "user" and m.get("text")]
+    texts = ([summary["text"]] if summary and summary.get("text") else []) + patient
+
+    symptoms = _collect(SYMPTOM_RE, texts, aliases=SYMPTOM_ALIASES)
+    # Drop bare "pain" when a more specific pain was named
+    if "pain" in symptoms and any(s.endswith(" pain") for s in symptoms):
+        symptoms.remove("pain")
+
+    severity = None
+    for text in reversed(patient):
+        match = SEVERITY_RE.search(text)
+        if match:
+            severity = f"{match.group(1)}/10" if match.group(1) else match.group(2).lower()
+            break
+
+    complaint = (summary or {}).get("firstPatientMessage") or (patient[0] if patient else "")
+    if len(complaint) > MAX_COMPLAINT_CHARS:
+        complaint = complaint[:MAX_COMPLAINT_CHARS].rsplit(" ", 1)[0] + "…"
+
+    return {
+        "routeTo": route_to,
+        "chiefComplaint": complaint,
+        "symptoms": symptoms,
+        "durations": _collect(DURATION_RE, texts, skip_negated=False),
+        "severity": severity,
+        "redFlags": _collect(RED_FLAG_RE, texts),
+        "patientMessages": max(user_messages or 0, len(patient)),
+        "createdAt": datetime.utcnow().isoformat(),
+    }
+
+
+def render_handoff(handoff: dict, specialty: str = None) -> str:
+    """The handoff as the short text block pinned into specialist prompts."""
+    lines = [f"--- TRIAGE HANDOFF{f' ({specialty})' if specialty else ''} ---"]
+    if handoff.get("chiefComplaint"):
+        lines.append(f"Chief complaint: {handoff['chiefComplaint']}")
+    lines.append(f"Symptoms: {', '.join(handoff.get('symptoms') or []) or 'not specified'}")
+    lines.append(f"Duration: {'; '.join(handoff.get('durations') or []) or 'not specified'}")
+    if handoff.get("severity"):
+        lines.append(f"Severity: {handoff['severity']}")
+    lines.append(f"Red flags: {', '.join(handoff.get('redFlags') or []) or 'none mentioned'}")
+    return "\n".join(lines)
+
+
+def handoff_message(handoff: dict, specialty: str = None) -> dict:
+    """The hidden first message of a specialist session (the frontend never shows it)."""
+    return {
+        "id": str(ObjectId()),
+        "sender": "system",
+        "senderName": "System",
+        "text": render_handoff(handoff, specialty),
+        "handoff": handoff,
+        "type": "hidden",
+        "timestamp": datetime.utcnow().isoformat(),
+        "seq": 1,
+    }
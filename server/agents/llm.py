@@ -0,0 +1,129 @@
+"""
+Process-wide LLM client registry.
+Chat clients are created once per (model, temperature, max_output_tokens) and shared by
+every chat turn, so the underlying HTTP/gRPC channel and its connection pool are reused
+instead of being set up on each request.
+"""
+import inspect
+import time
+from config import settings
+from services.metrics import observe_llm, observe_llm_error, usage_tokens
+from services.llm_scheduler import llm_slot
+
+
+def create_gemini_client(model: str, temperature: float, max_output_tokens: int):
+    """Default factory — a LangChain Gemini chat model."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=settings.GEMINI_API_KEY,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+    )
+
+
+async def close_client(llm):
+    """Best-effort close of the transport(s) held by a chat model."""
+    for obj in (getattr(llm, "client", None), getattr(getattr(llm, "client", None), "aio", None), llm):
+        if obj is None:
+            continue
+        closer = getattr(obj, "aclose", None) or getattr(obj, "close", None)
+        if closer is None:
+            continue
+        try:
+            result = closer()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            pass
+
+
+class LLMRegistry:
+    """Holds long-lived chat clients keyed by model and generation parameters."""
+
+    def __init__(self, factory=None):
+        self.factory = factory or create_gemini_client
+        self._clients = {}
+        self.created = 0
+        self.reused = 0
+
+    def get(self, model: str, temperature: float, max_output_tokens: int):
+        key = (model, temperature, max_output_tokens)
+        client = self._clients.get(key)
+        if client is None:
+            client = self.factory(model=model, temperature=temperature, max_output_tokens=max_output_tokens)
+            self._clients[key] = client
+            self.created += 1
+        else:
+            self.reused += 1
+        return client
+
+    def stats(self) -> dict:
+        return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+    async def close(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await close_client(client)
+
+
+registry: LLMRegistry = None
+
+
+def init_llm_registry(factory=None) -> LLMRegistry:
+    global registry
+    registry = LLMRegistry(factory)
+    return registry
+
+
+async def close_llm_registry():
+    global registry
+    if registry:
+        await registry.close()
+        registry = None
+        print("🔌 LLM clients closed")
+
+
+def get_llm(model: str, temperature: float, max_output_tokens: int):
+    """Return the shared client for these parameters (creating the registry if needed)."""
+    if registry is None:
+        init_llm_registry()
+    return registry.get(model, temperature, max_output_tokens)
+
+
+async def ainvoke_observed(agent: str, llm, messages: list):
+    """llm.ainvoke(messages) on a scheduler slot, recording latency and token usage for /metrics."""
+    model = getattr(llm, "model", None)
+    async with llm_slot(model):
+        started = time.perf_counter()
+        try:
+            response = await llm.ainvoke(messages)
+        except Exception:
+            observe_llm_error(agent, model)
+            raise
+    observe_llm(agent, model, time.perf_counter() - started, *usage_tokens(response))
+    return response
+
+
+async def astream_observed(agent: str, llm, messages: list):
+    """llm.astream(messages) on a scheduler slot (held until the last chunk), recording latency and usage."""
+    model = getattr(llm, "model", None)
+    input_tokens = output_tokens = 0
+    async with llm_slot(model):
+        started = time.perf_counter()
+        try:
+            async for chunk in llm.astream(messages):
+                chunk_in, chunk_out = usage_tokens(chunk)
+                input_tokens += chunk_in
+                output_tokens += chunk_out
+                yield chunk
+        except Exception:
+            observe_llm_error(agent, model)
+            raise
+    observe_llm(agent, model, time.perf_counter() - started, input_tokens, output_tokens)
+
+
+def registry_stats() -> dict:
+    return registry.stats() if registry else {"clients": 0, "created": 0, "reused": 0}
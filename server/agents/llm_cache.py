@@ -0,0 +1,223 @@
+"""
+Response cache for agent LLM calls.
+
+Keyed by a SHA-256 fingerprint of the model, generation parameters, system prompt and the
+normalised message history. Two tiers: a per-process LRU in front of the `llm_cache`
+collection (TTL index on `expireAt`), so warm entries survive restarts and are shared
+between workers.
+
+Caching is opt-in per agent (LLM_CACHE_AGENTS, empty by default) and only applies to turns
+that are not patient-specific: a short history (LLM_CACHE_MAX_USER_TURNS), no rolling summary and no
+pinned context. The patient's first name is swapped for a placeholder in both the key and
+the stored reply, so "Hi Sam" and "Hi Alex" share an entry.
+
+The trade-off: at a non-zero temperature a hit replays one sampled reply to every patient with
+the same opening, instead of a fresh one. Set LLM_CACHE_DETERMINISTIC_ONLY to cache only
+temperature-0 calls, where that costs nothing.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from config import settings
+from agents.streaming import chunk_text
+from agents.llm import ainvoke_observed, astream_observed
+
+NAME_PLACEHOLDER = "{{patient}}"
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def fingerprint(model: str, temperature, max_output_tokens, lc_messages: list) -> str:
+    payload = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "max_output_tokens": max_output_tokens,
+        "messages": [[m.type, normalize(m.content if isinstance(m.content, str) else str(m.content))]
+                     for m in lc_messages],
+    }, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def name_pattern(patient_name: str):
+    if not patient_name or patient_name == "there":
+        return None
+    return re.compile(rf"\b{re.escape(patient_name)}\b")
+
+
+class LLMCache:
+    def __init__(self, get_db=None, max_entries: int = 1024, ttl_seconds: int = 86400):
+        self.get_db = get_db
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._pending = set()
+        self.counters = {"memoryHits": 0, "mongoHits": 0, "misses": 0, "stores": 0, "skipped": 0}
+        self.miss_ms = 0.0
+        self.hit_ms = 0.0
+
+    async def get(self, key: str):
+        entry = self._memory.get(key)
+        if entry:
+            text, expires = entry
+            if expires > time.monotonic():
+                self._memory.move_to_end(key)
+                self.counters["memoryHits"] += 1
+                return text
+            del self._memory[key]
+
+        if self.get_db:
+            doc = await self.get_db().llm_cache.find_one(
+                {"_id": key, "expireAt": {"$gt": datetime.utcnow()}}, {"text": 1}
+            )
+            if doc:
+                self._remember(key, doc["text"])
+                self.counters["mongoHits"] += 1
+                return doc["text"]
+
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, text: str, agent: str, model: str):
+        """Store in memory now and write through to Mongo in the background."""
+        self._remember(key, text)
+        self.counters["stores"] += 1
+        if self.get_db:
+            task = asyncio.create_task(self._persist(key, text, agent, model))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _remember(self, key: str, text: str):
+        self._memory[key] = (text, time.monotonic() + self.ttl_seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _persist(self, key: str, text: str, agent: str, model: str):
+        now = datetime.utcnow()
+        try:
+            await self.get_db().llm_cache.update_one(
+                {"_id": key},
+                {"$set": {"text": text, "agent": agent, "model": model, "createdAt": now,
+                          "expireAt": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+
+    def record(self, hit: bool, elapsed_ms: float):
+        # Running means of both paths; their difference is the latency a hit saves
+        if hit:
+            hits = self.counters["memoryHits"] + self.counters["mongoHits"]
+            self.hit_ms += (elapsed_ms - self.hit_ms) / max(hits, 1)
+        else:
+            self.miss_ms += (elapsed_ms - self.miss_ms) / max(self.counters["misses"], 1)
+
+    def stats(self) -> dict:
+        hits = self.counters["memoryHits"] + self.counters["mongoHits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._memory),
+            "hitRate": round(hits / lookups, 3) if lookups else 0.0,
+            "avgHitMs": round(self.hit_ms, 1),
+            "avgMissMs": round(self.miss_ms, 1),
+            "estimatedSavedMs": round(hits * max(self.miss_ms - self.hit_ms, 0.0)),
+        }
+
+
+cache: LLMCache = None
+
+
+def init_llm_cache(get_db=None) -> LLMCache:
+    global cache
+    cache = LLMCache(get_db, settings.LLM_CACHE_MEMORY_ENTRIES, settings.LLM_CACHE_TTL_SECONDS)
+    return cache
+
+
+def llm_cache_stats() -> dict:
+    return cache.stats() if cache else {}
+
+
+def cache_enabled(agent: str) -> bool:
+    agents = {a.strip() for a in settings.LLM_CACHE_AGENTS.split(",") if a.strip()}
+    return cache is not None and agent in agents
+
+
+class CachedTurn:
+    """
+    One agent turn's view of the cache: `lookup()` before calling the LLM, `store()` after.
+    Does nothing when the agent has not opted in or the turn is patient-specific.
+    """
+
+    def __init__(self, agent: str, llm, lc_messages: list, messages: list[dict],
+                 patient_name: str = None, personal: bool = False):
+        self.agent = agent
+        self.key = None
+        self.started = time.perf_counter()
+        self.model = getattr(llm, "model", None)
+        self.name_re = name_pattern(patient_name)
+        self.patient_name = patient_name
+        if not cache_enabled(agent):
+            return
+        temperature = getattr(llm, "temperature", None)
+        user_turns = sum(1 for m in messages if m.get("sender") == "user")
+        if personal or user_turns > settings.LLM_CACHE_MAX_USER_TURNS \
+                or (settings.LLM_CACHE_DETERMINISTIC_ONLY and temperature):
+            cache.counters["skipped"] += 1
+            return
+        keyed = [self._anonymize_message(m) for m in lc_messages]
+        self.key = fingerprint(self.model, temperature, getattr(llm, "max_output_tokens", None), keyed)
+
+    def _anonymize(self, text: str) -> str:
+        return self.name_re.sub(NAME_PLACEHOLDER, text) if self.name_re else text
+
+    def _anonymize_message(self, message):
+        if self.name_re and isinstance(message.content, str):
+            return message.model_copy(update={"content": self._anonymize(message.content)})
+        return message
+
+    async def lookup(self):
+        """Cached reply text for this turn, personalised again, or None."""
+        if not self.key:
+            return None
+        text = await cache.get(self.key)
+        if text is None:
+            return None
+        cache.record(True, (time.perf_counter() - self.started) * 1000)
+        return text.replace(NAME_PLACEHOLDER, self.patient_name or "there")
+
+    def store(self, text: str):
+        if not self.key or not text:
+            return
+        cache.record(False, (time.perf_counter() - self.started) * 1000)
+        cache.put(self.key, self._anonymize(text), self.agent, self.model)
+
+
+async def cached_ainvoke(turn: CachedTurn, llm, lc_messages: list) -> str:
+    """llm.ainvoke(...).content, answered from the cache when possible."""
+    text = await turn.lookup()
+    if text is None:
+        response = await ainvoke_observed(turn.agent, llm, lc_messages)
+        text = response.content
+        turn.store(text)
+    return text
+
+
+async def cached_astream(turn: CachedTurn, llm, lc_messages: list):
+    """Yield reply text chunks; a cache hit arrives as a single chunk."""
+    text = await turn.lookup()
+    if text is not None:
+        yield text
+        return
+    raw = ""
+    async for chunk in astream_observed(turn.agent, llm, lc_messages):
+        piece = chunk_text(chunk)
+        raw += piece
+        yield piece
+    turn.store(raw)
@@ -3,10 +3,15 @@ LangChain Specialist Agent — Gemini Pro (with thinking)
 Collects detailed medical data and generates comprehensive reports.
 Each specialist has domain-specific prompts and is linked to an assigned doctor.
 """
-from langchain_google_genai import ChatGoogleGenerativeAI
+import json
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from config import settings
-from database.seed import get_specialization, SEED_DOCTORS
+from agents.llm import get_llm, ainvoke_observed
+from database.seed import get_specialization
+from services.catalog import catalog
+from agents.streaming import MarkerFilter
+from agents.llm_cache import CachedTurn, cached_ainvoke, cached_astream
+from agents.context import select_context, estimate_tokens, summary_message
 
 
 SPECIALIST_SYSTEM_PROMPTS = {
@@ -62,48 +67,73 @@ Keep responses caring but clinical. Use markdown for clarity."""
 
 
 def get_specialist_llm():
-    return ChatGoogleGenerativeAI(
-        model=settings.SPECIALIST_MODEL,
-        google_api_key=settings.GEMINI_API_KEY,
-        temperature=0.4,
-        max_output_tokens=2048,
-    )
+    return get_llm(settings.SPECIALIST_MODEL, temperature=0.4, max_output_tokens=2048)
 
 
 def get_doctor_for_spec(spec_id: str) -> dict:
-    for doc in SEED_DOCTORS:
-        if doc["specialization"] == spec_id:
-            return doc
-    return SEED_DOCTORS[-1]
+    return catalog.doctor_for_specialization(spec_id)
+
+
+REPORT_NOTICE = "\n\n📋 **Report Generated**\n\nYour report has been created and sent to **{doctor_name}** for professional review. You'll receive a notification when the doctor has reviewed it."
+
+REPORT_PENDING_NOTICE = "\n\n📋 **Preparing Your Report**\n\nI'm putting together your report now. It will be sent to **{doctor_name}** for professional review, and you'll receive a notification when the doctor has reviewed it."
 
+# Added on turns where the report is due so reply + report arrive in one call
+REPORT_DUE_PROMPT = """You now have enough information. In THIS reply:
+1. Briefly thank the patient and tell them their report is being prepared (no questions).
+2. Then output the marker GENERATE_REPORT: followed by ONE JSON object and nothing else:
+{"summary": "1-2 sentence summary", "findings": ["...", "..."], "suggestions": ["...", "..."]}
+Use 3-4 findings and 3-4 suggestions."""
 
-async def get_specialist_response(spec_id: str, messages: list[dict], patient_name: str = "there") -> dict:
+REPORT_DUE_AFTER_USER_MESSAGES = 3
+
+
+def report_due(messages: list[dict], report_id: str = None, user_messages: int = None) -> bool:
     """
-    Process a specialist conversation and return the agent's response.
-    
-    Args:
-        spec_id: Specialization ID
-        messages: Full conversation history from the session
-        patient_name: Patient's first name
-    
-    Returns:
-        dict with 'text' (response) and optionally 'report' (AI-generated report data)
+    Whether this turn should produce the report — once per session, like the report.generate job.
+    `user_messages` is the session's patient message count (`messages` starts after the summary).
+    """
+    if report_id is not None:
+        return False
+    if user_messages is None:
+        user_messages = sum(1 for m in messages if m.get("sender") == "user")
+    return user_messages >= REPORT_DUE_AFTER_USER_MESSAGES
+
+
+def build_specialist_messages(spec_id: str, messages: list[dict], summary: dict = None,
+                              report_id: str = None, user_messages: int = None) -> tuple[list, dict]:
+    """
+    Build the LangChain message list for a specialist, bounded by the specialist token budget.
+    `report_id` is the session's report, if it has one (no further report is asked for);
+    `user_messages` is as for report_due.
     """
-    llm = get_specialist_llm()
-    
     domain_prompt = SPECIALIST_SYSTEM_PROMPTS.get(spec_id, SPECIALIST_SYSTEM_PROMPTS["general"])
     doctor = get_doctor_for_spec(spec_id)
-    spec = get_specialization(spec_id)
     
     system_prompt = BASE_SPECIALIST_PROMPT.format(
         domain_prompt=domain_prompt,
         doctor_name=doctor["name"]
     )
     
+    # Hidden triage handoff is pinned, but capped so it can't crowd out the conversation
+    handoff = "\n".join(m.get("text", "") for m in messages if m.get("type") == "hidden")
+    max_handoff_chars = settings.SPECIALIST_CONTEXT_TOKENS // 3 * 4
+    if len(handoff) > max_handoff_chars:
+        handoff = handoff[-max_handoff_chars:]
+    
+    context = select_context(
+        messages, summary, settings.SPECIALIST_CONTEXT_TOKENS,
+        estimate_tokens(system_prompt), estimate_tokens(handoff),
+    )
+    
     # Build LangChain message list from session history
     lc_messages = [SystemMessage(content=system_prompt)]
+    if handoff:
+        lc_messages.append(SystemMessage(content=f"Context from the triage assessment:\n{handoff}"))
+    if context["summary"]:
+        lc_messages.append(summary_message(context["summary"]))
     
-    for msg in messages:
+    for msg in context["messages"]:
         if msg.get("sender") == "user":
             content = msg["text"]
             # Include info about attachments
@@ -113,36 +143,138 @@ async def get_specialist_response(spec_id: str, messages: list[dict], patient_na
             lc_messages.append(HumanMessage(content=content))
         elif msg.get("sender") == "agent":
             lc_messages.append(AIMessage(content=msg["text"]))
-    
-    # Get response from Gemini Pro with thinking
-    response = await llm.ainvoke(lc_messages)
-    response_text = response.content
+    if report_due(messages, report_id, user_messages):
+        lc_messages.append(SystemMessage(content=REPORT_DUE_PROMPT))
+    return lc_messages, context
+
+
+def specialist_cache_turn(llm, lc_messages: list, messages: list[dict], patient_name: str, context: dict) -> CachedTurn:
+    """Cache view for a specialist turn; a triage handoff or summary makes it patient-specific."""
+    personal = bool(context["summary"]) or any(m.get("type") == "hidden" for m in messages)
+    return CachedTurn("specialist", llm, lc_messages, messages, patient_name, personal=personal)
+
+
+def finalize_specialist_response(response_text: str, spec_id: str, messages: list[dict], patient_name: str,
+                                 report_id: str = None, user_messages: int = None) -> dict:
+    """
+    Split a completed reply into patient text and report.
+    When the report is due but the model left it out, the reply goes out as-is with
+    `report_pending` set; the caller generates the report in the background.
+    A report block in a session that already has its report is dropped.
+    """
+    doctor = get_doctor_for_spec(spec_id)
     
     # Check if agent generated a report
     report = None
-    if "GENERATE_REPORT:" in response_text:
+    report_pending = False
+    if "GENERATE_REPORT:" in response_text and report_id is not None:
+        response_text = response_text.split("GENERATE_REPORT:")[0].strip()
+    elif "GENERATE_REPORT:" in response_text:
         parts = response_text.split("GENERATE_REPORT:")
         response_text = parts[0].strip()
         report_text = parts[1].strip()
         
-        # Parse the report
-        report = parse_report(report_text, spec_id, patient_name)
+        # Parse the report (JSON, or the older line format)
+        report = parse_report_block(report_text, spec_id, patient_name)
         
         # Add a nice message about report generation
         if not response_text:
             response_text = f"Thank you for providing all this information, {patient_name}. I've generated a comprehensive report based on our consultation."
         
-        response_text += f"\n\n📋 **Report Generated**\n\nYour report has been created and sent to **{doctor['name']}** for professional review. You'll receive a notification when the doctor has reviewed it."
-    else:
-        # Auto-generate report after enough messages
-        user_msgs = [m for m in messages if m.get("sender") == "user"]
-        if len(user_msgs) >= 3 and not report:
-            # Force report generation on next response by asking the LLM
-            report = await force_generate_report(llm, lc_messages, spec_id, patient_name, doctor)
-            if report:
-                response_text += f"\n\n📋 **Report Generated**\n\nYour report has been created and sent to **{doctor['name']}** for professional review. You'll receive a notification when the doctor has reviewed it."
+        response_text += REPORT_NOTICE.format(doctor_name=doctor["name"])
+    elif report_due(messages, report_id, user_messages):
+        report_pending = True
+        response_text += REPORT_PENDING_NOTICE.format(doctor_name=doctor["name"])
+    
+    return {"text": response_text, "report": report, "report_pending": report_pending}
+
+
+async def get_specialist_response(spec_id: str, messages: list[dict], patient_name: str = "there",
+                                  summary: dict = None, report_id: str = None, user_messages: int = None) -> dict:
+    """
+    Process a specialist conversation and return the agent's response.
+    
+    Args:
+        spec_id: Specialization ID
+        messages: Full conversation history from the session
+        patient_name: Patient's first name
+        summary: The session's rolling context summary, if any
+        report_id: The session's report, once it has one
+        user_messages: Patient messages in the whole session, summarized ones included
+    
+    Returns:
+        dict with 'text' (response), optionally 'report' (AI-generated report data),
+        and 'context' (prompt selection and token savings, see agents.context)
+    """
+    llm = get_specialist_llm()
+    lc_messages, context = build_specialist_messages(spec_id, messages, summary, report_id, user_messages)
+    turn = specialist_cache_turn(llm, lc_messages, messages, patient_name, context)
+    
+    # Get response from Gemini Pro with thinking (or the response cache)
+    response_text = await cached_ainvoke(turn, llm, lc_messages)
+    result = finalize_specialist_response(response_text, spec_id, messages, patient_name, report_id, user_messages)
+    return {**result, "context": context}
+
+
+async def stream_specialist_response(spec_id: str, messages: list[dict], patient_name: str = "there",
+                                     summary: dict = None, report_id: str = None, user_messages: int = None):
+    """
+    Stream a specialist reply token by token.
+    
+    Yields:
+        {"type": "token", "text": ...} for each visible piece of text, then a single
+        {"type": "result", ...} with the same fields as get_specialist_response.
+        The report block after GENERATE_REPORT: is never streamed; the "Report Generated"
+        (or "Preparing Your Report") notice is streamed as a final token.
+    """
+    llm = get_specialist_llm()
+    lc_messages, context = build_specialist_messages(spec_id, messages, summary, report_id, user_messages)
+    turn = specialist_cache_turn(llm, lc_messages, messages, patient_name, context)
+    marker_filter = MarkerFilter(["GENERATE_REPORT:"])
+    streamed = ""
     
-    return {"text": response_text, "report": report}
+    async for text in cached_astream(turn, llm, lc_messages):
+        visible = marker_filter.feed(text)
+        if visible:
+            streamed += visible
+            yield {"type": "token", "text": visible}
+    tail = marker_filter.flush()
+    if tail:
+        streamed += tail
+        yield {"type": "token", "text": tail}
+    
+    result = finalize_specialist_response(marker_filter.raw, spec_id, messages, patient_name, report_id,
+                                          user_messages)
+    # Stream whatever finalization added (fallback intro, report notice)
+    if result["text"].startswith(streamed.strip()) and len(result["text"]) > len(streamed.strip()):
+        yield {"type": "token", "text": result["text"][len(streamed.strip()):]}
+    
+    yield {"type": "result", **result, "context": context}
+
+
+GREETING_PROMPT = """The patient {patient_name} has just been referred to you from triage and is opening the chat now.
+Write your opening message (under 90 words): greet them by name, say in one sentence what you understood
+from the triage assessment, ask ONE focused question from your specialty, and mention they can upload
+old reports, images or voice notes. Do not generate a report."""
+
+
+async def generate_specialist_greeting(spec_id: str, messages: list[dict], patient_name: str = "there") -> str:
+    """Opening message of a specialist chat, written from its pinned triage handoff."""
+    llm = get_specialist_llm()
+    lc_messages, _ = build_specialist_messages(spec_id, messages)
+    lc_messages.append(HumanMessage(content=GREETING_PROMPT.format(patient_name=patient_name)))
+    response = await ainvoke_observed("greeting", llm, lc_messages)
+    return response.content.strip()
+
+
+async def generate_specialist_report(spec_id: str, messages: list[dict], patient_name: str = "there",
+                                     summary: dict = None) -> dict:
+    """Produce the report on its own — the fallback when a report-due reply came without one."""
+    llm = get_specialist_llm()
+    lc_messages, _ = build_specialist_messages(spec_id, messages, summary)
+    if lc_messages and lc_messages[-1].content == REPORT_DUE_PROMPT:
+        lc_messages = lc_messages[:-1]
+    return await force_generate_report(llm, lc_messages, spec_id, patient_name, get_doctor_for_spec(spec_id))
 
 
 async def force_generate_report(llm, messages, spec_id, patient_name, doctor) -> dict:
@@ -161,10 +293,27 @@ SUGGESTIONS:
 - [Suggestion 3]"""
     
     messages_copy = messages + [HumanMessage(content=report_prompt)]
-    response = await llm.ainvoke(messages_copy)
+    response = await ainvoke_observed("report", llm, messages_copy)
     return parse_report(response.content, spec_id, patient_name)
 
 
+def parse_report_block(report_text: str, spec_id: str, patient_name: str) -> dict:
+    """Parse the text after GENERATE_REPORT: — a JSON object, falling back to the line format."""
+    start, end = report_text.find("{"), report_text.rfind("}")
+    if start >= 0 and end > start:
+        try:
+            data = json.loads(report_text[start:end + 1])
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get("summary"):
+            lines = [f"SUMMARY: {data['summary']}", "FINDINGS:"]
+            lines += [f"- {item}" for item in data.get("findings") or [] if isinstance(item, str)]
+            lines.append("SUGGESTIONS:")
+            lines += [f"- {item}" for item in data.get("suggestions") or [] if isinstance(item, str)]
+            report_text = "\n".join(lines)
+    return parse_report(report_text, spec_id, patient_name)
+
+
 def parse_report(report_text: str, spec_id: str, patient_name: str) -> dict:
     """Parse report text into structured data."""
     summary = ""
@@ -0,0 +1,61 @@
+"""
+Streaming helpers shared by the triage and specialist agents.
+Keeps control markers (ROUTE_TO_SPECIALIST:, GENERATE_REPORT:) out of the text
+that is pushed to the patient while tokens arrive.
+"""
+
+
+class MarkerFilter:
+    """Pass streamed text through, holding back anything that could start a hidden marker."""
+
+    def __init__(self, markers: list[str]):
+        self.markers = markers
+        self.raw = ""
+        self.hidden = False
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk from the LLM and return the text that is safe to show."""
+        self.raw += chunk
+        if self.hidden:
+            return ""
+        self._pending += chunk
+
+        # Everything from the first marker onwards is for the system only
+        for marker in self.markers:
+            idx = self._pending.find(marker)
+            if idx >= 0:
+                visible = self._pending[:idx]
+                self._pending = ""
+                self.hidden = True
+                return visible
+
+        # Hold back a suffix that may be the start of a marker split across chunks
+        hold = 0
+        for marker in self.markers:
+            for size in range(min(len(marker) - 1, len(self._pending)), 0, -1):
+                if self._pending.endswith(marker[:size]):
+                    hold = max(hold, size)
+                    break
+        visible = self._pending[:len(self._pending) - hold]
+        self._pending = self._pending[len(visible):]
+        return visible
+
+    def flush(self) -> str:
+        """Release any held-back text once the stream has ended."""
+        visible = "" if self.hidden else self._pending
+        self._pending = ""
+        return visible
+
+
+def chunk_text(chunk) -> str:
+    """Extract plain text from a LangChain message chunk."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+        )
+    return ""
@@ -2,10 +2,14 @@
 LangChain Triage Agent — Gemini Flash
 Listens to patient symptoms, asks follow-up questions, and routes to the correct specialist.
 """
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from config import settings
-from database.seed import detect_specialization, get_specialization
+from agents.llm import get_llm
+from database.seed import detect_specialization_in_messages, get_specialization
+from agents.streaming import MarkerFilter
+from agents.context import select_context, estimate_tokens, summary_message
+from agents.triage_classifier import classify_triage
+from agents.llm_cache import CachedTurn, cached_ainvoke, cached_astream
 
 TRIAGE_SYSTEM_PROMPT = """You are an AI healthcare triage assistant. Your role is to:
 
@@ -28,57 +32,138 @@ ROUTE_TO_SPECIALIST:cardiology
 
 Keep responses concise but caring. Use markdown for clarity when listing questions."""
 
+DIRECT_ROUTE_REPLY = (
+    "Thank you for explaining that, {name}. Based on what you've described, I believe you should "
+    "consult with our {specialty} specialist. They'll be able to collect more detailed information "
+    "and provide a thorough assessment. I'm connecting you now..."
+)
+
+ROUTING_HINT = (
+    "Triage note: the symptoms described so far most likely call for {specialty} "
+    "(specialization_id: {spec_id}). If the patient's next answer is consistent with this, "
+    "route now instead of asking more questions."
+)
+
 
 def get_triage_llm():
-    return ChatGoogleGenerativeAI(
-        model=settings.TRIAGE_MODEL,
-        google_api_key=settings.GEMINI_API_KEY,
-        temperature=0.7,
-        max_output_tokens=1024,
-    )
+    return get_llm(settings.TRIAGE_MODEL, temperature=0.7, max_output_tokens=1024)
 
 
-async def get_triage_response(messages: list[dict], patient_name: str = "there") -> dict:
-    """
-    Process a triage conversation and return the agent's response.
-    
-    Args:
-        messages: Full conversation history from the session
-        patient_name: Patient's first name for personalization
-    
-    Returns:
-        dict with 'text' (response) and optionally 'route_to' (specialization ID)
-    """
-    llm = get_triage_llm()
+def build_triage_messages(messages: list[dict], patient_name: str, summary: dict = None,
+                          hint: str = None) -> tuple[list, dict]:
+    """Build the LangChain message list from session history, bounded by the triage token budget."""
+    system_prompt = TRIAGE_SYSTEM_PROMPT.replace("the patient", patient_name)
+    if hint:
+        system_prompt += "\n\n" + hint
+    context = select_context(messages, summary, settings.TRIAGE_CONTEXT_TOKENS, estimate_tokens(system_prompt))
     
-    # Build LangChain message list from session history
-    lc_messages = [SystemMessage(content=TRIAGE_SYSTEM_PROMPT.replace("the patient", patient_name))]
+    lc_messages = [SystemMessage(content=system_prompt)]
+    if context["summary"]:
+        lc_messages.append(summary_message(context["summary"]))
     
-    for msg in messages:
+    for msg in context["messages"]:
         if msg.get("sender") == "user":
             lc_messages.append(HumanMessage(content=msg["text"]))
         elif msg.get("sender") == "agent":
             lc_messages.append(AIMessage(content=msg["text"]))
-    
-    # Get response from Gemini Flash
-    response = await llm.ainvoke(lc_messages)
-    response_text = response.content
-    
-    # Check if agent wants to route to a specialist
+    return lc_messages, context
+
+
+def finalize_triage_response(response_text: str, messages: list[dict], summary: dict = None,
+                             user_messages: int = None) -> dict:
+    """
+    Strip the routing marker from a completed reply and decide where to route.
+    `user_messages` counts the whole session's patient messages (`messages` starts after the summary).
+    """
     route_to = None
     if "ROUTE_TO_SPECIALIST:" in response_text:
         parts = response_text.split("ROUTE_TO_SPECIALIST:")
         response_text = parts[0].strip()
-        route_to = parts[1].strip().split()[0].lower()
+        route_to = parts[1].strip().split()[0].lower() if parts[1].strip() else ""
         # Validate the specialization
-        spec = get_specialization(route_to)
+        spec = get_specialization(route_to) if route_to else None
         if not spec:
-            route_to = detect_specialization(" ".join(m.get("text", "") for m in messages))
+            route_to = detect_specialization_in_messages(messages, summary)
     else:
         # Also check if we should auto-route based on message count
-        user_msgs = [m for m in messages if m.get("sender") == "user"]
-        if len(user_msgs) >= 3:
-            all_text = " ".join(m.get("text", "") for m in messages)
-            route_to = detect_specialization(all_text)
+        if user_messages is None:
+            user_messages = sum(1 for m in messages if m.get("sender") == "user")
+        if user_messages >= 3:
+            route_to = detect_specialization_in_messages(messages, summary)
     
     return {"text": response_text, "route_to": route_to}
+
+
+def triage_shortcut(messages: list[dict], patient_name: str, summary: dict = None) -> tuple[dict, str]:
+    """
+    Ask the local classifier first. Returns (result, hint): a finished routing result when it is
+    confident enough to skip the LLM, otherwise an optional hint for the LLM's system prompt.
+    """
+    decision = classify_triage(messages, summary)
+    if decision["action"] == "llm":
+        return None, None
+    spec = get_specialization(decision["route_to"])
+    if decision["action"] == "route":
+        text = DIRECT_ROUTE_REPLY.format(name=patient_name, specialty=spec["name"])
+        return {"text": text, "route_to": spec["id"], "context": None, "classifier": decision}, None
+    return None, ROUTING_HINT.format(specialty=spec["name"], spec_id=spec["id"])
+
+
+async def get_triage_response(messages: list[dict], patient_name: str = "there", summary: dict = None,
+                              user_messages: int = None) -> dict:
+    """
+    Process a triage conversation and return the agent's response.
+    
+    Args:
+        messages: Full conversation history from the session
+        patient_name: Patient's first name for personalization
+        summary: The session's rolling context summary, if any
+        user_messages: Patient messages in the whole session, summarized ones included
+    
+    Returns:
+        dict with 'text' (response), optionally 'route_to' (specialization ID),
+        and 'context' (prompt selection and token savings, see agents.context)
+    """
+    shortcut, hint = triage_shortcut(messages, patient_name, summary)
+    if shortcut:
+        return shortcut
+    
+    llm = get_triage_llm()
+    lc_messages, context = build_triage_messages(messages, patient_name, summary, hint)
+    turn = CachedTurn("triage", llm, lc_messages, messages, patient_name, personal=bool(context["summary"]))
+    
+    # Get response from Gemini Flash (or the response cache)
+    response_text = await cached_ainvoke(turn, llm, lc_messages)
+    return {**finalize_triage_response(response_text, messages, summary, user_messages), "context": context}
+
+
+async def stream_triage_response(messages: list[dict], patient_name: str = "there", summary: dict = None,
+                                 user_messages: int = None):
+    """
+    Stream a triage reply token by token.
+    
+    Yields:
+        {"type": "token", "text": ...} for each visible piece of text, then a single
+        {"type": "result", ...} with the same fields as get_triage_response.
+    """
+    shortcut, hint = triage_shortcut(messages, patient_name, summary)
+    if shortcut:
+        yield {"type": "token", "text": shortcut["text"]}
+        yield {"type": "result", **shortcut}
+        return
+    
+    llm = get_triage_llm()
+    lc_messages, context = build_triage_messages(messages, patient_name, summary, hint)
+    turn = CachedTurn("triage", llm, lc_messages, messages, patient_name, personal=bool(context["summary"]))
+    marker_filter = MarkerFilter(["ROUTE_TO_SPECIALIST:"])
+    
+    async for text in cached_astream(turn, llm, lc_messages):
+        visible = marker_filter.feed(text)
+        if visible:
+            yield {"type": "token", "text": visible}
+    tail = marker_filter.flush()
+    if tail:
+        yield {"type": "token", "text": tail}
+    
+    yield {"type": "result", **finalize_triage_response(marker_filter.raw, messages, summary, user_messages),
+           "context": context}
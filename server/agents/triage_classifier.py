@@ -0,0 +1,282 @@
+"""
+Local triage classifier — TF-IDF features + a multinomial logistic regression, pure Python.
+Runs before the triage LLM: when it is confident about the specialization it routes the
+patient directly (no Gemini call); when it is fairly sure it tells the LLM, which then
+wraps up the questioning sooner.
+
+Train from completed triage sessions and write the artifact (run from server/):
+    python -m agents.triage_classifier [--out PATH] [--bootstrap] [--epochs 30]
+
+The artifact is loaded once at startup (see main.py). Without one the triage flow is
+unchanged.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+from datetime import datetime
+from config import settings
+
+TOKEN_RE = re.compile(r"[a-z][a-z']+")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have i i'm im in is it it's its "
+    "me my of on or so that the them then there this to was were with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Unigrams plus adjacent-word bigrams, stopwords removed."""
+    words = [w for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def patient_text(messages: list[dict], summary: dict = None) -> str:
+    """What the patient has said so far (plus the rolling summary of older turns)."""
+    parts = [summary["text"]] if summary and summary.get("text") else []
+    parts += [m.get("text", "") for m in messages if m.get("sender") == "user"]
+    return "\n".join(parts)
+
+
+class TriageClassifier:
+    def __init__(self, classes: list[str], idf: dict, weights: dict, bias: dict, meta: dict = None):
+        self.classes = classes
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.meta = meta or {}
+
+    def features(self, text: str) -> dict:
+        """Sublinear TF-IDF vector, L2-normalised; terms unseen in training are dropped."""
+        counts = Counter(t for t in tokenize(text) if t in self.idf)
+        vec = {t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    def predict_proba(self, text: str) -> dict:
+        return self._proba_vec(self.features(text))
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """(specialization id, probability) for the most likely class."""
+        if not text.strip():
+            return None, 0.0
+        probs = self.predict_proba(text)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+    @classmethod
+    def fit(cls, texts: list[str], labels: list[str], epochs: int = 30, lr: float = 0.5,
+            l2: float = 1e-4, seed: int = 13) -> "TriageClassifier":
+        classes = sorted(set(labels))
+        docs = [tokenize(t) for t in texts]
+        df = Counter(t for doc in docs for t in set(doc))
+        n = len(docs)
+        idf = {t: math.log((1 + n) / (1 + d)) + 1 for t, d in df.items()}
+        model = cls(classes, idf, {c: {} for c in classes}, {c: 0.0 for c in classes})
+
+        # Plain SGD on the softmax cross-entropy; vectors are sparse so updates touch few weights
+        samples = [(model.features(t), y) for t, y in zip(texts, labels)]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(samples)
+            step = lr / (1 + epoch * 0.1)
+            for vec, y in samples:
+                probs = model._proba_vec(vec)
+                for c in classes:
+                    grad = probs[c] - (1.0 if c == y else 0.0)
+                    if abs(grad) < 1e-6:
+                        continue
+                    w = model.weights[c]
+                    for t, v in vec.items():
+                        w[t] = w.get(t, 0.0) * (1 - step * l2) - step * grad * v
+                    model.bias[c] -= step * grad
+
+        # Drop near-zero weights to keep the artifact small
+        for c in classes:
+            model.weights[c] = {t: round(w, 5) for t, w in model.weights[c].items() if abs(w) > 1e-3}
+        return model
+
+    def _proba_vec(self, vec: dict) -> dict:
+        logits = {
+            c: self.bias[c] + sum(self.weights[c].get(t, 0.0) * v for t, v in vec.items())
+            for c in self.classes
+        }
+        top = max(logits.values())
+        exps = {c: math.exp(l - top) for c, l in logits.items()}
+        total = sum(exps.values())
+        return {c: e / total for c, e in exps.items()}
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "classes": self.classes,
+            "idf": {t: round(v, 5) for t, v in self.idf.items()},
+            "weights": self.weights,
+            "bias": self.bias,
+            "meta": self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TriageClassifier":
+        return cls(data["classes"], data["idf"], data["weights"], data["bias"], data.get("meta"))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "TriageClassifier":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+# ===== Process-wide model and counters =====
+
+classifier: TriageClassifier = None
+stats = {"predictions": 0, "directRoutes": 0, "hints": 0, "deferred": 0}
+
+
+def load_triage_classifier(path: str = None) -> TriageClassifier:
+    """Load the trained artifact once at startup; a missing file just disables the shortcut."""
+    global classifier
+    path = path or settings.TRIAGE_CLASSIFIER_PATH
+    if not os.path.exists(path):
+        print(f"ℹ️ No triage classifier at {path} — every triage turn goes to the LLM")
+        classifier = None
+        return None
+    classifier = TriageClassifier.load(path)
+    print(f"🧭 Triage classifier loaded ({classifier.meta.get('samples', '?')} training samples)")
+    return classifier
+
+
+def classify_triage(messages: list[dict], summary: dict = None) -> dict:
+    """
+    Decide what the triage turn should do before calling the LLM.
+
+    Returns:
+        {"action": "route" | "hint" | "llm", "route_to", "confidence"}
+        - route: confident enough to skip the LLM and hand off now
+        - hint: likely specialization, passed to the LLM so it routes sooner
+    """
+    if classifier is None:
+        return {"action": "llm", "route_to": None, "confidence": 0.0}
+
+    user_turns = sum(1 for m in messages if m.get("sender") == "user")
+    label, confidence = classifier.predict(patient_text(messages, summary))
+    stats["predictions"] += 1
+
+    if label and confidence >= settings.TRIAGE_CLASSIFIER_THRESHOLD \
+            and user_turns >= settings.TRIAGE_CLASSIFIER_MIN_USER_MESSAGES:
+        stats["directRoutes"] += 1
+        return {"action": "route", "route_to": label, "confidence": round(confidence, 3)}
+    if label and confidence >= settings.TRIAGE_CLASSIFIER_HINT_THRESHOLD:
+        stats["hints"] += 1
+        return {"action": "hint", "route_to": label, "confidence": round(confidence, 3)}
+    stats["deferred"] += 1
+    return {"action": "llm", "route_to": label, "confidence": round(confidence, 3)}
+
+
+def classifier_stats() -> dict:
+    return {
+        "loaded": classifier is not None,
+        "threshold": settings.TRIAGE_CLASSIFIER_THRESHOLD,
+        "trainedAt": classifier.meta.get("trainedAt") if classifier else None,
+        "llmCallsAvoided": stats["directRoutes"],
+        **stats,
+    }
+
+
+# ===== Offline training =====
+
+def bootstrap_examples() -> list[tuple[str, str]]:
+    """Synthetic phrases from the specialization keywords, for a cold start with few sessions."""
+    from database.seed import SPECIALIZATIONS
+    templates = ["I have {kw} problems", "my {kw} hurts", "worried about my {kw}",
+                 "{kw} issues for a few days", "having {kw} symptoms"]
+    examples = []
+    for spec in SPECIALIZATIONS:
+        for kw in spec["keywords"]:
+            examples += [(t.format(kw=kw), spec["id"]) for t in templates]
+    examples += [(t, "general") for t in [
+        "I feel tired all the time", "I have a fever and feel unwell", "general checkup please",
+        "I have been feeling weak and run down", "I lost my appetite and feel sick",
+    ]]
+    return examples
+
+
+async def load_training_data(db) -> list[tuple[str, str]]:
+    """
+    (patient text, specialization) for each completed triage session the classifier did not
+    route itself. The label is the session's routeTo, or for older sessions the specialist
+    chat the patient opened next.
+    """
+    from database.messages import load_messages
+    examples = []
+    cursor = db.sessions.find(
+        {"type": "triage", "status": "completed", "routedBy": {"$ne": "classifier"}},
+        {"userId": 1, "routeTo": 1, "createdAt": 1},
+    )
+    async for session in cursor:
+        label = session.get("routeTo")
+        if not label:
+            follow_up = await db.sessions.find_one(
+                {"userId": session["userId"], "type": "specialist", "createdAt": {"$gt": session["createdAt"]}},
+                {"specialization": 1},
+                sort=[("createdAt", 1)],
+            )
+            label = follow_up.get("specialization") if follow_up else None
+        if not label:
+            continue
+        text = patient_text(await load_messages(db, str(session["_id"])))
+        if text.strip():
+            examples.append((text, label))
+    return examples
+
+
+def holdout_accuracy(examples: list[tuple[str, str]], epochs: int) -> float:
+    if len(examples) < 20:
+        return None
+    shuffled = examples[:]
+    random.Random(1).shuffle(shuffled)
+    cut = len(shuffled) // 5
+    test, train = shuffled[:cut], shuffled[cut:]
+    model = TriageClassifier.fit([t for t, _ in train], [y for _, y in train], epochs=epochs)
+    return round(sum(model.predict(t)[0] == y for t, y in test) / len(test), 3)
+
+
+async def train(out: str, bootstrap: bool = False, epochs: int = 30):
+    from database import connection
+    await connection.connect_db()
+    examples = await load_training_data(connection.get_db())
+    await connection.close_db()
+    sessions = len(examples)
+    if bootstrap:
+        examples += bootstrap_examples()
+    if len({y for _, y in examples}) < 2:
+        print("❌ Need labelled sessions from at least two specializations (try --bootstrap)")
+        return
+
+    accuracy = holdout_accuracy(examples, epochs)
+    model = TriageClassifier.fit([t for t, _ in examples], [y for _, y in examples], epochs=epochs)
+    model.meta = {
+        "trainedAt": datetime.utcnow().isoformat(),
+        "samples": len(examples),
+        "sessions": sessions,
+        "holdoutAccuracy": accuracy,
+        "labels": dict(Counter(y for _, y in examples)),
+    }
+    model.save(out)
+    print(f"✅ Trained on {len(examples)} samples ({sessions} sessions), holdout accuracy {accuracy} → {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local triage classifier from completed triage sessions")
+    parser.add_argument("--out", default=settings.TRIAGE_CLASSIFIER_PATH, help="artifact path")
+    parser.add_argument("--bootstrap", action="store_true", help="add keyword-based examples for a cold start")
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(train(args.out, args.bootstrap, args.epochs))
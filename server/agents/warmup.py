@@ -0,0 +1,33 @@
+"""
+Background warm-up of the agent modules.
+The agents import LangChain (and the Gemini client pulls in google-genai and gRPC), which
+dominates process start-up. Routes import them on first use instead, and once the app is
+serving this imports them on a worker thread so the first chat turn does not pay for it.
+"""
+import asyncio
+import importlib
+import time
+
+AGENT_MODULES = ("agents.triage_agent", "agents.specialist_agent", "agents.context", "langchain_google_genai")
+
+stats = {"warmed": False, "ms": None}
+
+
+def import_agents() -> float:
+    started = time.perf_counter()
+    for name in AGENT_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"⚠️ Agent warm-up skipped {name}: {e}")
+    return (time.perf_counter() - started) * 1000
+
+
+async def warm_agents():
+    elapsed = await asyncio.to_thread(import_agents)
+    stats.update(warmed=True, ms=round(elapsed, 1))
+    print(f"🔥 Agents warmed in {elapsed:.0f} ms")
+
+
+def warmup_stats() -> dict:
+    return dict(stats)
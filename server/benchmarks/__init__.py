@@ -0,0 +1 @@
+# Make benchmarks a package (run scripts with `python -m benchmarks.<name>` from server/)
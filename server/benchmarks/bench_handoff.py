@@ -0,0 +1,149 @@
+"""
+Triage → specialist handoff: the pasted transcript vs the precomputed summary.
+
+For triage chats of increasing length:
+- handoff_tokens: the hidden context message pinned into every specialist prompt
+- prompt_tokens: a whole specialist prompt (system + handoff + conversation) on the first
+  and on the report turn, so the per-turn saving is visible against the total
+- create_session: MongoDB round-trips and documents read when the specialist chat opens
+  (the old code read the triage session and then all of its messages), and how many of
+  them the request waits for in turn — the handoff lookup runs alongside the claim of a
+  prewarmed chat (services.prewarm), which finds none here
+
+Tokens use the same estimate as the context budgeting (agents.context.estimate_tokens).
+
+Usage (from server/):
+    python -m benchmarks.bench_handoff --turns 2 4 8 12
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from langchain_core.messages import BaseMessage
+from agents.context import estimate_tokens
+from agents.handoff import build_handoff, render_handoff
+from agents.specialist_agent import build_specialist_messages
+from database import connection
+from database.messages import insert_messages, load_messages
+from models.session import SessionCreate
+from routes.sessions import create_session
+from benchmarks.fakes import LatencyDatabase
+
+SPEC = "cardiology"
+RTT = 0.02
+PATIENT = [
+    "Hi, my chest feels tight when I climb stairs and I get short of breath.",
+    "It started about a week ago, maybe a bit longer.",
+    "It's worse in the evening and after meals, and sometimes I feel dizzy.",
+    "No, I've never had anything like this before. No chest pain at rest.",
+    "I've tried resting but it hasn't helped much. It's about a 5 out of 10.",
+    "My father had high blood pressure and a heart attack in his sixties.",
+    "I take ibuprofen sometimes for headaches, nothing else regularly.",
+    "I walk to work every day, about 20 minutes, and I stopped twice this week.",
+]
+AGENT = ("Thank you for sharing that — it helps me understand what's going on. {q} "
+         "Take your time, and let me know if anything else has changed recently.")
+QUESTIONS = [
+    "When did you first notice it?", "Does anything make it better or worse?",
+    "Have you had anything similar before?", "How severe is it on a scale of 1 to 10?",
+    "Does anyone in your family have heart problems?", "Are you taking any medications?",
+    "How active are you day to day?", "Is there anything else you'd like to mention?",
+]
+SPECIALIST_TURNS = [
+    "It mostly happens on the stairs at work.",
+    "It eases after a few minutes of rest.",
+    "No swelling in my legs that I've noticed.",
+]
+
+
+def triage_chat(turns: int) -> list[dict]:
+    messages = []
+    for i in range(turns):
+        messages.append({"sender": "user", "text": PATIENT[i % len(PATIENT)], "type": "text"})
+        messages.append({"sender": "agent", "text": AGENT.format(q=QUESTIONS[i % len(QUESTIONS)]), "type": "text"})
+    for seq, m in enumerate(messages, 1):
+        m.update(id=str(seq), seq=seq, timestamp=datetime.utcnow().isoformat())
+    return messages
+
+
+def legacy_transcript(messages: list[dict]) -> str:
+    """What create_session used to pin: the full triage transcript."""
+    transcript = "--- PREVIOUS TRIAGE TRANSCRIPT ---\n"
+    for m in messages:
+        if m.get("type") == "text":
+            speaker = "Patient" if m.get("sender") == "user" else "Triage Agent"
+            transcript += f"{speaker}: {m.get('text')}\n"
+    return transcript
+
+
+def prompt_tokens(hidden_text: str, specialist_turns: int) -> int:
+    messages = [{"sender": "system", "type": "hidden", "text": hidden_text, "seq": 1}]
+    for i in range(specialist_turns):
+        messages.append({"sender": "user", "text": SPECIALIST_TURNS[i % len(SPECIALIST_TURNS)], "seq": 2 + 2 * i})
+        if i < specialist_turns - 1:
+            messages.append({"sender": "agent", "text": AGENT.format(q=QUESTIONS[i]), "seq": 3 + 2 * i})
+    lc_messages, _ = build_specialist_messages(SPEC, messages)
+    return sum(estimate_tokens(m.content) for m in lc_messages if isinstance(m, BaseMessage))
+
+
+async def legacy_open(db, user_id: str):
+    """The old lookup: newest completed triage, then every message of it."""
+    last = await db.sessions.find_one({"userId": user_id, "type": "triage", "status": "completed"},
+                                      {"_id": 1}, sort=[("createdAt", -1)])
+    return legacy_transcript(await load_messages(db, str(last["_id"])))
+
+
+async def waits(db, call) -> tuple[int, int]:
+    """(round-trips, round-trips waited for one after another) of one call."""
+    db.reset_counts()
+    started = time.perf_counter()
+    await call
+    return db.round_trips, round((time.perf_counter() - started) / RTT)
+
+
+async def create_session_cost(turns: int) -> dict:
+    db = LatencyDatabase(RTT)
+    connection.db = db
+    messages = triage_chat(turns)
+    result = await db.sessions.insert_one({
+        "userId": "u1", "type": "triage", "status": "completed", "routeTo": SPEC,
+        "handoff": build_handoff(messages, SPEC), "createdAt": datetime.utcnow().isoformat(),
+    })
+    await insert_messages(db, str(result.inserted_id), messages)
+
+    trips, waited = await waits(db, legacy_open(db, "u1"))
+    legacy = {"roundTrips": trips, "waits": waited, "documentsRead": 1 + len(messages)}
+    trips, waited = await waits(db, create_session("u1", SessionCreate(type="specialist", specialization=SPEC)))
+    inserts = db.ops["sessions.insert"] + db.ops["messages.insert"]
+    current = {"roundTrips": trips - inserts, "waits": waited - inserts, "documentsRead": 1}
+    return {"legacy": legacy, "handoff": current}
+
+
+async def main(args):
+    results = []
+    for turns in args.turns:
+        messages = triage_chat(turns)
+        transcript = legacy_transcript(messages)
+        summary = render_handoff(build_handoff(messages, SPEC), "Cardiology")
+        first = (prompt_tokens(transcript, 1), prompt_tokens(summary, 1))
+        report = (prompt_tokens(transcript, 3), prompt_tokens(summary, 3))
+        results.append({
+            "triageTurns": turns,
+            "handoffTokens": {"transcript": estimate_tokens(transcript), "summary": estimate_tokens(summary)},
+            "promptTokensFirstTurn": {"transcript": first[0], "summary": first[1]},
+            "promptTokensReportTurn": {"transcript": report[0], "summary": report[1]},
+            "savedPerSpecialistTurn": first[0] - first[1],
+            "savedPct": round((first[0] - first[1]) / first[0] * 100, 1),
+            # Excluding the inserts of the new session itself, which both versions do
+            "createSessionReads": await create_session_cost(turns),
+        })
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 4, 8, 12],
+                        help="patient messages in the triage chat")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""
+Per-turn LLM client overhead: a new client per turn (old behaviour) vs. the shared registry.
+
+The stand-in provider charges a connection handshake on the first call of every client,
+the way a fresh HTTP/gRPC channel pays TLS setup. Real ChatGoogleGenerativeAI construction
+cost (no network) is measured separately.
+
+Usage (from server/):
+    python -m benchmarks.bench_llm_registry --turns 50 --handshake 0.08
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from agents.llm import LLMRegistry, create_gemini_client
+from benchmarks.fakes import FakeChatModel
+
+
+class StandInClient(FakeChatModel):
+    """Fake chat model that pays a one-off handshake before its first request."""
+
+    def __init__(self, handshake: float, **kwargs):
+        super().__init__(first_token_latency=0.0, tokens_per_second=1e9, **kwargs)
+        self.handshake = handshake
+        self.connected = False
+
+    async def ainvoke(self, messages, **kwargs):
+        if not self.connected:
+            await asyncio.sleep(self.handshake)
+            self.connected = True
+        return await super().ainvoke(messages, **kwargs)
+
+
+async def run(turns: int, get_client) -> list[float]:
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        llm = get_client()
+        await llm.ainvoke([])
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict:
+    return {"mean_ms": round(statistics.mean(samples), 2), "p50_ms": round(statistics.median(samples), 2)}
+
+
+async def main(args):
+    params = {"model": "stand-in", "temperature": 0.7, "max_output_tokens": 1024}
+    factory = lambda **kw: StandInClient(args.handshake, model=kw["model"])
+    registry = LLMRegistry(factory)
+
+    results = {
+        "per_turn_client": summarize(await run(args.turns, lambda: factory(**params))),
+        "registry": summarize(await run(args.turns, lambda: registry.get(**params))),
+    }
+
+    # Construction cost of the real client (CPU only, nothing is sent)
+    try:
+        started = time.perf_counter()
+        for _ in range(args.construct):
+            create_gemini_client("gemini-2.5-flash", 0.7, 1024)
+        results["gemini_construct_mean_ms"] = round((time.perf_counter() - started) * 1000 / args.construct, 2)
+    except Exception as e:
+        results["gemini_construct_error"] = str(e)
+
+    results["registry_stats"] = registry.stats()
+    await registry.close()
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--handshake", type=float, default=0.08, help="stand-in connection setup (s)")
+    parser.add_argument("--construct", type=int, default=20, help="real client constructions to time")
+    asyncio.run(main(parser.parse_args()))
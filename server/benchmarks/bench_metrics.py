@@ -0,0 +1,123 @@
+"""
+Per-request cost of the /metrics instrumentation.
+
+- middleware_only: MetricsMiddleware around a bare ASGI app that does nothing — the
+  instrumentation's own cost
+- http: the same trivial FastAPI route driven straight through ASGI (no network, no
+  httpx), with and without MetricsMiddleware. Adding a middleware also adds a layer to
+  Starlette's stack, so this is what a request really pays. Rounds alternate between the
+  two apps and the median of the per-round differences is reported (with the range), since
+  back-to-back blocks drift by more than the difference
+- mongo: one started + succeeded event pair through MongoCommandMetrics
+- llm: one observe_llm call (latency + two token counters)
+- render: producing the /metrics body with the series recorded above
+
+On a dev container (10k requests x 9 rounds): middleware_only ~3-6 us, http_overhead
+~9-11 us median with single rounds anywhere from -8 to +27 us — a request through the app
+pays about 10 us, not the middleware-only figure.
+
+Usage (from server/):
+    python -m benchmarks.bench_metrics --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from services import metrics
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    return app
+
+
+async def drive(app, n: int) -> float:
+    """Mean seconds per request for n GETs dispatched directly to the ASGI app."""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for i in range(n):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/api/items/{i % 50}", "raw_path": b"", "root_path": "",
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("t", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / n
+
+
+async def noop_app(scope, receive, send):
+    scope["route"] = SimpleNamespace(path="/noop")
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def per_call_us(fn, n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return round((time.perf_counter() - started) / n * 1e6, 2)
+
+
+def mongo_pair(listener):
+    def run(i):
+        event = SimpleNamespace(command_name="find", command={"find": "sessions"}, connection_id=("h", 1),
+                                request_id=i, duration_micros=850)
+        listener.started(event)
+        listener.succeeded(event)
+    return run
+
+
+async def main(args):
+    bare, instrumented = build_app(False), build_app(True)
+    # Warm both (route compilation, first-call allocations) before timing
+    await drive(bare, 200)
+    await drive(instrumented, 200)
+    rounds = []
+    for _ in range(args.rounds):
+        bare_round = await drive(bare, args.requests)
+        rounds.append((bare_round, await drive(instrumented, args.requests)))
+    bare_s = statistics.median(b for b, _ in rounds)
+    instrumented_s = statistics.median(i for _, i in rounds)
+    overheads = sorted((i - b) * 1e6 for b, i in rounds)
+
+    noop_s = min([await drive(noop_app, args.requests) for _ in range(3)])
+    wrapped_s = min([await drive(metrics.MetricsMiddleware(noop_app), args.requests) for _ in range(3)])
+
+    results = {
+        "middleware_only_us": round((wrapped_s - noop_s) * 1e6, 2),
+        "http_bare_us": round(bare_s * 1e6, 2),
+        "http_instrumented_us": round(instrumented_s * 1e6, 2),
+        "http_overhead_us": round(statistics.median(overheads), 2),
+        "http_overhead_range_us": [round(overheads[0], 2), round(overheads[-1], 2)],
+        "mongo_event_pair_us": per_call_us(mongo_pair(metrics.MongoCommandMetrics()), args.requests),
+        "llm_observe_us": per_call_us(lambda i: metrics.observe_llm("triage", "gemini", 0.8, 900, 120),
+                                      args.requests),
+    }
+    started = time.perf_counter()
+    body = metrics.render_metrics()
+    results["render_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    results["render_bytes"] = len(body)
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=9, help="alternating bare/instrumented rounds")
+    asyncio.run(main(parser.parse_args()))
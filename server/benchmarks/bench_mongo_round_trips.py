@@ -0,0 +1,91 @@
+"""
+Count MongoDB round-trips per chat turn on /api/chat/{session_id}/send.
+
+Runs send_message against the in-memory FakeDatabase with a fake LLM and prints the
+operations issued for a plain triage turn, a routing triage turn and a report-producing
+specialist turn. Current counts (with an Idempotency-Key, as the web client sends):
+- plain turn: 7 — take the session + reserve seqs (1 findAndModify), save and load messages
+  (2), reply + release + response record (3, one transaction), plus 1 users read when the
+  user cache is cold (as in the first scenario here)
+- routing turn: 8 (+ the prewarm job), report turn: 9 (+ the report and its job)
+Two of these are the turn record (services.turns: insert, then "done"), which replays and
+single-flight cost. For reference, the implementation before the turn records issued 5
+round-trips per plain turn and up to 9 on a report turn (with the whole message array on
+each read).
+
+Usage (from server/):
+    python -m benchmarks.bench_mongo_round_trips
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+from agents import triage_agent, specialist_agent
+from database import connection
+from database.seed import SEED_DOCTORS
+from database.messages import insert_messages
+from models.session import MessageCreate
+from routes.chat import send_message
+from benchmarks.fakes import FakeChatModel, FakeDatabase
+
+REPORT_REPLY = """Thank you, that gives me a clear picture.
+GENERATE_REPORT:
+SUMMARY: Intermittent exertional chest tightness for one week.
+FINDINGS:
+- Chest tightness on exertion
+- No radiation of pain
+SUGGESTIONS:
+- ECG and troponin
+- Cardiology follow-up"""
+
+
+async def setup(db: FakeDatabase) -> dict:
+    patient = await db.users.insert_one({"email": "pat@example.com", "role": "patient", "firstName": "Pat"})
+    for doc in SEED_DOCTORS:
+        await db.users.insert_one({"email": doc["email"], "role": "doctor", "doctorId": doc["_id"]})
+    sessions = {}
+    # A plain turn needs a chat short of the auto-route threshold (3 patient messages)
+    for name, kind, spec, length in (("plain", "triage", None, 2), ("routing", "triage", None, 5),
+                                     ("specialist", "specialist", "cardiology", 5)):
+        history = [
+            {"id": str(i), "sender": "user" if i % 2 else "agent", "text": f"message {i}", "type": "text", "seq": i}
+            for i in range(1, length + 1)
+        ]
+        result = await db.sessions.insert_one({
+            "userId": str(patient.inserted_id), "type": kind, "specialization": spec,
+            "status": "active", "messageSeq": len(history), "messageCount": len(history), "uploads": [],
+            "createdAt": datetime.utcnow().isoformat(),
+        })
+        sessions[name] = str(result.inserted_id)
+        await insert_messages(db, sessions[name], history)
+    return sessions
+
+
+async def measure(db: FakeDatabase, session_id: str) -> dict:
+    db.reset_counts()
+    # Sent with an Idempotency-Key, like the web client
+    await send_message(session_id, MessageCreate(sender="user", text="It hurts when I climb stairs."),
+                       idempotency_key=uuid.uuid4().hex)
+    return {"round_trips": db.round_trips, "ops": dict(db.ops)}
+
+
+async def main():
+    db = FakeDatabase()
+    connection.db = db
+    sessions = await setup(db)
+    fast = dict(first_token_latency=0.0, tokens_per_second=1e6)
+
+    results = {}
+    triage_agent.get_triage_llm = lambda: FakeChatModel("Can you tell me more?", **fast)
+    results["plain_turn"] = await measure(db, sessions["plain"])
+    triage_agent.get_triage_llm = lambda: FakeChatModel("Connecting you now.\nROUTE_TO_SPECIALIST:cardiology", **fast)
+    results["triage_routing_turn"] = await measure(db, sessions["routing"])
+    specialist_agent.get_specialist_llm = lambda: FakeChatModel(REPORT_REPLY, **fast)
+    results["specialist_report_turn"] = await measure(db, sessions["specialist"])
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
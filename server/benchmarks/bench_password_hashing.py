@@ -0,0 +1,85 @@
+"""
+Event-loop lag during a login storm.
+
+- inline (before): pbkdf2 verify called directly in the async handler
+- pool (after): verify on the password process pool, with admission control
+
+A ticker task sleeps `--tick` ms in a loop and records how late it wakes up; that lateness is
+what every other request on the worker (e.g. a streaming chat) sees while logins run.
+
+Usage (from server/):
+    python -m benchmarks.bench_password_hashing --logins 64 --workers 2 --max-pending 32
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi import HTTPException
+from passlib.hash import pbkdf2_sha256
+from services.passwords import PasswordPool
+
+PASSWORD = "correct horse battery staple"
+
+
+async def ticker(interval: float, lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def inline_login(password_hash: str) -> int:
+    pbkdf2_sha256.verify(PASSWORD, password_hash)
+    return 200
+
+
+async def pooled_login(pool: PasswordPool, password_hash: str) -> int:
+    try:
+        await pool.verify(PASSWORD, password_hash)
+        return 200
+    except HTTPException as e:
+        return e.status_code
+
+
+async def storm(login, logins: int, tick: float) -> dict:
+    lags, stop = [], asyncio.Event()
+    tick_task = asyncio.create_task(ticker(tick / 1000, lags, stop))
+    await asyncio.sleep(tick / 1000 * 2)
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(login() for _ in range(logins)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await tick_task
+    lags.sort()
+    return {
+        "wall_ms": round(wall * 1000, 1),
+        "ok": statuses.count(200),
+        "rejected429": statuses.count(429),
+        "loopLag_p50_ms": round(statistics.median(lags), 1) if lags else None,
+        "loopLag_p99_ms": round(lags[int(0.99 * (len(lags) - 1))], 1) if lags else None,
+        "loopLag_max_ms": round(lags[-1], 1) if lags else None,
+        "ticks": len(lags),
+    }
+
+
+async def main(args):
+    password_hash = pbkdf2_sha256.hash(PASSWORD)
+    results = {"inline": await storm(lambda: inline_login(password_hash), args.logins, args.tick)}
+
+    pool = PasswordPool(args.workers, args.max_pending, retry_after=1).start()
+    await pool.verify(PASSWORD, password_hash)  # spawn the worker processes before timing
+    results["pool"] = await storm(lambda: pooled_login(pool, password_hash), args.logins, args.tick)
+    pool.stop()
+
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login attempts")
+    parser.add_argument("--workers", type=int, default=2, help="password pool processes")
+    parser.add_argument("--max-pending", type=int, default=32, help="admission limit before 429")
+    parser.add_argument("--tick", type=float, default=5.0, help="ticker interval (ms)")
+    asyncio.run(main(parser.parse_args()))
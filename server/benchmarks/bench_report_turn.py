@@ -0,0 +1,108 @@
+"""
+Latency of report-producing specialist turns.
+
+- serial (before): reply without a report, then a second blocking force_generate_report call
+- single-call: reply and JSON report come back in one completion
+- background fallback: the model leaves the report out; the reply returns straight away and
+  the report is generated afterwards (time until it is ready is reported separately)
+
+Usage (from server/):
+    python -m benchmarks.bench_report_turn --turns 10 --first-token 0.8 --tps 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from agents import specialist_agent
+from benchmarks.fakes import FakeChatModel
+
+REPLY = "Thank you, that gives me a clear picture of your symptoms. I'm preparing your report now."
+REPORT_LINES = (
+    "SUMMARY: Intermittent exertional chest tightness over one week.\n"
+    "FINDINGS:\n- Tightness on stairs\n- No radiation\n- Mild palpitations\n"
+    "SUGGESTIONS:\n- Resting ECG\n- Blood pressure log\n- Avoid strenuous exercise"
+)
+REPORT_JSON = json.dumps({
+    "summary": "Intermittent exertional chest tightness over one week.",
+    "findings": ["Tightness on stairs", "No radiation", "Mild palpitations"],
+    "suggestions": ["Resting ECG", "Blood pressure log", "Avoid strenuous exercise"],
+})
+HISTORY = [
+    {"sender": "user", "text": "I get chest tightness when I climb stairs."},
+    {"sender": "agent", "text": "How long has this been happening?"},
+    {"sender": "user", "text": "About a week, sometimes with a fluttering feeling."},
+    {"sender": "agent", "text": "Does the pain spread to your arm or jaw?"},
+    {"sender": "user", "text": "No, it stays in the chest."},
+]
+
+
+def is_report_request(messages) -> bool:
+    return "generate a medical report" in messages[-1].content
+
+
+async def serial_turn(model) -> dict:
+    """The old flow: reply, then a blocking force_generate_report round-trip."""
+    started = time.perf_counter()
+    lc_messages, _ = specialist_agent.build_specialist_messages("cardiology", HISTORY)
+    lc_messages = lc_messages[:-1]  # no report-due instruction in the old prompt
+    await model.ainvoke(lc_messages)
+    report = await specialist_agent.force_generate_report(
+        model, lc_messages, "cardiology", "Alex", specialist_agent.get_doctor_for_spec("cardiology")
+    )
+    elapsed = time.perf_counter() - started
+    return {"reply": elapsed, "reportReady": elapsed, "report": report}
+
+
+async def single_call_turn() -> dict:
+    started = time.perf_counter()
+    result = await specialist_agent.get_specialist_response("cardiology", HISTORY, "Alex")
+    elapsed = time.perf_counter() - started
+    return {"reply": elapsed, "reportReady": elapsed, "report": result["report"]}
+
+
+async def background_turn() -> dict:
+    started = time.perf_counter()
+    result = await specialist_agent.get_specialist_response("cardiology", HISTORY, "Alex")
+    reply = time.perf_counter() - started
+    assert result["report_pending"]
+    report = await specialist_agent.generate_specialist_report("cardiology", HISTORY, "Alex")
+    return {"reply": reply, "reportReady": time.perf_counter() - started, "report": report}
+
+
+def summarize(samples: list[dict]) -> dict:
+    out = {}
+    for key in ("reply", "reportReady"):
+        values = sorted(s[key] * 1000 for s in samples)
+        out[f"{key}_p50_ms"] = round(statistics.median(values), 1)
+        out[f"{key}_p95_ms"] = round(values[int(0.95 * (len(values) - 1))], 1)
+    out["reportsParsed"] = sum(1 for s in samples if s["report"] and len(s["report"]["findings"]) == 3)
+    return out
+
+
+async def main(args):
+    timing = dict(first_token_latency=args.first_token, tokens_per_second=args.tps)
+    results = {}
+
+    legacy = FakeChatModel(lambda m: REPORT_LINES if is_report_request(m) else REPLY, **timing)
+    results["serial"] = summarize([await serial_turn(legacy) for _ in range(args.turns)])
+
+    structured = FakeChatModel(f"{REPLY}\nGENERATE_REPORT:\n{REPORT_JSON}", **timing)
+    specialist_agent.get_specialist_llm = lambda: structured
+    results["singleCall"] = summarize([await single_call_turn() for _ in range(args.turns)])
+    results["singleCall"]["llmCalls"] = structured.calls
+
+    forgetful = FakeChatModel(lambda m: REPORT_LINES if is_report_request(m) else REPLY, **timing)
+    specialist_agent.get_specialist_llm = lambda: forgetful
+    results["backgroundFallback"] = summarize([await background_turn() for _ in range(args.turns)])
+
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--first-token", type=float, default=0.8, help="fake LLM first-token latency (s)")
+    parser.add_argument("--tps", type=float, default=50.0, help="fake LLM tokens per second")
+    asyncio.run(main(parser.parse_args()))
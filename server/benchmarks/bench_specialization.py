@@ -0,0 +1,147 @@
+"""
+Specialization detection: the old first-match substring loop vs. the word-boundary matcher.
+
+- single: long transcripts that each name one specialization, with filler that holds no
+  keyword (not even as part of a word). Both must route them the same way.
+- batchNoMatch: the same filler without any keyword. Both must route to general, and the
+  matcher must be no slower: the old loop has to try every keyword here.
+- batch: transcripts mixing several specializations' symptoms, filler with "ahead" in it.
+  The old loop routes on the first specialization with any substring hit ("ahead" counts
+  as "head"), the matcher on the most keyword hits, so they disagree by design.
+- conversation: a triage chat about one specialization re-detecting after every turn over
+  the whole transcript; both must end on the same route.
+
+On `single` and `batch` the old loop stays faster: it stops at its first substring hit, while
+the matcher has to rule the other specializations out (single) or count every hit (batch).
+
+Usage (from server/):
+    python -m benchmarks.bench_specialization --turns 200 --texts 200
+"""
+import argparse
+import json
+import random
+import time
+
+from database.seed import (
+    SPECIALIZATIONS, SpecializationMatcher, detect_specializations, detect_specialization,
+)
+
+FILLER = (
+    "I have been feeling a bit off since last week and it gets worse in the evening. "
+    "I went for a walk ahead of dinner and had to stop. Sleep has been poor lately. "
+)
+# No keyword anywhere, not even inside a word, so the old substring loop finds nothing either
+QUIET_FILLER = FILLER.replace("ahead", "early")
+SYMPTOMS = [
+    "my chest feels tight", "a rash on my arm that itches", "my knee hurts on stairs",
+    "constant headaches", "a dry cough at night", "I feel tired all the time",
+]
+# One per specialization with keywords, in SPECIALIZATIONS order
+SINGLE_SYMPTOMS = SYMPTOMS[:5]
+
+
+def legacy_detect(text: str) -> str:
+    """The original first-match substring scan."""
+    lower = text.lower()
+    for spec in SPECIALIZATIONS:
+        if any(kw in lower for kw in spec["keywords"]):
+            return spec["id"]
+    return "general"
+
+
+def conversation(turns: int, rng: random.Random) -> list[str]:
+    return [FILLER + rng.choice(SYMPTOMS) + "." for _ in range(turns)]
+
+
+def timed(fn, texts: list[str]) -> tuple[list[str], float]:
+    started = time.perf_counter()
+    routes = [fn(t) for t in texts]
+    return routes, (time.perf_counter() - started) * 1000
+
+
+def bench_conversation(turns: int, rng: random.Random) -> dict:
+    symptom = rng.choice(SINGLE_SYMPTOMS)
+    messages = [QUIET_FILLER + symptom + "." for _ in range(turns)]
+
+    started = time.perf_counter()
+    for n in range(1, turns + 1):
+        legacy_detect(" ".join(messages[:n]))
+    legacy_ms = (time.perf_counter() - started) * 1000
+
+    matcher = SpecializationMatcher(SPECIALIZATIONS)
+    started = time.perf_counter()
+    for n in range(1, turns + 1):
+        matcher.detect_transcript(messages[:n])
+    matcher_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "turns": turns,
+        "legacyMs": round(legacy_ms, 2),
+        "matcherMs": round(matcher_ms, 2),
+        "legacyRoute": legacy_detect(" ".join(messages)),
+        "matcherRoute": matcher.detect_transcript(messages),
+    }
+
+
+def bench_batch(texts: list[str], rounds: int = 3) -> dict:
+    matcher = SpecializationMatcher(SPECIALIZATIONS)
+    legacy, matched = None, None
+    legacy_ms = matcher_ms = float("inf")
+    for _ in range(rounds):
+        legacy, elapsed = timed(legacy_detect, texts)
+        legacy_ms = min(legacy_ms, elapsed)
+        matched, elapsed = timed(matcher.detect, texts)
+        matcher_ms = min(matcher_ms, elapsed)
+
+    started = time.perf_counter()
+    detect_specializations(texts)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "texts": len(texts),
+        "avgChars": sum(map(len, texts)) // len(texts),
+        "legacyMs": round(legacy_ms, 1),
+        "matcherMs": round(matcher_ms, 1),
+        "batchApiMs": round(batch_ms, 1),
+        "routingDisagreements": sum(1 for a, b in zip(legacy, matched) if a != b),
+        "matcherRoutes": sorted(set(matched)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200, help="Messages per conversation/transcript")
+    parser.add_argument("--texts", type=int, default=200, help="Transcripts in the batch run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [" ".join(conversation(args.turns, rng)) for _ in range(args.texts)]
+    # Sanity check: the module-level helper agrees with a fresh matcher
+    assert detect_specialization(texts[0]) == SpecializationMatcher(SPECIALIZATIONS).detect(texts[0])
+
+    single = [
+        " ".join(QUIET_FILLER + SINGLE_SYMPTOMS[i % len(SINGLE_SYMPTOMS)] + "." for _ in range(args.turns)) + f" {i}"
+        for i in range(args.texts)
+    ]
+    quiet_text = " ".join(QUIET_FILLER for _ in range(args.turns))
+    quiet = [f"{i} {quiet_text}" for i in range(args.texts)]
+
+    results = {
+        "single": bench_batch(single),
+        "batchNoMatch": bench_batch(quiet),
+        "batch": bench_batch(texts),
+        "conversation": bench_conversation(args.turns, rng),
+    }
+    print(json.dumps(results, indent=2))
+
+    # Where both should agree, the matcher must route the same way...
+    assert results["single"]["routingDisagreements"] == 0, results["single"]
+    assert results["batchNoMatch"]["routingDisagreements"] == 0, results["batchNoMatch"]
+    assert results["conversation"]["legacyRoute"] == results["conversation"]["matcherRoute"], results["conversation"]
+    # ...and be no slower where the old loop cannot stop early
+    assert results["batchNoMatch"]["matcherMs"] <= results["batchNoMatch"]["legacyMs"], results["batchNoMatch"]
+
+
+if __name__ == "__main__":
+    main()
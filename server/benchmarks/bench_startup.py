@@ -0,0 +1,87 @@
+"""
+Cold-start cost of an API worker.
+
+- imports: `import main` in a fresh interpreter, now (agents load lazily) vs eager (main plus
+  the agent modules and LangChain, as it was when routes.chat imported them at load)
+- seeding: the old per-document find_one/insert loop with inline pbkdf2 vs the bulk upsert
+  seed, on an empty database and on one already at SEED_VERSION; every round-trip to the
+  in-memory database waits `--rtt` ms to stand in for the network
+
+Usage (from server/):
+    python -m benchmarks.bench_startup --runs 5 --rtt 2
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from passlib.hash import pbkdf2_sha256
+from database import seed
+from database.seed import SEED_DOCTORS, SPECIALIZATIONS
+from benchmarks.fakes import LatencyDatabase
+
+LAZY_IMPORT = "import main"
+EAGER_IMPORT = "import main, agents.triage_agent, agents.specialist_agent, agents.context, langchain_google_genai"
+
+
+def import_ms(statement: str) -> float:
+    code = f"import time; t = time.perf_counter(); {statement}; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+async def legacy_seed(db):
+    """The previous seed_database: one document at a time, hashing inline."""
+    for doc in SEED_DOCTORS:
+        if not await db.doctors.find_one({"_id": doc["_id"]}):
+            await db.doctors.insert_one(doc)
+            if not await db.users.find_one({"email": doc["email"]}):
+                await db.users.insert_one({"email": doc["email"], "role": "doctor", "doctorId": doc["_id"],
+                                           "password_hash": pbkdf2_sha256.hash("doctor123")})
+    for spec in SPECIALIZATIONS:
+        if not await db.specializations.find_one({"id": spec["id"]}):
+            await db.specializations.insert_one(spec)
+    await db.doctors.count_documents({})
+    await db.specializations.count_documents({})
+
+
+async def time_seed(seed_fn, db) -> dict:
+    db.reset_counts()
+    started = time.perf_counter()
+    await seed_fn(db)
+    return {"ms": round((time.perf_counter() - started) * 1000, 1), "roundTrips": db.round_trips}
+
+
+async def seed_results(rtt: float) -> dict:
+    results = {}
+    db = LatencyDatabase(rtt)
+    results["legacyCold"] = await time_seed(legacy_seed, db)
+    results["legacyWarm"] = await time_seed(legacy_seed, db)
+
+    db = LatencyDatabase(rtt)
+    seed.get_db = lambda: db
+    current = lambda _: seed.seed_database()
+    results["bulkCold"] = await time_seed(current, db)
+    results["bulkWarm"] = await time_seed(current, db)
+    return results
+
+
+def main(args):
+    lazy = [import_ms(LAZY_IMPORT) for _ in range(args.runs)]
+    eager = [import_ms(EAGER_IMPORT) for _ in range(args.runs)]
+    results = {
+        "importEager_ms": round(statistics.median(eager), 1),
+        "importLazy_ms": round(statistics.median(lazy), 1),
+        "seed": asyncio.run(seed_results(args.rtt / 1000)),
+    }
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per import measurement")
+    parser.add_argument("--rtt", type=float, default=2.0, help="simulated MongoDB round-trip (ms)")
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""
+Time-to-first-token vs. full-completion latency for blocking and streaming agent turns.
+
+Usage (from server/):
+    python -m benchmarks.bench_streaming --turns 20 --first-token 0.4 --tps 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from agents import triage_agent, specialist_agent
+from benchmarks.fakes import FakeChatModel
+
+REPLY = (
+    "I understand this must be uncomfortable. To help me route you correctly, could you tell me "
+    "how long the chest tightness has lasted, whether it gets worse with exercise, and if you "
+    "have noticed any palpitations or shortness of breath? " * 3
+)
+HISTORY = [
+    {"sender": "agent", "text": "Hello! What brings you in today?"},
+    {"sender": "user", "text": "I've had chest tightness for a few days."},
+]
+
+
+async def blocking_turn() -> dict:
+    started = time.perf_counter()
+    await triage_agent.get_triage_response(HISTORY, "Alex")
+    total = time.perf_counter() - started
+    # A blocking turn shows nothing until the whole completion is back
+    return {"ttft": total, "total": total}
+
+
+async def streaming_turn() -> dict:
+    started = time.perf_counter()
+    first = None
+    async for event in triage_agent.stream_triage_response(HISTORY, "Alex"):
+        if event["type"] == "token" and first is None:
+            first = time.perf_counter() - started
+    return {"ttft": first, "total": time.perf_counter() - started}
+
+
+def summarize(samples: list[dict]) -> dict:
+    out = {}
+    for key in ("ttft", "total"):
+        values = sorted(s[key] * 1000 for s in samples)
+        out[f"{key}_p50_ms"] = round(statistics.median(values), 1)
+        out[f"{key}_p95_ms"] = round(values[int(0.95 * (len(values) - 1))], 1)
+    return out
+
+
+async def main(args):
+    model = FakeChatModel(REPLY, first_token_latency=args.first_token, tokens_per_second=args.tps)
+    triage_agent.get_triage_llm = lambda: model
+    specialist_agent.get_specialist_llm = lambda: model
+
+    results = {}
+    for name, turn in (("blocking", blocking_turn), ("streaming", streaming_turn)):
+        samples = [await turn() for _ in range(args.turns)]
+        results[name] = summarize(samples)
+
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--first-token", type=float, default=0.4, help="fake LLM first-token latency (s)")
+    parser.add_argument("--tps", type=float, default=50.0, help="fake LLM tokens per second")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,570 @@
+"""
+Deterministic stand-ins used by the benchmark scripts.
+Nothing here talks to Gemini or MongoDB.
+"""
+import asyncio
+import re
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class FakeChatModel:
+    """
+    Drop-in for ChatGoogleGenerativeAI's ainvoke/astream.
+
+    Args:
+        reply: Reply text, or a callable taking the LangChain messages and returning it
+        first_token_latency: Seconds before the first token is produced
+        tokens_per_second: Generation speed after the first token
+    """
+
+    def __init__(self, reply="Thanks for sharing that. Could you tell me when the symptoms started?",
+                 first_token_latency: float = 0.4, tokens_per_second: float = 50.0, model: str = "fake-model"):
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.model = model
+        self.calls = 0
+
+    def _reply_text(self, messages) -> str:
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def _tokens(self, text: str) -> list[str]:
+        return re.findall(r"\S+\s*|\s+", text)
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        text = self._reply_text(messages)
+        await asyncio.sleep(self.first_token_latency + len(self._tokens(text)) / self.tokens_per_second)
+        return AIMessage(content=text)
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        text = self._reply_text(messages)
+        await asyncio.sleep(self.first_token_latency)
+        for token in self._tokens(text):
+            yield AIMessageChunk(content=token)
+            await asyncio.sleep(1 / self.tokens_per_second)
+
+
+# ===== In-memory MongoDB stand-in =====
+
+import copy
+from collections import Counter
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _set(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part, {})
+    doc.pop(parts[-1], None)
+
+
+def _compare(value, op, arg):
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {"$gt": value > arg, "$gte": value >= arg, "$lt": value < arg, "$lte": value <= arg}[op]
+    except TypeError:
+        return False
+
+
+def _match_value(value, cond):
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        for op, arg in cond.items():
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if isinstance(value, list):
+                    if not any(_compare(v, op, arg) for v in value):
+                        return False
+                elif not _compare(value, op, arg):
+                    return False
+            elif op == "$in":
+                if isinstance(value, list):
+                    if not any(v in arg for v in value):
+                        return False
+                elif (None if value is _MISSING else value) not in arg:
+                    return False
+            elif op == "$nin":
+                if (None if value is _MISSING else value) in arg:
+                    return False
+            elif op == "$ne":
+                if (None if value is _MISSING else value) == arg:
+                    return False
+            elif op == "$exists":
+                if (value is not _MISSING) != bool(arg):
+                    return False
+            elif op == "$elemMatch":
+                if not isinstance(value, list) or not any(_matches(v, arg) for v in value):
+                    return False
+            else:
+                raise NotImplementedError(f"FakeDatabase: unsupported operator {op}")
+        return True
+    if cond is None:
+        return value is _MISSING or value is None
+    if isinstance(value, list) and not isinstance(cond, list):
+        return cond in value
+    return value == cond
+
+
+def _matches(doc, query):
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif not _match_value(_get(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, list):
+        projection = {field: 1 for field in projection}
+    include = {k: v for k, v in projection.items() if k != "_id" and v and not isinstance(v, dict)}
+    slices = {k: v["$slice"] for k, v in projection.items() if isinstance(v, dict) and "$slice" in v}
+    if include:
+        out = {}
+        for path in include:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set(out, path, copy.deepcopy(value))
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+    else:
+        out = copy.deepcopy(doc)
+        for path, flag in projection.items():
+            if not flag and not isinstance(flag, dict):
+                _unset(out, path)
+    for path, size in slices.items():
+        value = _get(doc, path)
+        if isinstance(value, list):
+            _set(out, path, copy.deepcopy(value[size:] if size < 0 else value[:size]))
+    return out
+
+
+def _sort_key(spec):
+    def key(doc):
+        out = []
+        for field, direction in spec:
+            value = _get(doc, field)
+            rank = (0, "") if value is _MISSING or value is None else (1, value)
+            out.append(_Reverse(rank) if direction < 0 else rank)
+        return out
+    return key
+
+
+class _Reverse:
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _normalize_sort(sort):
+    if sort is None:
+        return None
+    if isinstance(sort, str):
+        return [(sort, 1)]
+    return list(sort)
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection=None, sort=None, limit=0, skip=0):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort = _normalize_sort(sort)
+        self._limit = limit
+        self._skip = skip
+        self._results = None
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def _run(self):
+        self.collection.db._count(self.collection.name, "find")
+        docs = [d for d in self.collection.docs if _matches(d, self.query)]
+        if self._sort:
+            docs.sort(key=_sort_key(self._sort))
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self.projection) for d in docs]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._results is None:
+            self._results = iter(self._run())
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        results = self._run()
+        return results[:length] if length else results
+
+
+class FakeResult:
+    def __init__(self, **kwargs):
+        self.inserted_id = kwargs.get("inserted_id")
+        self.inserted_ids = kwargs.get("inserted_ids", [])
+        self.matched_count = kwargs.get("matched_count", 0)
+        self.modified_count = kwargs.get("modified_count", 0)
+        self.upserted_id = kwargs.get("upserted_id")
+        self.deleted_count = kwargs.get("deleted_count", 0)
+        self.upserted_count = kwargs.get("upserted_count", 0)
+        self.inserted_count = kwargs.get("inserted_count", 0)
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.docs = []
+        self.unique = []
+
+    # --- helpers ---
+
+    def _check_unique(self, doc, ignore=None):
+        if any(d["_id"] == doc["_id"] for d in self.docs if d is not ignore):
+            raise DuplicateKeyError(f"duplicate _id in {self.name}")
+        for fields in self.unique:
+            values = [_get(doc, f) for f in fields]
+            if all(v is _MISSING for v in values):
+                continue
+            for d in self.docs:
+                if d is not ignore and [_get(d, f) for f in fields] == values:
+                    raise DuplicateKeyError(f"duplicate key {fields} in {self.name}")
+
+    def _insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(doc)
+        self._check_unique(stored)
+        self.docs.append(stored)
+        return doc["_id"]
+
+    def _apply(self, doc, update, inserting=False):
+        if not any(k.startswith("$") for k in update):
+            keep_id = doc["_id"]
+            doc.clear()
+            doc.update(copy.deepcopy(update))
+            doc["_id"] = keep_id
+            return
+        for op, fields in update.items():
+            for path, value in fields.items():
+                if op == "$set":
+                    _set(doc, path, copy.deepcopy(value))
+                elif op == "$setOnInsert":
+                    if inserting:
+                        _set(doc, path, copy.deepcopy(value))
+                elif op == "$unset":
+                    _unset(doc, path)
+                elif op == "$inc":
+                    current = _get(doc, path)
+                    _set(doc, path, (0 if current is _MISSING else current) + value)
+                elif op in ("$push", "$addToSet"):
+                    current = _get(doc, path)
+                    if current is _MISSING:
+                        current = []
+                        _set(doc, path, current)
+                    items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                    for item in items:
+                        if op == "$push" or item not in current:
+                            current.append(copy.deepcopy(item))
+                    if isinstance(value, dict) and "$slice" in value:
+                        size = value["$slice"]
+                        _set(doc, path, current[size:] if size < 0 else current[:size])
+                elif op == "$pull":
+                    current = _get(doc, path)
+                    if isinstance(current, list):
+                        keep = [v for v in current if not (
+                            _matches(v, value) if isinstance(value, dict) else v == value)]
+                        _set(doc, path, keep)
+                elif op == "$min":
+                    current = _get(doc, path)
+                    if current is _MISSING or value < current:
+                        _set(doc, path, value)
+                elif op == "$max":
+                    current = _get(doc, path)
+                    if current is _MISSING or value > current:
+                        _set(doc, path, value)
+                else:
+                    raise NotImplementedError(f"FakeDatabase: unsupported update {op}")
+
+    def _upsert_doc(self, query, update):
+        doc = {}
+        for k, v in query.items():
+            if not k.startswith("$") and not (isinstance(v, dict) and any(x.startswith("$") for x in v)):
+                _set(doc, k, copy.deepcopy(v))
+        doc.setdefault("_id", ObjectId())
+        self._apply(doc, update, inserting=True)
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc
+
+    def _first(self, query, sort=None):
+        docs = [d for d in self.docs if _matches(d, query)]
+        sort = _normalize_sort(sort)
+        if sort:
+            docs.sort(key=_sort_key(sort))
+        return docs[0] if docs else None
+
+    def _update(self, query, update, upsert=False, many=False):
+        matched = [d for d in self.docs if _matches(d, query)]
+        if not many:
+            matched = matched[:1]
+        if not matched and upsert:
+            doc = self._upsert_doc(query, update)
+            return FakeResult(upserted_id=doc["_id"], upserted_count=1)
+        modified = 0
+        for doc in matched:
+            before = copy.deepcopy(doc)
+            self._apply(doc, update)
+            self._check_unique(doc, ignore=doc)
+            modified += doc != before
+        return FakeResult(matched_count=len(matched), modified_count=modified)
+
+    # --- motor API ---
+
+    async def create_index(self, keys, unique=False, **kwargs):
+        self.db._count(self.name, "createIndexes")
+        fields = [keys] if isinstance(keys, str) else [k for k, _ in keys]
+        if unique and fields not in self.unique:
+            self.unique.append(fields)
+        return "_".join(fields)
+
+    async def find_one(self, query=None, projection=None, sort=None, session=None, **kwargs):
+        self.db._count(self.name, "find")
+        doc = self._first(query or {}, sort)
+        return _project(doc, projection) if doc else None
+
+    def find(self, query=None, projection=None, sort=None, limit=0, skip=0, session=None, **kwargs):
+        return FakeCursor(self, query or {}, projection, sort, limit, skip)
+
+    async def insert_one(self, doc, session=None, **kwargs):
+        self.db._count(self.name, "insert")
+        return FakeResult(inserted_id=self._insert(doc))
+
+    async def insert_many(self, docs, ordered=True, session=None, **kwargs):
+        self.db._count(self.name, "insert")
+        return FakeResult(inserted_ids=[self._insert(d) for d in docs])
+
+    async def update_one(self, query, update, upsert=False, session=None, **kwargs):
+        self.db._count(self.name, "update")
+        return self._update(query, update, upsert)
+
+    async def update_many(self, query, update, upsert=False, session=None, **kwargs):
+        self.db._count(self.name, "update")
+        return self._update(query, update, upsert, many=True)
+
+    async def replace_one(self, query, doc, upsert=False, session=None, **kwargs):
+        self.db._count(self.name, "update")
+        return self._update(query, doc, upsert)
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, session=None, **kwargs):
+        self.db._count(self.name, "findAndModify")
+        doc = self._first(query, sort)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self._upsert_doc(query, update)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        before = _project(doc, projection)
+        self._apply(doc, update)
+        return _project(doc, projection) if return_document == ReturnDocument.AFTER else before
+
+    async def find_one_and_delete(self, query, projection=None, sort=None, session=None, **kwargs):
+        self.db._count(self.name, "findAndModify")
+        doc = self._first(query, sort)
+        if doc is None:
+            return None
+        self.docs.remove(doc)
+        return _project(doc, projection)
+
+    async def delete_one(self, query, session=None, **kwargs):
+        self.db._count(self.name, "delete")
+        doc = self._first(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return FakeResult(deleted_count=int(doc is not None))
+
+    async def delete_many(self, query, session=None, **kwargs):
+        self.db._count(self.name, "delete")
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+        return FakeResult(deleted_count=before - len(self.docs))
+
+    async def count_documents(self, query, session=None, **kwargs):
+        self.db._count(self.name, "count")
+        return sum(1 for d in self.docs if _matches(d, query))
+
+    async def estimated_document_count(self, **kwargs):
+        self.db._count(self.name, "count")
+        return len(self.docs)
+
+    async def bulk_write(self, requests, ordered=True, session=None, **kwargs):
+        """Applies pymongo InsertOne/UpdateOne/UpdateMany/DeleteOne request objects in one round-trip."""
+        self.db._count(self.name, "bulkWrite")
+        result = FakeResult()
+        for req in requests:
+            kind = type(req).__name__
+            doc = getattr(req, "_doc", None)
+            query = getattr(req, "_filter", None)
+            if kind == "InsertOne":
+                self._insert(doc)
+                result.inserted_count += 1
+            elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                r = self._update(query, doc, getattr(req, "_upsert", False), many=kind == "UpdateMany")
+                result.matched_count += r.matched_count
+                result.modified_count += r.modified_count
+                result.upserted_count += r.upserted_count
+            elif kind in ("DeleteOne", "DeleteMany"):
+                before = len(self.docs)
+                if kind == "DeleteOne":
+                    first = self._first(query)
+                    if first is not None:
+                        self.docs.remove(first)
+                else:
+                    self.docs = [d for d in self.docs if not _matches(d, query)]
+                result.deleted_count += before - len(self.docs)
+        return result
+
+
+class FakeDatabase:
+    """
+    Minimal async stand-in for a motor database, backed by Python lists.
+    Every call that would be a network round-trip increments `ops`.
+    """
+
+    def __init__(self):
+        self._collections = {}
+        self.ops = Counter()
+
+    def _count(self, collection, op):
+        self.ops[f"{collection}.{op}"] += 1
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.ops.values())
+
+    def reset_counts(self):
+        self.ops.clear()
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, name, *args, **kwargs):
+        self._count("admin", name)
+        return {"ok": 1}
+
+
+class _LatencyCursor:
+    """FakeCursor that waits one round-trip before yielding its first document."""
+
+    def __init__(self, cursor, rtt):
+        self.cursor, self.rtt = cursor, rtt
+
+    def sort(self, *args, **kwargs):
+        self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n):
+        self.cursor.limit(n)
+        return self
+
+    def skip(self, n):
+        self.cursor.skip(n)
+        return self
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(self.rtt)
+        return await self.cursor.to_list(length)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self.rtt)
+        async for doc in self.cursor:
+            yield doc
+
+
+class _LatencyCollection:
+    """Delegates to a FakeCollection, sleeping one RTT per round-trip."""
+
+    def __init__(self, collection, rtt):
+        self.collection, self.rtt = collection, rtt
+
+    def find(self, *args, **kwargs):
+        return _LatencyCursor(self.collection.find(*args, **kwargs), self.rtt)
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self.rtt)
+            return await method(*args, **kwargs)
+        return call
+
+
+class LatencyDatabase(FakeDatabase):
+    """FakeDatabase where every round-trip takes `rtt` seconds, standing in for the network."""
+
+    def __init__(self, rtt: float):
+        super().__init__()
+        self.rtt = rtt
+
+    def __getitem__(self, name):
+        collection = super().__getitem__(name)
+        return _LatencyCollection(collection, self.rtt) if self.rtt else collection
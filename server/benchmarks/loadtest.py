@@ -0,0 +1,287 @@
+"""
+In-process load test of full patient journeys.
+
+Runs the real FastAPI app (lifespan included: seeding, catalog, event hub, job queue,
+password pool) through httpx's ASGITransport, with FakeChatModel standing in for Gemini and
+a LatencyDatabase standing in for MongoDB — no API quota and no mongod needed.
+
+Each virtual patient: register, login, triage chat until routed, wait out the web client's
+routing screens (--routing-delay), specialist chat until the report is generated, read the
+chat back; then the assigned doctor logs in, claims the next report from their queue and
+reviews it, and the patient checks notifications. The fake
+model follows cues in the patient's last message ("[[route:<spec>]]", "[[report]]"), so
+journeys take a fixed number of turns.
+
+A second phase keeps one triage chat going for --sweep-turns turns and records /send
+latency against the number of messages already in the session.
+
+Prints (and with --out writes) JSON: throughput, p50/p95/p99 per endpoint, the session
+length sweep and MongoDB round-trips per operation.
+
+Usage (from server/):
+    python -m benchmarks.loadtest --patients 50 --concurrency 10 --first-token 0.3 --tps 80 \\
+        --db-rtt 1 --out loadtest.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.fakes import FakeChatModel, LatencyDatabase
+from config import settings
+
+SPECIALIZATIONS = ["cardiology", "dermatology", "orthopedics", "neurology", "pulmonology"]
+SYMPTOMS = {
+    "cardiology": "my chest feels tight when I climb stairs",
+    "dermatology": "I have an itchy rash on my arms",
+    "orthopedics": "my knee hurts after running",
+    "neurology": "I keep getting migraines in the afternoon",
+    "pulmonology": "I have had a dry cough for two weeks",
+}
+FOLLOW_UPS = [
+    "It started about a week ago.",
+    "It's worse in the evening.",
+    "No, nothing like this before.",
+    "I've tried rest but it hasn't helped much.",
+    "It's about a 5 out of 10.",
+]
+REPORT_JSON = json.dumps({
+    "summary": "Symptoms described over several days; no red flags reported.",
+    "findings": ["Onset about a week ago", "Worse in the evening", "Moderate severity"],
+    "suggestions": ["Clinical examination", "Track symptoms daily", "Follow up if worsening"],
+})
+
+# Filled from SEED_DOCTORS once the app is imported
+DOCTOR_EMAILS = {}
+
+
+def scripted_reply(messages) -> str:
+    """What the fake model says, driven by cues in the latest patient message."""
+    last_human = next((m.content for m in reversed(messages) if m.type == "human"), "")
+    if "[[route:" in last_human:
+        spec = last_human.split("[[route:", 1)[1].split("]]", 1)[0]
+        return f"Thank you, that helps. I'll connect you with our {spec} specialist now.\nROUTE_TO_SPECIALIST:{spec}"
+    if "[[report]]" in last_human:
+        return f"Thank you, I have what I need and I'm preparing your report.\nGENERATE_REPORT:\n{REPORT_JSON}"
+    return "I see. Could you tell me a little more — when did it start, and does anything make it better or worse?"
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def latency_summary(samples: list[float]) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 1),
+        "p50_ms": round(percentile(ms, 0.50), 1),
+        "p95_ms": round(percentile(ms, 0.95), 1),
+        "p99_ms": round(percentile(ms, 0.99), 1),
+        "max_ms": round(max(ms), 1),
+    }
+
+
+class Recorder:
+    """Times every request by endpoint name and retries 409/429/503 after Retry-After, like a client would."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.throttled = 0
+
+    async def call(self, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        for _ in range(20):
+            started = time.perf_counter()
+            response = await self.client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - started
+            if response.status_code in (409, 429, 503) and "retry-after" in response.headers:
+                self.throttled += 1
+                await asyncio.sleep(min(float(response.headers.get("retry-after", 1)), 5))
+                continue
+            self.latencies[name].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[f"{name} {response.status_code}"] += 1
+            return response
+        raise RuntimeError(f"{name} still throttled after 20 attempts")
+
+
+async def chat_turn(rec: Recorder, session_id: str, text: str, stream: bool) -> dict:
+    body = {"sender": "user", "text": text}
+    # Retries after a throttle reuse the key, as the web client does
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    if not stream:
+        response = await rec.call("POST /api/chat/{id}/send", "POST", f"/api/chat/{session_id}/send",
+                                  json=body, headers=headers)
+        return response.json()
+    response = await rec.call("POST /api/chat/{id}/stream", "POST", f"/api/chat/{session_id}/stream",
+                              json=body, headers=headers)
+    done = response.text.rsplit("event: done\ndata: ", 1)[-1].split("\n", 1)[0]
+    return json.loads(done)
+
+
+async def patient_journey(rec: Recorder, n: int, args) -> dict:
+    spec = SPECIALIZATIONS[n % len(SPECIALIZATIONS)]
+    email = f"patient{n}@load.test"
+    await rec.call("POST /api/auth/register", "POST", "/api/auth/register", json={
+        "email": email, "password": "patient-pass", "firstName": f"Pat{n}", "lastName": "Load"})
+    login = await rec.call("POST /api/auth/login", "POST", "/api/auth/login",
+                           json={"email": email, "password": "patient-pass"})
+    user_id = login.json()["user"]["id"]
+
+    triage = (await rec.call("POST /api/sessions", "POST", "/api/sessions", params={"user_id": user_id},
+                             json={"type": "triage"})).json()
+    turns = [SYMPTOMS[spec], *FOLLOW_UPS][:max(args.triage_turns, 1)]
+    turns[-1] += f" [[route:{spec}]]"
+    for text in turns:
+        result = await chat_turn(rec, triage["id"], text, args.stream)
+    routed = result.get("routeTo") == spec
+    # The web client shows the routing screens (TriageChat, then AgentRouting) before it
+    # opens the specialist chat; the specialist prewarm job runs in that gap
+    await asyncio.sleep(args.routing_delay)
+
+    specialist = (await rec.call("POST /api/sessions", "POST", "/api/sessions", params={"user_id": user_id},
+                                 json={"type": "specialist", "specialization": spec})).json()
+    turns = FOLLOW_UPS[:max(args.specialist_turns, 1)]
+    turns[-1] += " [[report]]"
+    for text in turns:
+        result = await chat_turn(rec, specialist["id"], text, args.stream)
+    report_id = result.get("reportId")
+    await rec.call("GET /api/chat/{id}/messages", "GET", f"/api/chat/{specialist['id']}/messages")
+
+    # The assigned doctor picks up the next report in their queue (not necessarily this one)
+    doctor = await rec.call("POST /api/auth/login", "POST", "/api/auth/login", json={
+        "email": DOCTOR_EMAILS[spec], "password": "doctor123", "role": "doctor"})
+    doctor_id = doctor.json()["user"]["doctorId"]
+    await rec.call("GET /api/reports/queue/{doctor}", "GET", f"/api/reports/queue/{doctor_id}")
+    claimed = (await rec.call("POST /api/reports/queue/{doctor}/claim", "POST",
+                              f"/api/reports/queue/{doctor_id}/claim")).json()["report"]
+    reviewed = False
+    if claimed:
+        review = await rec.call("POST /api/reports/{id}/review", "POST", f"/api/reports/{claimed['id']}/review",
+                                params={"doctor_id": doctor_id, "lease_token": claimed["lease"]["token"]},
+                                json={"notes": "Reviewed.", "recommendations": "Follow up in two weeks."})
+        reviewed = review.status_code == 200
+
+    await rec.call("GET /api/notifications", "GET", "/api/notifications", params={"user_id": user_id})
+    return {"routed": routed, "prewarmed": bool(specialist.get("prewarmed")), "report": bool(report_id),
+            "reviewed": reviewed}
+
+
+async def session_length_sweep(rec: Recorder, args) -> dict:
+    """One long triage chat; /send latency grouped by how many messages the session already has."""
+    await rec.call("register", "POST", "/api/auth/register", json={
+        "email": "sweep@load.test", "password": "patient-pass", "firstName": "Sweep", "lastName": "Load"})
+    login = await rec.call("login", "POST", "/api/auth/login",
+                           json={"email": "sweep@load.test", "password": "patient-pass"})
+    session = (await rec.call("session", "POST", "/api/sessions",
+                              params={"user_id": login.json()["user"]["id"]}, json={"type": "triage"})).json()
+    buckets = defaultdict(list)
+    for turn in range(args.sweep_turns):
+        started = time.perf_counter()
+        await chat_turn(rec, session["id"], FOLLOW_UPS[turn % len(FOLLOW_UPS)], stream=False)
+        existing = turn * 2  # user + agent message per earlier turn
+        upper = 1
+        while upper <= existing:
+            upper *= 2
+        buckets[f"{upper // 2}-{upper - 1} messages"].append(time.perf_counter() - started)
+    return {name: latency_summary(samples) for name, samples in buckets.items()}
+
+
+async def run(args) -> dict:
+    import main
+    from agents import llm
+    from database import connection
+    from database.seed import SEED_DOCTORS
+
+    DOCTOR_EMAILS.update({d["specialization"]: d["email"] for d in SEED_DOCTORS})
+    settings.LLM_CACHE_AGENTS = "triage" if args.llm_cache else ""
+    if args.llm_concurrency:
+        from services.llm_scheduler import scheduler
+        scheduler.default_limit = args.llm_concurrency
+    db = LatencyDatabase(args.db_rtt / 1000)
+    fake = FakeChatModel(scripted_reply, first_token_latency=args.first_token, tokens_per_second=args.tps)
+
+    async def connect_fake_db():
+        connection.db = db
+
+    async def close_fake_db():
+        connection.db = None
+
+    main.connect_db, main.close_db = connect_fake_db, close_fake_db
+    main.init_llm_registry = lambda: llm.init_llm_registry(lambda **kwargs: fake)
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+            rec = Recorder(client)
+            db.reset_counts()
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one(n):
+                async with semaphore:
+                    return await patient_journey(rec, n, args)
+
+            started = time.perf_counter()
+            journeys = await asyncio.gather(*(one(n) for n in range(args.patients)))
+            wall = time.perf_counter() - started
+            round_trips = dict(sorted(db.ops.items()))
+
+            sweep = await session_length_sweep(Recorder(client), args) if args.sweep_turns else {}
+
+    requests = sum(len(v) for v in rec.latencies.values())
+    return {
+        "config": vars(args),
+        "summary": {
+            "wall_s": round(wall, 2),
+            "journeys": len(journeys),
+            "journeysPerSecond": round(len(journeys) / wall, 2),
+            "requests": requests,
+            "requestsPerSecond": round(requests / wall, 1),
+            "routed": sum(j["routed"] for j in journeys),
+            "prewarmedSpecialistChats": sum(j["prewarmed"] for j in journeys),
+            "reportsGenerated": sum(j["report"] for j in journeys),
+            "reviewed": sum(j["reviewed"] for j in journeys),
+            "throttled": rec.throttled,
+            "errors": dict(rec.errors),
+            "llmCalls": fake.calls,
+        },
+        "endpoints": {name: latency_summary(samples) for name, samples in sorted(rec.latencies.items())},
+        "sessionLength": sweep,
+        "mongoRoundTrips": round_trips,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patients", type=int, default=20, help="patient journeys to run")
+    parser.add_argument("--concurrency", type=int, default=5, help="journeys in flight at once")
+    parser.add_argument("--triage-turns", type=int, default=3)
+    parser.add_argument("--specialist-turns", type=int, default=3)
+    parser.add_argument("--routing-delay", type=float, default=5.0,
+                        help="seconds between routing and opening the specialist chat, as in the web client")
+    parser.add_argument("--sweep-turns", type=int, default=40, help="turns in the session-length sweep (0 = skip)")
+    parser.add_argument("--stream", action="store_true", help="chat through /stream instead of /send")
+    parser.add_argument("--llm-cache", action="store_true", help="cache triage replies (LLM_CACHE_AGENTS=triage)")
+    parser.add_argument("--llm-concurrency", type=int, help="override LLM_MAX_CONCURRENCY per model")
+    parser.add_argument("--first-token", type=float, default=0.3, help="fake LLM first-token latency (s)")
+    parser.add_argument("--tps", type=float, default=80.0, help="fake LLM tokens per second")
+    parser.add_argument("--db-rtt", type=float, default=1.0, help="simulated MongoDB round-trip (ms)")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    args = parser.parse_args()
+    # The app's own log lines go to stderr so stdout is just the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
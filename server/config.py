@@ -14,6 +14,84 @@ class Settings(BaseSettings):
     # Gemini model names
     TRIAGE_MODEL: str = "gemini-2.5-flash"
     SPECIALIST_MODEL: str = "gemini-2.5-flash" #gemini-2.5-pro-preview-06-05
+    SUMMARY_MODEL: str = "gemini-2.5-flash"
+
+    # Prompt token budgets — older turns are folded into a rolling summary
+    TRIAGE_CONTEXT_TOKENS: int = 3000
+    SPECIALIST_CONTEXT_TOKENS: int = 6000
+    CONTEXT_RECENT_MESSAGES: int = 6
+    CONTEXT_FOLD_RATIO: float = 0.75
+
+    # Upper bound for long-poll waits on GET /api/chat/{session_id}/messages
+    LONG_POLL_MAX_SECONDS: int = 30
+
+    # Cross-worker event fan-out: "local" (single worker) or "mongo" (change stream, needs a replica set)
+    EVENT_BROKER: str = "local"
+
+    # Read notifications are removed by a TTL index this many days after being read
+    NOTIFICATION_READ_TTL_DAYS: int = 30
+
+    # How long a doctor's claim on a report lasts without renewal
+    REVIEW_LEASE_SECONDS: int = 900
+
+    # Local triage classifier — routes without the LLM above THRESHOLD, hints above HINT_THRESHOLD
+    TRIAGE_CLASSIFIER_PATH: str = "artifacts/triage_classifier.json"
+    TRIAGE_CLASSIFIER_THRESHOLD: float = 0.85
+    TRIAGE_CLASSIFIER_HINT_THRESHOLD: float = 0.6
+    TRIAGE_CLASSIFIER_MIN_USER_MESSAGES: int = 2
+
+    # LLM response cache — comma-separated agents that opt in ("triage", "specialist"); off by default.
+    # A hit replays one sampled reply to every patient whose opening matches, so phrasing stops varying;
+    # DETERMINISTIC_ONLY limits it to temperature-0 models, where a fresh call would say the same
+    LLM_CACHE_AGENTS: str = ""
+    LLM_CACHE_MEMORY_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAX_USER_TURNS: int = 1
+    LLM_CACHE_DETERMINISTIC_ONLY: bool = False
+
+    # Background jobs (report follow-ups) — workers per process, retries with exponential backoff
+    JOB_WORKERS: int = 4
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: int = 120
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_SECONDS: float = 2.0
+    JOB_RETRY_MAX_SECONDS: float = 300.0
+    JOB_RETENTION_DAYS: int = 7
+
+    # LLM admission: concurrent calls per model ("model=n,..." overrides), queue bounds and max wait
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MODEL_CONCURRENCY: str = ""
+    LLM_QUEUE_MAX: int = 64
+    LLM_QUEUE_MAX_PER_CALLER: int = 2
+    LLM_QUEUE_MAX_WAIT_SECONDS: float = 20.0
+    # Per LLM request (the provider client gives up after this long)
+    LLM_TIMEOUT_SECONDS: float = 60.0
+
+    # Chat turns run one at a time per session under a renewed lease; other sends wait up to WAIT_SECONDS
+    TURN_LEASE_SECONDS: int = 30
+    TURN_WAIT_SECONDS: float = 60.0
+    TURN_RETENTION_HOURS: int = 24
+
+    # Prepare the specialist chat (session + opening message) when triage routes; opening the chat uses
+    # one if it is ready (never waits), and unclaimed ones are deleted after TTL_SECONDS
+    SPECIALIST_PREWARM: bool = True
+    SPECIALIST_PREWARM_TTL_SECONDS: int = 1800
+
+    # Browser cache lifetime for the catalog endpoints (doctors carry live availability)
+    CATALOG_DOCTORS_MAX_AGE: int = 15
+    CATALOG_SPECIALIZATIONS_MAX_AGE: int = 3600
+
+    # Per-process cache of compact user records used by chat turns and follow-up jobs
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 300
+
+    # Import the agent modules on a background thread once the app is up
+    AGENT_WARMUP: bool = True
+
+    # Password hashing runs on a process pool; beyond MAX_PENDING calls, logins get 429
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER: int = 1
 
     class Config:
         env_file = ".env"
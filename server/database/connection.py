@@ -1,20 +1,51 @@
+from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import settings
+from services.metrics import MongoCommandMetrics
 
 client: AsyncIOMotorClient = None
 db = None
+supports_transactions = False
 
 async def connect_db():
-    global client, db
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    global client, db, supports_transactions
+    client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[MongoCommandMetrics()])
     db = client[settings.DATABASE_NAME]
+    # Multi-document transactions need a replica set or sharded cluster
+    hello = await client.admin.command("hello")
+    supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
     # Create indexes
     await db.users.create_index("email", unique=True)
     await db.sessions.create_index("userId")
-    await db.reports.create_index("userId")
-    await db.reports.create_index("assignedDoctor")
-    await db.notifications.create_index("userId")
-    print(f"✅ Connected to MongoDB: {settings.DATABASE_NAME}")
+    # Latest completed triage of a patient (handoff lookup when a specialist chat opens)
+    await db.sessions.create_index([("userId", 1), ("type", 1), ("status", 1), ("createdAt", -1)])
+    await db.messages.create_index([("sessionId", 1), ("seq", 1)], unique=True)
+    await db.messages.create_index([("sessionId", 1), ("id", 1)])
+    # Report listings: keyset on (createdAt, _id) behind each supported filter
+    await db.reports.create_index([("createdAt", -1), ("_id", -1)])
+    await db.reports.create_index([("userId", 1), ("createdAt", -1), ("_id", -1)])
+    await db.reports.create_index([("userId", 1), ("status", 1), ("createdAt", -1), ("_id", -1)])
+    await db.reports.create_index([("status", 1), ("createdAt", -1), ("_id", -1)])
+    await db.reports.create_index([("specialization", 1), ("status", 1), ("createdAt", -1), ("_id", -1)])
+    await db.reports.create_index([("assignedDoctor", 1), ("status", 1), ("createdAt", 1), ("_id", 1)])
+    # Reports finalized since a date (doctor dashboard stats)
+    await db.reports.create_index([("status", 1), ("updatedAt", -1)])
+    await db.notifications.create_index([("userId", 1), ("createdAt", -1), ("_id", -1)])
+    await db.notifications.create_index([("userId", 1), ("read", 1), ("createdAt", -1)])
+    await db.notifications.create_index("expireAt", expireAfterSeconds=0)
+    await db.notifications.create_index(
+        "dedupeKey", unique=True, partialFilterExpression={"dedupeKey": {"$exists": True}}
+    )
+    await db.llm_cache.create_index("expireAt", expireAfterSeconds=0)
+    await db.jobs.create_index([("status", 1), ("runAt", 1)])
+    await db.jobs.create_index([("status", 1), ("lockedUntil", 1)])
+    await db.jobs.create_index(
+        "dedupeKey", unique=True, partialFilterExpression={"dedupeKey": {"$exists": True}}
+    )
+    await db.jobs.create_index("expireAt", expireAfterSeconds=0)
+    # Finished chat turns (keyed by "<sessionId>:<idempotency key>") are kept for replays, then dropped
+    await db.turns.create_index("expireAt", expireAfterSeconds=0)
+    print(f"✅ Connected to MongoDB: {settings.DATABASE_NAME} (transactions: {'on' if supports_transactions else 'off'})")
 
 async def close_db():
     global client
@@ -24,3 +55,16 @@ async def close_db():
 
 def get_db():
     return db
+
+@asynccontextmanager
+async def write_transaction():
+    """
+    Yield a client session inside a transaction when the deployment supports it,
+    otherwise None (pass it straight through as `session=` to motor calls).
+    """
+    if not supports_transactions or client is None:
+        yield None
+        return
+    async with await client.start_session() as s:
+        async with s.start_transaction():
+            yield s
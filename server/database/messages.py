@@ -0,0 +1,111 @@
+"""
+Chat messages live in their own `messages` collection — one document per message,
+ordered within a session by `seq`. Sequence numbers come from the session's
+`messageSeq` counter, which is incremented atomically, so concurrent writers never
+collide (a reserved number whose write fails simply leaves a gap).
+"""
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+# What API clients see — internal keys stay in the database
+MESSAGE_PROJECTION = {"_id": 0, "sessionId": 0}
+
+
+def message_preview(msg: dict) -> dict:
+    """Compact copy of a message kept on the session for list views."""
+    return {
+        "text": (msg.get("text") or "")[:200],
+        "sender": msg.get("sender"),
+        "timestamp": msg.get("timestamp"),
+    }
+
+
+def new_session(user_id: str, type: str, specialization: str = None, messages: list[dict] = None,
+                assigned_doctor: str = None, status: str = "active") -> dict:
+    """A session document whose counters already account for `messages` (stored separately, seq 1..n)."""
+    messages = messages or []
+    now = datetime.utcnow().isoformat()
+    return {
+        "userId": user_id,
+        "type": type,
+        "specialization": specialization,
+        "status": status,
+        "messageSeq": len(messages),
+        "messageCount": len(messages),
+        "userMessageCount": sum(1 for m in messages if m.get("sender") == "user"),
+        "lastMessage": message_preview(messages[-1]) if messages else None,
+        "uploads": [],
+        "assignedDoctor": assigned_doctor,
+        "reportId": None,
+        "contextSummary": None,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+async def reserve_seq(db, session_id: str, count: int = 1, update: dict = None, projection: dict = None):
+    """
+    Atomically reserve `count` sequence numbers on a session.
+
+    Returns:
+        (session, first_seq) — session is the updated document (projected) or None if missing
+    """
+    update = dict(update or {})
+    update["$inc"] = {**update.get("$inc", {}), "messageSeq": count}
+    session = await db.sessions.find_one_and_update(
+        {"_id": ObjectId(session_id)},
+        update,
+        projection={**(projection or {"_id": 1}), "messageSeq": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not session:
+        return None, 0
+    return session, session["messageSeq"] - count + 1
+
+
+async def insert_messages(db, session_id: str, msgs: list[dict], session=None):
+    """Store messages that already carry their `seq`."""
+    docs = [{**m, "sessionId": session_id} for m in msgs]
+    if docs:
+        await db.messages.insert_many(docs, session=session)
+
+
+async def append_message(db, session_id: str, msg: dict, extra_set: dict = None):
+    """
+    Append one message to a session: reserve its seq, bump counters and store it.
+
+    Returns:
+        (session, msg) — session holds `userId`; both are None if the session doesn't exist
+    """
+    session, seq = await reserve_seq(db, session_id, 1, {
+        "$inc": {"messageCount": 1},
+        "$set": {"lastMessage": message_preview(msg), **(extra_set or {})},
+    }, projection={"userId": 1})
+    if not session:
+        return None, None
+    msg = {**msg, "seq": seq}
+    await insert_messages(db, session_id, [msg])
+    return session, msg
+
+
+async def load_messages(db, session_id: str, after_seq: int = 0, before_seq: int = None,
+                        include_hidden: bool = False) -> list[dict]:
+    """Messages of a session in order, optionally only the slice after/before a seq."""
+    seq_range = {"$gt": after_seq}
+    if before_seq is not None:
+        seq_range["$lt"] = before_seq
+    query = {"sessionId": session_id, "seq": seq_range}
+    if include_hidden and after_seq:
+        # Pinned handoff context sits at the start of the session
+        query = {"sessionId": session_id, "$or": [{"seq": seq_range}, {"type": "hidden"}]}
+    cursor = db.messages.find(query, MESSAGE_PROJECTION).sort("seq", 1)
+    return [doc async for doc in cursor]
+
+
+async def load_recent_messages(db, session_id: str, limit: int) -> list[dict]:
+    """The newest `limit` messages of a session, oldest first."""
+    cursor = db.messages.find({"sessionId": session_id}, MESSAGE_PROJECTION).sort("seq", -1).limit(limit)
+    docs = [doc async for doc in cursor]
+    docs.reverse()
+    return docs
@@ -0,0 +1,56 @@
+"""
+One-off migration: move embedded `sessions.messages` arrays into the `messages` collection.
+
+Idempotent — messages are upserted on (sessionId, seq), so the script can be re-run
+after an interruption. Run from server/:
+    python -m database.migrate_messages [--dry-run] [--keep-embedded]
+"""
+import argparse
+import asyncio
+from pymongo import UpdateOne
+from database import connection
+from database.messages import message_preview
+
+
+async def migrate(dry_run: bool = False, keep_embedded: bool = False):
+    await connection.connect_db()
+    db = connection.get_db()
+    migrated = 0
+    moved = 0
+
+    cursor = db.sessions.find({"messages.0": {"$exists": True}}, {"messages": 1, "messageSeq": 1})
+    async for session in cursor:
+        session_id = str(session["_id"])
+        messages = session["messages"]
+        ops = [
+            UpdateOne(
+                {"sessionId": session_id, "seq": seq},
+                {"$setOnInsert": {**msg, "sessionId": session_id, "seq": seq}},
+                upsert=True,
+            )
+            for seq, msg in enumerate(messages, start=1)
+        ]
+        if not dry_run:
+            await db.messages.bulk_write(ops, ordered=False)
+            update = {
+                "$max": {"messageSeq": len(messages)},
+                "$set": {"messageCount": len(messages),
+                         "userMessageCount": sum(1 for m in messages if m.get("sender") == "user"),
+                         "lastMessage": message_preview(messages[-1])},
+            }
+            if not keep_embedded:
+                update["$unset"] = {"messages": ""}
+            await db.sessions.update_one({"_id": session["_id"]}, update)
+        migrated += 1
+        moved += len(messages)
+
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {migrated} sessions ({moved} messages)")
+    await connection.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded session messages into the messages collection")
+    parser.add_argument("--dry-run", action="store_true", help="count what would move without writing")
+    parser.add_argument("--keep-embedded", action="store_true", help="leave the old arrays in place")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.dry_run, args.keep_embedded))
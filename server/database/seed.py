@@ -1,3 +1,7 @@
+import asyncio
+import re
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from database.connection import get_db
 from passlib.hash import pbkdf2_sha256
 
@@ -22,6 +26,9 @@ SPECIALIZATIONS = [
      "description": "General health concerns", "keywords": []},
 ]
 
+# Bump whenever SPECIALIZATIONS or SEED_DOCTORS change so running deployments re-seed
+SEED_VERSION = 1
+
 # Seeded doctors — each assigned to one specialization
 SEED_DOCTORS = [
     {"_id": "doc_cardiology", "name": "Dr. Sarah Chen", "email": "sarah.chen@hal.health",
@@ -39,45 +46,67 @@ SEED_DOCTORS = [
 ]
 
 async def seed_database():
-    """Seed doctors and create their user accounts if they don't exist."""
+    """
+    Upsert doctors, their user accounts and specializations in one bulk write per collection.
+    Skipped entirely (a single find_one) once the database is at SEED_VERSION.
+    """
     db = get_db()
-    
-    # Seed doctors
-    for doc in SEED_DOCTORS:
-        existing = await db.doctors.find_one({"_id": doc["_id"]})
-        if not existing:
-            await db.doctors.insert_one(doc)
-            # Also create a user account for each doctor
-            user_exists = await db.users.find_one({"email": doc["email"]})
-            if not user_exists:
-                await db.users.insert_one({
-                    "email": doc["email"],
-                    "password_hash": pbkdf2_sha256.hash("doctor123"),  # Default password
-                    "role": "doctor",
-                    "firstName": doc["name"].split(". ")[1].split(" ")[0] if ". " in doc["name"] else doc["name"],
-                    "lastName": doc["name"].split()[-1],
-                    "doctorId": doc["_id"],
-                    "specialization": doc["specialization"],
-                    "profileComplete": True,
-                })
-    
-    # Seed specializations
-    for spec in SPECIALIZATIONS:
-        existing = await db.specializations.find_one({"id": spec["id"]})
-        if not existing:
-            await db.specializations.insert_one(spec)
-    
-    doc_count = await db.doctors.count_documents({})
-    spec_count = await db.specializations.count_documents({})
-    print(f"✅ Seeded {doc_count} doctors and {spec_count} specializations")
+    marker = await db.meta.find_one({"_id": "seed"}, {"version": 1})
+    if marker and marker.get("version") == SEED_VERSION:
+        print(f"✅ Seed data already at version {SEED_VERSION}")
+        return
+
+    # Only doctors without an account need a password hash. Hashed inline: this runs once at
+    # start-up before requests are served, and spinning up the password pool for six hashes
+    # costs far more than the hashes themselves
+    emails = [doc["email"] for doc in SEED_DOCTORS]
+    existing = {u["email"] async for u in db.users.find({"email": {"$in": emails}}, {"email": 1})}
+    new_doctors = [doc for doc in SEED_DOCTORS if doc["email"] not in existing]
+    hashes = [pbkdf2_sha256.hash("doctor123") for _ in new_doctors]  # Default password
+
+    doctor_ops = [
+        # Catalogue fields follow the seed; status is live state and only set on first insert
+        UpdateOne({"_id": doc["_id"]}, {
+            "$set": {k: v for k, v in doc.items() if k not in ("_id", "status")},
+            "$setOnInsert": {"status": doc["status"]},
+        }, upsert=True)
+        for doc in SEED_DOCTORS
+    ]
+    user_ops = [
+        UpdateOne({"email": doc["email"]}, {"$setOnInsert": {
+            "email": doc["email"],
+            "password_hash": password_hash,
+            "role": "doctor",
+            "firstName": doc["name"].split(". ")[1].split(" ")[0] if ". " in doc["name"] else doc["name"],
+            "lastName": doc["name"].split()[-1],
+            "doctorId": doc["_id"],
+            "specialization": doc["specialization"],
+            "profileComplete": True,
+        }}, upsert=True)
+        for doc, password_hash in zip(new_doctors, hashes)
+    ]
+    spec_ops = [UpdateOne({"id": spec["id"]}, {"$set": spec}, upsert=True) for spec in SPECIALIZATIONS]
+
+    try:
+        await asyncio.gather(
+            db.doctors.bulk_write(doctor_ops, ordered=False),
+            db.specializations.bulk_write(spec_ops, ordered=False),
+            *([db.users.bulk_write(user_ops, ordered=False)] if user_ops else []),
+        )
+    except BulkWriteError as e:
+        # Another worker seeding at the same moment won the race on the unique email index
+        print(f"⚠️ Seed write conflicts ignored: {len(e.details.get('writeErrors', []))}")
+
+    await db.meta.update_one({"_id": "seed"}, {"$set": {"version": SEED_VERSION}}, upsert=True)
+    print(f"✅ Seeded {len(SEED_DOCTORS)} doctors and {len(SPECIALIZATIONS)} specializations (version {SEED_VERSION})")
+
+
+SPECIALIZATIONS_BY_ID = {s["id"]: s for s in SPECIALIZATIONS}
 
 
 def get_specialization(spec_id: str):
     """Get specialization data by ID."""
-    for s in SPECIALIZATIONS:
-        if s["id"] == spec_id:
-            return s
-    return SPECIALIZATIONS[-1]  # Default to general
+    return SPECIALIZATIONS_BY_ID.get(spec_id, SPECIALIZATIONS[-1])  # Default to general
 
 
 def get_doctor_for_specialization(spec_id: str):
@@ -85,10 +114,114 @@ def get_doctor_for_specialization(spec_id: str):
     return f"doc_{spec_id}"
 
 
+NON_WORD = re.compile(r"\W+")
+
+
+def _keywords_pattern(keywords) -> re.Pattern:
+    # Longest first, so "headache" wins over "head"; a plural ending still counts as the keyword.
+    # The leading class of first letters lets the regex engine skip most positions cheaply.
+    keywords = sorted(keywords, key=len, reverse=True)
+    alternation = "|".join(r"\s+".join(map(re.escape, kw.split())) for kw in keywords)
+    first_letters = re.escape("".join(sorted({kw[0] for kw in keywords})))
+    return re.compile(rf"(?=[{first_letters}])\b({alternation})(?:e?s)?\b")
+
+
+class SpecializationMatcher:
+    """
+    Keyword matcher for all specializations: one compiled word-boundary regex over every
+    keyword plus a keyword → specialization map, so a text is scored in one finditer pass
+    ("head" counts in "my head hurts" but not in "ahead" or "headline").
+    The text's distinct words rule specializations in or out first: a text without any
+    keyword skips the regex, and one that names a single specialization needs no scoring.
+    """
+
+    def __init__(self, specializations: list[dict]):
+        self.order = {s["id"]: i for i, s in enumerate(specializations)}
+        self.keyword_to_spec = {kw.lower(): s["id"] for s in specializations for kw in s["keywords"]}
+        self.pattern = _keywords_pattern(self.keyword_to_spec) if self.keyword_to_spec else None
+        self.spec_patterns = {
+            s["id"]: _keywords_pattern(kw.lower() for kw in s["keywords"])
+            for s in specializations if s["keywords"]
+        }
+        # (first word, spec id, whole keyword is that word) — what the word check looks for
+        self.first_words = [(kw.split()[0], spec_id, " " not in kw) for kw, spec_id in self.keyword_to_spec.items()]
+
+    def _candidates(self, text: str) -> dict:
+        """Specializations that may match, mapped to whether a single-word keyword surely does."""
+        words = set()
+        for token in set(text.split()):
+            words.update(NON_WORD.split(token))
+        candidates = {}
+        for word, spec_id, whole in self.first_words:
+            if word in words or word + "s" in words or word + "es" in words:
+                candidates[spec_id] = candidates.get(spec_id, False) or whole
+        return candidates
+
+    def _count(self, text: str) -> dict:
+        counts = {}
+        for match in self.pattern.finditer(text):
+            spec_id = self.keyword_to_spec[" ".join(match.group(1).split())]
+            counts[spec_id] = counts.get(spec_id, 0) + 1
+        return counts
+
+    def scores(self, text: str) -> dict:
+        """Keyword hit counts per specialization id."""
+        text = (text or "").lower()
+        if not self.pattern or not self._candidates(text):
+            return {}
+        return self._count(text)
+
+    def rank_scores(self, counts: dict) -> list[dict]:
+        """
+        Specializations with at least one hit, best first.
+        Confidence is the share of all keyword hits; ties keep SPECIALIZATIONS order.
+        """
+        total = sum(counts.values())
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], self.order[item[0]]))
+        return [
+            {"id": spec_id, "score": score, "confidence": round(score / total, 3)}
+            for spec_id, score in ranked
+        ]
+
+    def rank(self, text: str) -> list[dict]:
+        return self.rank_scores(self.scores(text))
+
+    def detect(self, text: str) -> str:
+        text = (text or "").lower()
+        candidates = self._candidates(text) if self.pattern else {}
+        if len(candidates) == 1:
+            (spec_id, surely), = candidates.items()
+            # Only a multi-word keyword's first word was seen ("back" of "back pain"): confirm it
+            return spec_id if surely or self.spec_patterns[spec_id].search(text) else "general"
+        ranked = self.rank_scores(self._count(text)) if candidates else []
+        return ranked[0]["id"] if ranked else "general"
+
+    def detect_transcript(self, texts: list[str]) -> str:
+        return self.detect("\n".join(texts))
+
+
+specialization_matcher = SpecializationMatcher(SPECIALIZATIONS)
+
+
 def detect_specialization(text: str) -> str:
     """Detect specialization from symptom text."""
-    lower = text.lower()
-    for spec in SPECIALIZATIONS:
-        if any(kw in lower for kw in spec["keywords"]):
-            return spec["id"]
-    return "general"
+    return specialization_matcher.detect(text)
+
+
+def rank_specializations(text: str) -> list[dict]:
+    """Ranked [{id, score, confidence}] for every specialization mentioned in the text."""
+    return specialization_matcher.rank(text)
+
+
+def detect_specializations(texts: list[str]) -> list[str]:
+    """Batch form of detect_specialization, e.g. for re-classifying stored transcripts."""
+    return [specialization_matcher.detect(text) for text in texts]
+
+
+def detect_specialization_in_messages(messages: list[dict], summary: dict = None) -> str:
+    """
+    Detect specialization from a conversation.
+    `summary` is the rolling summary of the turns before `messages`, if any.
+    """
+    texts = [summary["text"]] if summary and summary.get("text") else []
+    return specialization_matcher.detect_transcript(texts + [m.get("text", "") for m in messages])
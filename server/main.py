@@ -1,21 +1,51 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from database.connection import connect_db, close_db
+import asyncio
+from database.connection import connect_db, close_db, get_db
 from database.seed import seed_database
-from routes import auth, sessions, reports, doctors, notifications, chat
+from agents.llm import init_llm_registry, close_llm_registry, registry_stats
+from agents.triage_classifier import load_triage_classifier, classifier_stats
+from agents.llm_cache import init_llm_cache, llm_cache_stats
+from agents.warmup import warm_agents, warmup_stats
+from services.events import hub, start_event_hub, stop_event_hub
+from services.jobs import start_job_queue, stop_job_queue, job_stats
+from services.catalog import catalog, cached_response, start_catalog, stop_catalog, catalog_stats
+from services.users import user_cache_stats
+from services.llm_scheduler import llm_scheduler_stats
+from services.turns import turn_stats
+from services.prewarm import prewarm_stats
+from services.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.passwords import start_password_pool, stop_password_pool, password_stats
+from routes import auth, sessions, reports, doctors, notifications, chat, realtime
 from config import settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    start_password_pool()
     await connect_db()
     await seed_database()
+    init_llm_registry()
+    load_triage_classifier()
+    init_llm_cache(get_db)
+    await start_event_hub()
+    await start_catalog(get_db)
+    await start_job_queue(get_db, hub.worker_id)
+    warmup = asyncio.create_task(warm_agents()) if settings.AGENT_WARMUP else None
     print(f"🚀 Backend running on {settings.HOST}:{settings.PORT}")
     yield
     # Shutdown
+    if warmup:
+        warmup.cancel()
+    await stop_job_queue()
+    await stop_catalog()
+    await stop_event_hub()
+    await close_llm_registry()
     await close_db()
+    stop_password_pool()
 
 
 app = FastAPI(
@@ -34,6 +64,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency histograms and counters for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Register all routes
 app.include_router(auth.router)
 app.include_router(sessions.router)
@@ -41,6 +74,7 @@ app.include_router(reports.router)
 app.include_router(doctors.router)
 app.include_router(notifications.router)
 app.include_router(chat.router)
+app.include_router(realtime.router)
 
 
 @app.get("/")
@@ -48,10 +82,33 @@ async def root():
     return {"message": "Healthcare AI Platform API", "status": "running"}
 
 
+@app.get("/api/stats")
+async def get_stats():
+    """Runtime counters for the caches, pools, queues and schedulers (see /metrics for latency histograms)."""
+    return {
+        "llm": registry_stats(),
+        "llmCache": llm_cache_stats(),
+        "triageClassifier": classifier_stats(),
+        "jobs": await job_stats(),
+        "passwords": password_stats(),
+        "agentWarmup": warmup_stats(),
+        "catalog": catalog_stats(),
+        "userCache": user_cache_stats(),
+        "llmScheduler": llm_scheduler_stats(),
+        "turns": turn_stats(),
+        "specialistPrewarm": prewarm_stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition: HTTP routes, LLM calls and tokens, Mongo commands, password hashing."""
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/api/specializations")
-async def get_specializations():
-    from database.seed import SPECIALIZATIONS
-    return SPECIALIZATIONS
+async def get_specializations(request: Request):
+    return cached_response(request, catalog.specializations_json, settings.CATALOG_SPECIALIZATIONS_MAX_AGE)
 
 
 if __name__ == "__main__":
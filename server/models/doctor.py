@@ -0,0 +1,5 @@
+from pydantic import BaseModel
+from typing import Literal
+
+class DoctorStatusUpdate(BaseModel):
+    status: Literal["available", "busy", "offline"]
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from database.connection import get_db
 from models.user import UserCreate, UserLogin, UserUpdate, UserResponse
-from passlib.hash import pbkdf2_sha256
+from services.passwords import hash_password, verify_password
+from services.users import remember_user
 from datetime import datetime
 from bson import ObjectId
 
@@ -39,7 +40,7 @@ async def register(user_data: UserCreate):
     
     doc = {
         "email": user_data.email,
-        "password_hash": pbkdf2_sha256.hash(user_data.password),
+        "password_hash": await hash_password(user_data.password),
         "role": user_data.role,
         "firstName": user_data.firstName,
         "lastName": user_data.lastName,
@@ -52,6 +53,7 @@ async def register(user_data: UserCreate):
     }
     result = await db.users.insert_one(doc)
     doc["_id"] = result.inserted_id
+    remember_user(doc)
     return {"success": True, "user": user_doc_to_response(doc)}
 
 
@@ -61,8 +63,9 @@ async def login(creds: UserLogin):
     user = await db.users.find_one({"email": creds.email, "role": creds.role})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    if not pbkdf2_sha256.verify(creds.password, user.get("password_hash", "")):
+    if not await verify_password(creds.password, user.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    remember_user(user)
     return {"success": True, "user": user_doc_to_response(user), "role": user["role"]}
 
 
@@ -78,6 +81,7 @@ async def update_profile(user_id: str, updates: UserUpdate):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     user = await db.users.find_one({"_id": ObjectId(user_id)})
+    remember_user(user)
     return {"success": True, "user": user_doc_to_response(user)}
 
 
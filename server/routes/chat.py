@@ -2,31 +2,65 @@
 Chat route — the main endpoint that connects frontend chat to LangChain agents.
 Handles both triage and specialist conversations with full session memory.
 """
-from fastapi import APIRouter, HTTPException
-from database.connection import get_db
-from database.seed import get_doctor_for_specialization, get_specialization
-from agents.triage_agent import get_triage_response
-from agents.specialist_agent import get_specialist_response
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from config import settings
+from database.connection import get_db, write_transaction
+from database.seed import get_specialization
+from database.messages import insert_messages, load_messages, message_preview
+from services.events import hub, publish_session_event
+from services.jobs import enqueue
+from services.reports import build_report, report_created_payload
+from agents.handoff import build_handoff
+from services.prewarm import prewarm_job
+from services.users import get_user_profile
+from services.llm_scheduler import BACKGROUND_CALLER, llm_caller, check_llm_admission
+from services.turns import Turn, begin_turn
 from models.session import MessageCreate
 from datetime import datetime
 from bson import ObjectId
+import asyncio
+import json
+import time
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+UNKNOWN_SESSION_REPLY = "I'm not sure how to help with that. Please start a new consultation."
 
-@router.post("/{session_id}/send")
-async def send_message(session_id: str, message: MessageCreate):
+# Only the fields an agent turn needs from the session document
+TURN_PROJECTION = {"type": 1, "specialization": 1, "userId": 1, "contextSummary": 1, "reportId": 1,
+                   "userMessageCount": 1}
+
+# Everything the polling ETag is derived from
+SESSION_STATE_PROJECTION = {"messageCount": 1, "status": 1, "reportId": 1}
+
+# Background context folds in this process (keeps task references alive, one fold per session)
+_background_tasks = set()
+_folds_in_flight = set()
+
+
+async def get_patient_name(db, user_id: str) -> str:
+    """Get patient info for personalization."""
+    patient = await get_user_profile(db, user_id)
+    return (patient and patient.get("firstName")) or "there"
+
+
+def user_message_count(session: dict, all_messages: list[dict]) -> int:
     """
-    Send a user message and get an AI agent response.
-    This is the main chat endpoint that routes to triage or specialist agents.
-    All messages are stored in MongoDB — agents have full session memory.
+    Patient messages in the whole session, this one included — the loaded history stops at the
+    rolling summary. Sessions from before the counter fall back to what was loaded.
     """
-    db = get_db()
-    session = await db.sessions.find_one({"_id": ObjectId(session_id)})
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    loaded = sum(1 for m in all_messages if m.get("sender") == "user")
+    return max(session.get("userMessageCount") or 0, loaded)
 
-    # Save user message to DB
+
+async def open_turn(db, session_id: str, message: MessageCreate, idempotency_key: str) -> tuple[Turn, dict]:
+    """
+    Take the session for this message (see services.turns). The write that takes the lock also
+    reserves sequence numbers for the user message and the agent reply.
+    """
+    now = datetime.utcnow().isoformat()
     user_msg = {
         "id": str(ObjectId()),
         "sender": message.sender,
@@ -34,112 +68,342 @@ async def send_message(session_id: str, message: MessageCreate):
         "text": message.text,
         "type": message.type,
         "attachments": message.attachments,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": now,
     }
-    await db.sessions.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$push": {"messages": user_msg}, "$set": {"updatedAt": datetime.utcnow().isoformat()}}
+    turn = await begin_turn(
+        db, session_id, idempotency_key, message.sender, message.text,
+        update={"$inc": {"messageSeq": 2, "messageCount": 1, "userMessageCount": int(message.sender == "user")},
+                "$set": {"updatedAt": now, "lastMessage": message_preview(user_msg)}},
+        projection={**TURN_PROJECTION, "messageSeq": 1},
+        # Fail fast (429/503, before saving anything) when the LLM queue is full
+        admit=lambda: check_llm_admission(session_id),
     )
+    return turn, user_msg
 
-    # Get updated session with all messages (for agent memory)
-    session = await db.sessions.find_one({"_id": ObjectId(session_id)})
-    all_messages = session.get("messages", [])
 
-    # Get patient info for personalization
-    patient = await db.users.find_one({"_id": ObjectId(session["userId"])}) if session.get("userId") else None
-    patient_name = patient.get("firstName", "there") if patient else "there"
+async def start_turn(db, session_id: str, turn: Turn, user_msg: dict):
+    """Save the user message and load everything the agent needs for this turn."""
+    session = turn.session
+    user_seq = session["messageSeq"] - 1
+    user_msg["seq"] = user_seq
 
-    # Route to appropriate agent
-    if session["type"] == "triage":
-        result = await get_triage_response(all_messages, patient_name)
-    elif session["type"] == "specialist":
-        spec_id = session.get("specialization", "general")
-        result = await get_specialist_response(spec_id, all_messages, patient_name)
-    else:
-        result = {"text": "I'm not sure how to help with that. Please start a new consultation."}
+    # Store the message while loading only the history the agent needs (after the rolling summary)
+    summary = session.get("contextSummary") or {}
+    _, history, patient_name = await asyncio.gather(
+        insert_messages(db, session_id, [user_msg]),
+        load_messages(db, session_id, after_seq=summary.get("coveredSeq", 0), before_seq=user_seq, include_hidden=True),
+        get_patient_name(db, session.get("userId")),
+    )
+    all_messages = history + [user_msg]
+    publish_session_event(session_id, "message", session.get("userId"), message=user_msg)
+
+    return session, user_msg, all_messages, patient_name
 
-    # Save agent response to DB
+
+async def finish_turn(db, session_id: str, session: dict, user_msg: dict, all_messages: list[dict], result: dict,
+                      patient_name: str, turn: Turn = None) -> dict:
+    """
+    Save the agent reply and apply routing / report side effects in a single write pass.
+    With `turn`, the same session update releases the turn's lock and its response is recorded.
+    """
     spec = get_specialization(session.get("specialization", "")) if session.get("specialization") else None
     agent_name = f"{spec['name']} Assistant" if spec and session["type"] == "specialist" else "Triage Assistant"
 
+    now = datetime.utcnow().isoformat()
     agent_msg = {
         "id": str(ObjectId()),
         "sender": "agent",
         "senderName": agent_name,
         "text": result["text"],
         "type": "text",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": now,
+        "seq": user_msg["seq"] + 1,
     }
-    await db.sessions.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$push": {"messages": agent_msg}, "$set": {"updatedAt": datetime.utcnow().isoformat()}}
-    )
+    session_update = {
+        "$inc": {"messageCount": 1},
+        "$set": {"updatedAt": now, "lastMessage": message_preview(agent_msg)},
+    }
+    report = None
 
     response = {"userMessage": user_msg, "agentMessage": agent_msg}
 
-    # Handle triage routing
+    # Report prompt-size savings and fold older turns into the rolling summary
+    if result.get("context"):
+        response["context"] = result["context"]["stats"]
+        schedule_context_fold(db, session_id, session.get("contextSummary"), result["context"])
+
+    # Handle triage routing — the specialist session picks up the handoff summary built here,
+    # and a background job starts preparing it (opening message included) right away
+    job = None
     if session["type"] == "triage" and result.get("route_to"):
         response["routeTo"] = result["route_to"]
-        # Update session status
-        await db.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"status": "completed"}}
-        )
+        handoff = build_handoff(all_messages, result["route_to"], session.get("contextSummary"),
+                                user_message_count(session, all_messages))
+        # Classifier-routed sessions are kept out of its training data (it would learn its own guesses)
+        session_update["$set"].update({"status": "completed", "routeTo": result["route_to"], "handoff": handoff,
+                                       "routedBy": "classifier" if result.get("classifier") else "llm"})
+        if settings.SPECIALIST_PREWARM:
+            job = prewarm_job(session_id, session, result["route_to"], handoff, patient_name)
 
-    # Handle specialist report generation
+    # Handle specialist report generation — the doctor is notified by a background job
     if result.get("report"):
-        report_data = result["report"]
-        assigned_doctor = get_doctor_for_specialization(session.get("specialization", "general"))
-        
-        report = {
-            "sessionId": session_id,
-            "userId": session["userId"],
-            "status": "ai_generated",
-            "aiReport": report_data,
-            "doctorReview": None,
-            "finalReport": None,
-            "assignedDoctor": assigned_doctor,
-            "specialization": session.get("specialization"),
-            "createdAt": datetime.utcnow().isoformat(),
-            "updatedAt": datetime.utcnow().isoformat(),
-        }
-        report_result = await db.reports.insert_one(report)
-        report_id = str(report_result.inserted_id)
-
+        report = build_report(session_id, session, result["report"], now)
+        report_id = str(report["_id"])
         # Link to session and update status
+        session_update["$set"].update({"reportId": report_id, "status": "awaiting_review"})
+        job = ("report.created", report_created_payload(report, patient_name), f"report.created:{report_id}")
+        response["reportGenerated"] = True
+        response["reportId"] = report_id
+    elif result.get("report_pending"):
+        # The reply goes out now; a job writes the report (and re-checks nothing else did first)
+        report_id = str(ObjectId())
+        job = ("report.generate", {"sessionId": session_id, "reportId": report_id, "patientName": patient_name},
+               f"report.generate:{session_id}:{user_msg['seq']}")
+        response["reportPending"] = True
+
+    # Every write for the turn goes out together — one transaction when a replica set is available
+    async with write_transaction() as txn:
+        if report:
+            await db.reports.insert_one(report, session=txn)
+        await insert_messages(db, session_id, [agent_msg], session=txn)
+        if turn:
+            await turn.commit(session_update, response, session=txn)
+        else:
+            await db.sessions.update_one({"_id": ObjectId(session_id)}, session_update, session=txn)
+        if job:
+            kind, payload, dedupe_key = job
+            await enqueue(db, kind, payload, dedupe_key=dedupe_key, session=txn)
+
+    user_id = session.get("userId")
+    publish_session_event(session_id, "message", user_id, message=agent_msg)
+    if "status" in session_update["$set"]:
+        publish_session_event(session_id, "status", user_id, status=session_update["$set"]["status"],
+                              reportId=response.get("reportId"))
+    return response
+
+
+def schedule_context_fold(db, session_id: str, summary: dict, context: dict):
+    """Update the session's rolling summary in the background so the reply isn't delayed."""
+    if not context.get("fold") or session_id in _folds_in_flight:
+        return
+    _folds_in_flight.add(session_id)
+    task = asyncio.create_task(fold_context(db, session_id, summary, context))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def fold_context(db, session_id: str, summary: dict, context: dict):
+    from agents.context import summarize_turns
+
+    # The task copied the request's context: run as background work, not on the chat's own slots
+    llm_caller.set(BACKGROUND_CALLER)
+    try:
+        summary = summary or {}
+        text = await summarize_turns(context["summary"], context["fold"])
+        # The first patient message stays the handoff's chief complaint once it is folded away
+        first = summary.get("firstPatientMessage") or next(
+            (m.get("text") for m in context["fold"] if m.get("sender") == "user" and m.get("text")), None)
+        # Only apply on top of the summary we started from (another worker may have folded already)
+        guard = {"contextSummary.coveredSeq": summary["coveredSeq"]} if summary else {"contextSummary": None}
         await db.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"reportId": report_id, "status": "awaiting_review"}}
+            {"_id": ObjectId(session_id), **guard},
+            {"$set": {"contextSummary": {
+                "text": text,
+                "coveredSeq": context["foldUpto"],
+                "firstPatientMessage": first,
+                "coveredMessages": summary.get("coveredMessages", 0) + len(context["fold"]),
+                "coveredTokens": summary.get("coveredTokens", 0) + context["foldTokens"],
+                "updatedAt": datetime.utcnow().isoformat(),
+            }}}
         )
+    except Exception as e:
+        print(f"⚠️ Context fold failed for session {session_id}: {e}")
+    finally:
+        _folds_in_flight.discard(session_id)
 
-        # Notify the assigned doctor (find their user account)
-        doctor_user = await db.users.find_one({"doctorId": assigned_doctor})
-        if doctor_user:
-            await db.notifications.insert_one({
-                "userId": str(doctor_user["_id"]),
-                "type": "new_report",
-                "title": "New Report for Review",
-                "message": f"A new {session.get('specialization', '')} report from {patient_name} needs your review.",
-                "reportId": report_id,
-                "read": False,
-                "createdAt": datetime.utcnow().isoformat(),
-            })
 
-        response["reportGenerated"] = True
-        response["reportId"] = report_id
+async def run_agent(session: dict, all_messages: list[dict], patient_name: str) -> dict:
+    """Route a turn to the appropriate agent and wait for the full reply."""
+    # Agent modules (and LangChain) load on first use, or earlier via the start-up warm-up
+    from agents.triage_agent import get_triage_response
+    from agents.specialist_agent import get_specialist_response
 
-    return response
+    user_messages = user_message_count(session, all_messages)
+    if session["type"] == "triage":
+        return await get_triage_response(all_messages, patient_name, session.get("contextSummary"), user_messages)
+    elif session["type"] == "specialist":
+        spec_id = session.get("specialization", "general")
+        return await get_specialist_response(spec_id, all_messages, patient_name, session.get("contextSummary"),
+                                             session.get("reportId"), user_messages)
+    return {"text": UNKNOWN_SESSION_REPLY}
+
+
+async def stream_agent(session: dict, all_messages: list[dict], patient_name: str):
+    """Route a turn to the appropriate agent and yield its streaming events."""
+    from agents.triage_agent import stream_triage_response
+    from agents.specialist_agent import stream_specialist_response
+
+    user_messages = user_message_count(session, all_messages)
+    if session["type"] == "triage":
+        events = stream_triage_response(all_messages, patient_name, session.get("contextSummary"), user_messages)
+    elif session["type"] == "specialist":
+        spec_id = session.get("specialization", "general")
+        events = stream_specialist_response(spec_id, all_messages, patient_name, session.get("contextSummary"),
+                                            session.get("reportId"), user_messages)
+    else:
+        yield {"type": "token", "text": UNKNOWN_SESSION_REPLY}
+        yield {"type": "result", "text": UNKNOWN_SESSION_REPLY}
+        return
+    async for event in events:
+        yield event
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/{session_id}/send")
+async def send_message(session_id: str, message: MessageCreate, idempotency_key: str = Header(None)):
+    """
+    Send a user message and get an AI agent response.
+    This is the main chat endpoint that routes to triage or specialist agents.
+    All messages are stored in MongoDB — agents have full session memory.
+    Answers 429/503 with Retry-After (before saving anything) when the LLM queue is full.
+
+    Turns of a session run one at a time. Repeating a send with the same `Idempotency-Key`
+    (or re-sending the same text while it is still being answered) returns the original
+    response instead of running the agent again.
+    """
+    db = get_db()
+    turn, user_msg = await open_turn(db, session_id, message, idempotency_key)
+    if turn.replay is not None:
+        return turn.replay
+    async with turn:
+        # LLM calls for this turn queue fairly against other sessions
+        llm_caller.set(session_id)
+        session, user_msg, all_messages, patient_name = await start_turn(db, session_id, turn, user_msg)
+        result = await run_agent(session, all_messages, patient_name)
+        turn.response = await finish_turn(db, session_id, session, user_msg, all_messages, result, patient_name,
+                                          turn)
+    return turn.response
+
+
+def replay_stream(response: dict) -> StreamingResponse:
+    """A duplicate /stream request: the finished turn's `user` and `done` events."""
+    async def event_stream():
+        yield sse_event("user", response["userMessage"])
+        yield sse_event("done", response)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/{session_id}/stream")
+async def stream_message(session_id: str, message: MessageCreate, idempotency_key: str = Header(None)):
+    """
+    Streaming variant of /send using Server-Sent Events.
+    Emits `user` (the saved user message), `token` (visible text as it arrives),
+    and finally `done` with the same payload /send returns plus time-to-first-token.
+    The agent message is saved once the stream has finished.
+    Duplicates (see /send) get the original turn's `user` and `done` events only.
+    """
+    db = get_db()
+    turn, user_msg = await open_turn(db, session_id, message, idempotency_key)
+    if turn.replay is not None:
+        return replay_stream(turn.replay)
+    try:
+        llm_caller.set(session_id)
+        session, user_msg, all_messages, patient_name = await start_turn(db, session_id, turn, user_msg)
+    except BaseException as e:
+        await turn.finish(e)
+        raise
+
+    async def event_stream():
+        started = time.perf_counter()
+        first_token_at = None
+        async with turn:
+            yield sse_event("user", user_msg)
+            try:
+                result = None
+                async for event in stream_agent(session, all_messages, patient_name):
+                    if event["type"] == "token":
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        yield sse_event("token", {"text": event["text"]})
+                    elif event["type"] == "result":
+                        result = {k: v for k, v in event.items() if k != "type"}
+                turn.response = await finish_turn(db, session_id, session, user_msg, all_messages, result,
+                                                  patient_name, turn)
+            except Exception as e:
+                await turn.finish(e)
+                yield sse_event("error", {"detail": str(e)})
+                return
+        finished = time.perf_counter()
+        response = {**turn.response, "timings": {
+            "ttftMs": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+            "totalMs": round((finished - started) * 1000, 1),
+        }}
+        yield sse_event("done", response)
+
+    # The lease lives only as long as the stream: released when it ends or the client goes away
+    # (the background task covers a stream that never started), and not renewed while the client
+    # has stopped reading
+    return StreamingResponse(
+        turn.leased(event_stream()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(turn.finish),
+    )
+
+
+def session_etag(session: dict) -> str:
+    """Strong validator for the message list — changes on every new message or status change."""
+    return f'"{session.get("messageCount", 0)}-{session.get("status", "active")}-{session.get("reportId") or ""}"'
 
 
 @router.get("/{session_id}/messages")
-async def get_messages(session_id: str):
-    """Get all messages for a session — used for polling/refreshing."""
+async def get_messages(session_id: str, request: Request, after_seq: int = 0, after: str = None, wait: float = 0):
+    """
+    Get messages for a session — used for polling/refreshing.
+
+    Args:
+        after_seq: Only return messages with a higher seq (use `lastSeq` from the previous poll)
+        after: Same, but by message id
+        wait: Long-poll — hold the request up to this many seconds until something changes
+
+    Send the previous `ETag` as `If-None-Match`: unchanged sessions answer 304 (after `wait`).
+    """
     db = get_db()
-    session = await db.sessions.find_one({"_id": ObjectId(session_id)})
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    return {
-        "messages": session.get("messages", []),
-        "status": session.get("status", "active"),
-        "reportId": session.get("reportId"),
-    }
+    if after and not after_seq:
+        anchor = await db.messages.find_one({"sessionId": session_id, "id": after}, {"seq": 1})
+        after_seq = anchor["seq"] if anchor else 0
+
+    client_etag = request.headers.get("if-none-match")
+    deadline = time.monotonic() + min(max(wait, 0), settings.LONG_POLL_MAX_SECONDS)
+    # Subscribe before reading so a change between the read and the wait isn't missed
+    with hub.subscribe(f"session:{session_id}") as changes:
+        while True:
+            session = await db.sessions.find_one({"_id": ObjectId(session_id)}, SESSION_STATE_PROJECTION)
+            if not session:
+                raise HTTPException(status_code=404, detail="Session not found")
+            etag = session_etag(session)
+            if etag != client_etag:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+            try:
+                await asyncio.wait_for(changes.get(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    messages = await load_messages(db, session_id, after_seq=after_seq)
+    return JSONResponse(
+        {
+            "messages": messages,
+            "status": session.get("status", "active"),
+            "reportId": session.get("reportId"),
+            "lastSeq": messages[-1]["seq"] if messages else after_seq,
+        },
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
@@ -1,35 +1,33 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from database.connection import get_db
+from config import settings
+from models.doctor import DoctorStatusUpdate
+from services.catalog import catalog, cached_response, announce_doctor_change
 
 router = APIRouter(prefix="/api/doctors", tags=["doctors"])
 
 
 @router.get("")
-async def get_all_doctors():
-    db = get_db()
-    cursor = db.doctors.find({})
-    doctors = []
-    async for doc in cursor:
-        doc["id"] = doc.pop("_id")
-        doctors.append(doc)
-    return doctors
+async def get_all_doctors(request: Request):
+    return cached_response(request, catalog.doctors_json(), settings.CATALOG_DOCTORS_MAX_AGE)
 
 
 @router.get("/{doctor_id}")
 async def get_doctor(doctor_id: str):
-    db = get_db()
-    doc = await db.doctors.find_one({"_id": doctor_id})
-    if doc:
-        doc["id"] = doc.pop("_id")
-    return doc
+    return catalog.doctor(doctor_id)
 
 
 @router.get("/specialization/{spec_id}")
-async def get_doctors_by_specialization(spec_id: str):
+async def get_doctors_by_specialization(spec_id: str, request: Request):
+    return cached_response(request, catalog.specialization_doctors_json(spec_id), settings.CATALOG_DOCTORS_MAX_AGE)
+
+
+@router.put("/{doctor_id}/status")
+async def update_doctor_status(doctor_id: str, update: DoctorStatusUpdate):
+    """Change a doctor's availability; every worker's catalog picks it up via the event hub."""
     db = get_db()
-    cursor = db.doctors.find({"specialization": spec_id})
-    doctors = []
-    async for doc in cursor:
-        doc["id"] = doc.pop("_id")
-        doctors.append(doc)
-    return doctors
+    result = await db.doctors.update_one({"_id": doctor_id}, {"$set": {"status": update.status}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    announce_doctor_change(doctor_id, {"status": update.status})
+    return {"id": doctor_id, "status": update.status}
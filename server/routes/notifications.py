@@ -1,33 +1,60 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from database.connection import get_db
+from services.notifications import read_fields, decrement_unread, unread_count
+from services.pagination import keyset_filter, page_size, build_page
+from pymongo import ReturnDocument
 from bson import ObjectId
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
 
 @router.get("")
-async def get_notifications(user_id: str):
+async def get_notifications(user_id: str, limit: int = 20, cursor: str = None, unread_only: bool = False):
+    """Newest-first page of a user's notifications; pass `nextCursor` back as `cursor` for the next page."""
     db = get_db()
-    cursor = db.notifications.find({"userId": user_id}).sort("createdAt", -1)
+    limit = page_size(limit)
+    query = {"userId": user_id, **keyset_filter("createdAt", cursor)}
+    if unread_only:
+        query["read"] = False
+    cursor = db.notifications.find(query).sort([("createdAt", -1), ("_id", -1)]).limit(limit + 1)
+    docs, next_cursor = build_page([doc async for doc in cursor], limit, "createdAt")
     notifs = []
-    async for doc in cursor:
+    for doc in docs:
         doc["id"] = str(doc.pop("_id"))
+        doc.pop("expireAt", None)
         notifs.append(doc)
-    return notifs
+    return {"items": notifs, "nextCursor": next_cursor}
 
 
 @router.get("/unread-count")
 async def get_unread_count(user_id: str):
     db = get_db()
-    count = await db.notifications.count_documents({"userId": user_id, "read": False})
-    return {"count": count}
+    return {"count": await unread_count(db, user_id)}
+
+
+@router.put("/mark-all-read")
+async def mark_all_read(user_id: str):
+    db = get_db()
+    result = await db.notifications.update_many(
+        {"userId": user_id, "read": False},
+        {"$set": read_fields()}
+    )
+    await decrement_unread(db, user_id, result.modified_count)
+    return {"success": True, "updated": result.modified_count}
 
 
 @router.put("/{notif_id}/read")
 async def mark_read(notif_id: str):
     db = get_db()
-    await db.notifications.update_one(
-        {"_id": ObjectId(notif_id)},
-        {"$set": {"read": True}}
+    # Only the first read of an unread notification moves the counter
+    notif = await db.notifications.find_one_and_update(
+        {"_id": ObjectId(notif_id), "read": False},
+        {"$set": read_fields()},
+        projection={"userId": 1},
+        return_document=ReturnDocument.AFTER,
     )
+    if notif:
+        await decrement_unread(db, notif["userId"])
+    elif not await db.notifications.find_one({"_id": ObjectId(notif_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Notification not found")
     return {"success": True}
@@ -0,0 +1,52 @@
+"""
+WebSocket push channel — one connection per user.
+Delivers notifications, new session messages and session status changes as they
+happen, so connected clients don't need to poll.
+"""
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.events import hub
+
+router = APIRouter(tags=["realtime"])
+
+HEARTBEAT_SECONDS = 25
+
+
+@router.websocket("/api/ws/{user_id}")
+async def user_events(websocket: WebSocket, user_id: str):
+    """
+    Push events for one user as JSON frames:
+    {"type": "notification" | "message" | "status" | "ping", ...}
+    """
+    await websocket.accept()
+    with hub.subscribe(f"user:{user_id}") as events:
+        # Reading detects a closed socket; the client may send anything (e.g. "ping")
+        receiver = asyncio.create_task(_drain(websocket))
+        getter = None
+        try:
+            while True:
+                getter = getter or asyncio.create_task(events.get())
+                # Wake on the next event or on the disconnect, whichever comes first
+                await asyncio.wait({receiver, getter}, timeout=HEARTBEAT_SECONDS,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if receiver.done():
+                    break
+                if getter.done():
+                    event, getter = getter.result(), None
+                else:
+                    event = {"type": "ping"}
+                await websocket.send_json(event)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            receiver.cancel()
+            if getter:
+                getter.cancel()
+
+
+async def _drain(websocket: WebSocket):
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
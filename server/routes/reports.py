@@ -1,11 +1,26 @@
 from fastapi import APIRouter, HTTPException
-from database.connection import get_db
+from database.connection import get_db, write_transaction
+from services.events import publish_session_event
+from services.pagination import keyset_filter, page_size, build_page
+from services.jobs import enqueue
+from services.catalog import catalog
 from models.report import DoctorReviewSubmit
-from datetime import datetime
+from config import settings
+from pymongo import ReturnDocument
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+import asyncio
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
+REVIEWABLE_STATUSES = ["ai_generated", "under_review"]
+
+# Dashboard list views only need these — the full report comes from GET /{report_id}
+REPORT_LIST_PROJECTION = {
+    "status": 1, "specialization": 1, "aiReport.summary": 1, "userId": 1, "sessionId": 1,
+    "assignedDoctor": 1, "createdAt": 1, "updatedAt": 1,
+}
+
 
 def report_to_dict(doc: dict) -> dict:
     doc["id"] = str(doc.pop("_id"))
@@ -34,42 +49,224 @@ async def create_report(session_id: str, user_id: str, specialization: str, assi
         {"_id": ObjectId(session_id)},
         {"$set": {"reportId": report_id, "status": "awaiting_review"}}
     )
+    publish_session_event(session_id, "status", user_id, status="awaiting_review", reportId=report_id)
     report["_id"] = result.inserted_id
     return report_to_dict(report)
 
 
+def report_summary(doc: dict) -> dict:
+    """Flatten a list-projected report into its dashboard summary."""
+    doc["summary"] = (doc.pop("aiReport", None) or {}).get("summary", "")
+    return report_to_dict(doc)
+
+
 @router.get("")
-async def get_reports(user_id: str = None):
+async def get_reports(user_id: str = None, status: str = None, specialization: str = None,
+                      date_from: str = None, date_to: str = None, limit: int = 20, cursor: str = None):
+    """
+    Newest-first page of report summaries; fetch the full document from GET /{report_id}.
+    Pass `nextCursor` back as `cursor` for the next page. Dates are ISO strings.
+    """
     db = get_db()
-    query = {"userId": user_id} if user_id else {}
-    cursor = db.reports.find(query).sort("createdAt", -1)
-    reports = []
-    async for doc in cursor:
-        reports.append(report_to_dict(doc))
-    return reports
+    limit = page_size(limit)
+    query = {}
+    if user_id:
+        query["userId"] = user_id
+    if status:
+        query["status"] = status
+    if specialization:
+        query["specialization"] = specialization
+    if date_from or date_to:
+        query["createdAt"] = {k: v for k, v in (("$gte", date_from), ("$lt", date_to)) if v}
+    query.update(keyset_filter("createdAt", cursor))
+
+    docs = db.reports.find(query, REPORT_LIST_PROJECTION).sort([("createdAt", -1), ("_id", -1)]).limit(limit + 1)
+    docs, next_cursor = build_page([doc async for doc in docs], limit, "createdAt")
+    return {"items": [report_summary(doc) for doc in docs], "nextCursor": next_cursor}
+
+
+@router.get("/stats")
+async def get_report_stats(doctor_id: str, completed_since: str = None):
+    """
+    Dashboard totals for one doctor, each an index-backed count on assignedDoctor:
+    reports assigned to them, reports they have finalized, and reports finalized
+    since `completed_since` (ISO, the start of the viewer's day; defaults to midnight UTC).
+    """
+    db = get_db()
+    since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    if completed_since:
+        try:
+            since = datetime.fromisoformat(completed_since.replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="completed_since must be an ISO date")
+        if since.tzinfo:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    total, reviewed, completed = await asyncio.gather(
+        db.reports.count_documents({"assignedDoctor": doctor_id}),
+        db.reports.count_documents({"assignedDoctor": doctor_id, "status": "final"}),
+        db.reports.count_documents(
+            {"assignedDoctor": doctor_id, "status": "final", "updatedAt": {"$gte": since.isoformat()}}
+        ),
+    )
+    return {"total": total, "reviewed": reviewed, "completedSince": completed}
 
 
 @router.get("/pending")
-async def get_pending_reviews():
+async def get_pending_reviews(doctor_id: str = None):
     db = get_db()
-    cursor = db.reports.find({"status": {"$in": ["ai_generated", "under_review"]}}).sort("createdAt", 1)
+    query = {"status": {"$in": REVIEWABLE_STATUSES}}
+    if doctor_id:
+        query["assignedDoctor"] = doctor_id
+    cursor = db.reports.find(query, REPORT_LIST_PROJECTION).sort("createdAt", 1)
     reports = []
     async for doc in cursor:
-        reports.append(report_to_dict(doc))
+        reports.append(report_summary(doc))
     return reports
 
 
+# ===== Per-doctor review queue (claim / lease) =====
+
+def claimable(now: datetime) -> dict:
+    """Reports nobody is reviewing: new ones, or ones whose review lease has expired."""
+    return {"$or": [
+        {"status": "ai_generated"},
+        {"status": "under_review", "lease.expiresAt": {"$lt": now}},
+    ]}
+
+
+def new_lease(doctor_id: str, lease_seconds: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "doctorId": doctor_id,
+        "token": str(ObjectId()),
+        "claimedAt": now,
+        "expiresAt": now + timedelta(seconds=lease_seconds),
+    }
+
+
+def claimed_to_dict(doc: dict) -> dict:
+    lease = doc.get("lease") or {}
+    doc["lease"] = {
+        "doctorId": lease.get("doctorId"),
+        "token": lease.get("token"),
+        "expiresAt": lease["expiresAt"].isoformat() if lease.get("expiresAt") else None,
+    }
+    return report_to_dict(doc)
+
+
+@router.get("/queue/{doctor_id}")
+async def get_review_queue(doctor_id: str, status: str = None, limit: int = 20, cursor: str = None):
+    """Oldest-first page of a doctor's reviewable reports (summaries)."""
+    db = get_db()
+    limit = page_size(limit)
+    query = {
+        "assignedDoctor": doctor_id,
+        "status": status if status in REVIEWABLE_STATUSES else {"$in": REVIEWABLE_STATUSES},
+        **keyset_filter("createdAt", cursor, descending=False),
+    }
+    docs = db.reports.find(query, {**REPORT_LIST_PROJECTION, "lease.doctorId": 1, "lease.expiresAt": 1})
+    docs = docs.sort([("createdAt", 1), ("_id", 1)]).limit(limit + 1)
+    docs, next_cursor = build_page([doc async for doc in docs], limit, "createdAt")
+    items = []
+    for doc in docs:
+        lease = doc.pop("lease", None) or {}
+        doc["reviewer"] = lease.get("doctorId")
+        doc["leaseExpiresAt"] = lease["expiresAt"].isoformat() if lease.get("expiresAt") else None
+        items.append(report_summary(doc))
+    return {"items": items, "nextCursor": next_cursor}
+
+
+@router.get("/queue/{doctor_id}/depth")
+async def get_queue_depth(doctor_id: str):
+    db = get_db()
+    now = datetime.utcnow()
+    waiting, in_review, expired = await asyncio.gather(
+        db.reports.count_documents({"assignedDoctor": doctor_id, "status": "ai_generated"}),
+        db.reports.count_documents(
+            {"assignedDoctor": doctor_id, "status": "under_review", "lease.expiresAt": {"$gte": now}}
+        ),
+        db.reports.count_documents(
+            {"assignedDoctor": doctor_id, "status": "under_review", "lease.expiresAt": {"$lt": now}}
+        ),
+    )
+    return {"waiting": waiting, "inReview": in_review, "expiredLeases": expired, "depth": waiting + expired}
+
+
+@router.post("/queue/{doctor_id}/claim")
+async def claim_next_report(doctor_id: str, lease_seconds: int = None):
+    """Atomically take the oldest claimable report in the doctor's queue."""
+    db = get_db()
+    lease_seconds = lease_seconds or settings.REVIEW_LEASE_SECONDS
+    doc = await db.reports.find_one_and_update(
+        {"assignedDoctor": doctor_id, **claimable(datetime.utcnow())},
+        {"$set": {"status": "under_review", "lease": new_lease(doctor_id, lease_seconds),
+                  "updatedAt": datetime.utcnow().isoformat()}},
+        sort=[("createdAt", 1), ("_id", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        return {"report": None}
+    return {"report": claimed_to_dict(doc)}
+
+
+@router.post("/{report_id}/claim")
+async def claim_report(report_id: str, doctor_id: str, lease_seconds: int = None):
+    """Take a specific report for review; 409 if another doctor holds a live lease."""
+    db = get_db()
+    lease_seconds = lease_seconds or settings.REVIEW_LEASE_SECONDS
+    doc = await db.reports.find_one_and_update(
+        {"_id": ObjectId(report_id), **claimable(datetime.utcnow())},
+        {"$set": {"status": "under_review", "lease": new_lease(doctor_id, lease_seconds),
+                  "updatedAt": datetime.utcnow().isoformat()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        current = await db.reports.find_one({"_id": ObjectId(report_id)}, {"status": 1, "lease.doctorId": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Report not found")
+        raise HTTPException(status_code=409, detail=f"Report is {current.get('status')}")
+    return {"report": claimed_to_dict(doc)}
+
+
+@router.post("/{report_id}/lease/renew")
+async def renew_lease(report_id: str, token: str, lease_seconds: int = None):
+    db = get_db()
+    lease_seconds = lease_seconds or settings.REVIEW_LEASE_SECONDS
+    expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds)
+    result = await db.reports.update_one(
+        {"_id": ObjectId(report_id), "status": "under_review", "lease.token": token},
+        {"$set": {"lease.expiresAt": expires_at}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Lease no longer held")
+    return {"success": True, "expiresAt": expires_at.isoformat()}
+
+
+@router.post("/{report_id}/lease/release")
+async def release_lease(report_id: str, token: str):
+    """Give a report back to the queue without reviewing it."""
+    db = get_db()
+    result = await db.reports.update_one(
+        {"_id": ObjectId(report_id), "status": "under_review", "lease.token": token},
+        {"$set": {"status": "ai_generated", "updatedAt": datetime.utcnow().isoformat()}, "$unset": {"lease": ""}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Lease no longer held")
+    return {"success": True}
+
+
 @router.get("/{report_id}")
 async def get_report(report_id: str):
     db = get_db()
-    doc = await db.reports.find_one({"_id": ObjectId(report_id)})
+    doc = await db.reports.find_one({"_id": ObjectId(report_id)}, {"lease.token": 0})
     if not doc:
         raise HTTPException(status_code=404, detail="Report not found")
     return report_to_dict(doc)
 
 
 @router.post("/{report_id}/review")
-async def submit_doctor_review(report_id: str, review: DoctorReviewSubmit, doctor_id: str = None, doctor_name: str = "Doctor"):
+async def submit_doctor_review(report_id: str, review: DoctorReviewSubmit, doctor_id: str = None, doctor_name: str = "Doctor",
+                               lease_token: str = None):
     db = get_db()
     report = await db.reports.find_one({"_id": ObjectId(report_id)})
     if not report:
@@ -77,7 +274,7 @@ async def submit_doctor_review(report_id: str, review: DoctorReviewSubmit, docto
 
     # Get doctor info if doctor_id provided
     if doctor_id:
-        doctor = await db.doctors.find_one({"_id": doctor_id})
+        doctor = catalog.doctor(doctor_id)
         if doctor:
             doctor_name = doctor["name"]
 
@@ -92,41 +289,33 @@ async def submit_doctor_review(report_id: str, review: DoctorReviewSubmit, docto
         "reviewedBy": doctor_name,
     }
 
-    await db.reports.update_one(
-        {"_id": ObjectId(report_id)},
-        {"$set": {
-            "status": "final",
-            "doctorReview": review.model_dump(),
-            "finalReport": final_report,
-            "updatedAt": datetime.utcnow().isoformat(),
-        }}
-    )
-
-    # Add system message to the chat session so patient sees it
-    session_id = report.get("sessionId")
-    if session_id:
-        system_msg = {
-            "id": str(ObjectId()),
-            "sender": "system",
-            "senderName": "System",
-            "text": f"✅ **Your report has been reviewed by {doctor_name}!**\n\nThe doctor has provided their notes, any corrections, and recommendations. You can view the complete report in your Reports section.",
-            "type": "system",
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-        await db.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$push": {"messages": system_msg}, "$set": {"status": "completed", "updatedAt": datetime.utcnow().isoformat()}}
+    # Only the review itself is written here; the chat message and the patient's
+    # notification are posted by a background job queued in the same transaction
+    async with write_transaction() as txn:
+        # The lease is checked by the write itself: unclaimed, held with this token, or lapsed
+        now = datetime.utcnow()
+        reviewed = await db.reports.update_one(
+            {"_id": ObjectId(report_id), "$or": [
+                {"status": "ai_generated"},
+                {"status": "under_review", "lease.token": lease_token or {"$exists": False}},
+                {"status": "under_review", "lease.expiresAt": {"$lt": now}},
+            ]},
+            {"$set": {
+                "status": "final",
+                "doctorReview": review.model_dump(),
+                "finalReport": final_report,
+                "updatedAt": datetime.utcnow().isoformat(),
+            }, "$unset": {"lease": ""}},
+            session=txn,
         )
-
-    # Create notification for the patient
-    await db.notifications.insert_one({
-        "userId": report["userId"],
-        "type": "report_ready",
-        "title": "Your Report is Ready",
-        "message": f"{doctor_name} has reviewed your {report.get('specialization', '')} report.",
-        "reportId": report_id,
-        "read": False,
-        "createdAt": datetime.utcnow().isoformat(),
-    })
+        if not reviewed.matched_count:
+            raise HTTPException(status_code=409, detail="Report is being reviewed by another doctor or already final")
+        await enqueue(db, "report.reviewed", {
+            "reportId": report_id,
+            "sessionId": report.get("sessionId"),
+            "userId": report["userId"],
+            "doctorName": doctor_name,
+            "specialization": report.get("specialization") or "",
+        }, dedupe_key=f"report.reviewed:{report_id}", session=txn)
 
     return {"success": True, "message": "Review submitted successfully"}
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from database.connection import get_db
-from database.seed import get_doctor_for_specialization
+from database.seed import get_doctor_for_specialization, get_specialization
+from database.messages import append_message, insert_messages, load_messages, new_session
+from services.events import publish_session_event
+from agents.handoff import build_handoff, handoff_message
+from services.prewarm import claim_prewarmed_session
 from models.session import SessionCreate, MessageCreate, UploadCreate
 from datetime import datetime
 from bson import ObjectId
+import asyncio
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
@@ -14,6 +19,17 @@ def session_to_dict(doc: dict) -> dict:
     return doc
 
 
+async def backfill_handoff(db, triage: dict) -> dict:
+    """Triage sessions completed before handoffs were stored: build it from the chat once."""
+    messages, summary = await asyncio.gather(
+        load_messages(db, str(triage["_id"])),
+        db.sessions.find_one({"_id": triage["_id"]}, {"contextSummary": 1}),
+    )
+    handoff = build_handoff(messages, triage.get("routeTo"), (summary or {}).get("contextSummary"))
+    await db.sessions.update_one({"_id": triage["_id"]}, {"$set": {"handoff": handoff}})
+    return handoff
+
+
 @router.post("")
 async def create_session(user_id: str, data: SessionCreate):
     db = get_db()
@@ -23,49 +39,38 @@ async def create_session(user_id: str, data: SessionCreate):
 
     messages = []
     
-    # SILENT HANDOFF: If opening a specialist chat, import the triage context silently
+    # SILENT HANDOFF: If opening a specialist chat, import the triage summary silently
     if data.type == "specialist":
-        last_triage = await db.sessions.find_one(
-            {"userId": user_id, "type": "triage", "status": "completed"},
-            sort=[("createdAt", -1)]
+        # A chat prepared in the background when triage routed is handed over as is; looked up
+        # together with the handoff, so opening a chat without one costs no extra round-trip
+        prepared, last_triage = await asyncio.gather(
+            claim_prewarmed_session(db, user_id, data.specialization),
+            db.sessions.find_one(
+                {"userId": user_id, "type": "triage", "status": "completed"},
+                {"handoff": 1, "routeTo": 1},
+                sort=[("createdAt", -1)]
+            ),
         )
-        if last_triage and "messages" in last_triage:
-            transcript = "--- PREVIOUS TRIAGE TRANSCRIPT ---\n"
-            for m in last_triage["messages"]:
-                if m.get("type") == "text":
-                    speaker = "Patient" if m.get("sender") == "user" else "Triage Agent"
-                    transcript += f"{speaker}: {m.get('text')}\n"
-            
-            messages.append({
-                "id": str(ObjectId()),
-                "sender": "system",
-                "senderName": "System",
-                "text": transcript,
-                "type": "hidden", # The frontend filters this so patient doesn't see it
-                "timestamp": datetime.utcnow().isoformat()
-            })
-
-    session = {
-        "userId": user_id,
-        "type": data.type,
-        "specialization": data.specialization,
-        "status": "active",
-        "messages": messages,
-        "uploads": [],
-        "assignedDoctor": assigned_doctor,
-        "reportId": None,
-        "createdAt": datetime.utcnow().isoformat(),
-        "updatedAt": datetime.utcnow().isoformat(),
-    }
+        if prepared:
+            return {**session_to_dict(prepared), "prewarmed": True}
+        if last_triage:
+            handoff = last_triage.get("handoff") or await backfill_handoff(db, last_triage)
+            spec = get_specialization(data.specialization) if data.specialization else None
+            messages.append(handoff_message(handoff, spec and spec["name"]))
+
+    session = new_session(user_id, data.type, data.specialization, messages, assigned_doctor)
     result = await db.sessions.insert_one(session)
     session["_id"] = result.inserted_id
+    await insert_messages(db, str(result.inserted_id), messages)
+    session["messages"] = messages
     return session_to_dict(session)
 
 
 @router.get("")
 async def get_user_sessions(user_id: str):
+    """List a user's sessions without their messages (see messageCount / lastMessage)."""
     db = get_db()
-    cursor = db.sessions.find({"userId": user_id}).sort("createdAt", 1)
+    cursor = db.sessions.find({"userId": user_id, "status": {"$ne": "prewarmed"}}, {"messages": 0, "contextSummary": 0, "turnLock": 0}).sort("createdAt", 1)
     sessions = []
     async for doc in cursor:
         sessions.append(session_to_dict(doc))
@@ -75,9 +80,10 @@ async def get_user_sessions(user_id: str):
 @router.get("/{session_id}")
 async def get_session(session_id: str):
     db = get_db()
-    doc = await db.sessions.find_one({"_id": ObjectId(session_id)})
+    doc = await db.sessions.find_one({"_id": ObjectId(session_id)}, {"messages": 0, "contextSummary": 0, "turnLock": 0})
     if not doc:
         raise HTTPException(status_code=404, detail="Session not found")
+    doc["messages"] = await load_messages(db, session_id)
     return session_to_dict(doc)
 
 
@@ -93,12 +99,10 @@ async def add_message(session_id: str, message: MessageCreate):
         "attachments": message.attachments,
         "timestamp": datetime.utcnow().isoformat(),
     }
-    result = await db.sessions.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$push": {"messages": msg}, "$set": {"updatedAt": datetime.utcnow().isoformat()}}
-    )
-    if result.matched_count == 0:
+    session, msg = await append_message(db, session_id, msg, {"updatedAt": datetime.utcnow().isoformat()})
+    if not msg:
         raise HTTPException(status_code=404, detail="Session not found")
+    publish_session_event(session_id, "message", session.get("userId"), message=msg)
     return msg
 
 
@@ -125,5 +129,9 @@ async def update_session_status(session_id: str, status: str, assigned_doctor: s
     update = {"status": status, "updatedAt": datetime.utcnow().isoformat()}
     if assigned_doctor:
         update["assignedDoctor"] = assigned_doctor
-    await db.sessions.update_one({"_id": ObjectId(session_id)}, {"$set": update})
+    session = await db.sessions.find_one_and_update(
+        {"_id": ObjectId(session_id)}, {"$set": update}, projection={"userId": 1}
+    )
+    if session:
+        publish_session_event(session_id, "status", session.get("userId"), status=status)
     return {"success": True}
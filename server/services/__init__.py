@@ -0,0 +1 @@
+# Make services a package
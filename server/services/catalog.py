@@ -0,0 +1,158 @@
+"""
+In-memory catalog of doctors and specializations.
+
+Both are seed data that almost never change, so every worker keeps doctors in dicts
+indexed by id, by specialization and by email instead of querying Mongo per request
+(specializations are indexed by id in database.seed). Doctors are loaded from the database
+at startup, SEED_DOCTORS until then. The one field that changes at runtime — a doctor's
+availability status — is written to Mongo and then announced on the "catalog" hub channel,
+so every worker patches its copy without a restart.
+
+List endpoints are served from pre-serialised JSON with a strong, content-derived ETag
+(identical on every worker) and Cache-Control, answering 304 to a matching If-None-Match.
+"""
+import asyncio
+import hashlib
+import json
+from fastapi import Request, Response
+from database.seed import SPECIALIZATIONS, SEED_DOCTORS
+from services.events import hub
+
+CHANNEL = "catalog"
+
+
+def public_doctor(doc: dict) -> dict:
+    doctor = {k: v for k, v in doc.items() if k != "_id"}
+    doctor["id"] = doc.get("_id", doc.get("id"))
+    return doctor
+
+
+class Cached:
+    """A JSON body serialised once, with its ETag."""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+
+EMPTY_LIST = Cached([])
+
+
+class Catalog:
+    def __init__(self, specializations: list[dict], doctors: list[dict]):
+        self.specializations = specializations
+        self.specializations_json = Cached(specializations)
+        self.loaded = False
+        self.counters = {"lookups": 0, "reloads": 0, "updates": 0}
+        self.set_doctors(doctors)
+
+    def set_doctors(self, docs: list[dict]):
+        """Replace the doctor list and rebuild every index."""
+        self.doctors = [public_doctor(d) for d in docs]
+        self.by_id = {d["id"]: d for d in self.doctors}
+        self.by_email = {d["email"]: d for d in self.doctors if d.get("email")}
+        self.by_spec = {}
+        for d in self.doctors:
+            self.by_spec.setdefault(d.get("specialization"), []).append(d)
+        self._invalidate()
+
+    def _invalidate(self):
+        self._doctors_json = None
+        self._spec_json = {}
+
+    async def load(self, db):
+        self.set_doctors(await db.doctors.find({}).to_list(None))
+        self.loaded = True
+        self.counters["reloads"] += 1
+
+    def apply(self, doctor_id: str, changes: dict) -> bool:
+        """Patch one doctor in place (indexes share the same dicts)."""
+        doctor = self.by_id.get(doctor_id)
+        if doctor is None:
+            return False
+        doctor.update(changes)
+        self.counters["updates"] += 1
+        self._invalidate()
+        return True
+
+    # Lookups
+
+    def doctor(self, doctor_id: str) -> dict | None:
+        self.counters["lookups"] += 1
+        return self.by_id.get(doctor_id)
+
+    def doctor_by_email(self, email: str) -> dict | None:
+        self.counters["lookups"] += 1
+        return self.by_email.get(email)
+
+    def doctors_for_specialization(self, spec_id: str) -> list[dict]:
+        self.counters["lookups"] += 1
+        return self.by_spec.get(spec_id, [])
+
+    def doctor_for_specialization(self, spec_id: str) -> dict:
+        """The doctor a specialization's reports go to (the general doctor if it has none)."""
+        doctors = self.doctors_for_specialization(spec_id) or self.doctors_for_specialization("general")
+        return doctors[0] if doctors else self.doctors[-1]
+
+    # Serialised responses
+
+    def doctors_json(self) -> Cached:
+        if self._doctors_json is None:
+            self._doctors_json = Cached(self.doctors)
+        return self._doctors_json
+
+    def specialization_doctors_json(self, spec_id: str) -> Cached:
+        # Only ids that have doctors get an entry, so arbitrary ids in the URL can't grow the cache
+        if spec_id not in self.by_spec:
+            self.counters["lookups"] += 1
+            return EMPTY_LIST
+        if spec_id not in self._spec_json:
+            self._spec_json[spec_id] = Cached(self.doctors_for_specialization(spec_id))
+        return self._spec_json[spec_id]
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "doctors": len(self.doctors),
+                "specializations": len(self.specializations), **self.counters}
+
+
+catalog = Catalog(SPECIALIZATIONS, SEED_DOCTORS)
+_listener = None
+
+
+def cached_response(request: Request, cached: Cached, max_age: int) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+    if request.headers.get("if-none-match") == cached.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def announce_doctor_change(doctor_id: str, changes: dict):
+    """Patch this worker's catalog now and tell the other workers to do the same."""
+    catalog.apply(doctor_id, changes)
+    hub.publish(CHANNEL, {"type": "doctor", "doctorId": doctor_id, "changes": changes, "origin": hub.worker_id})
+
+
+async def _listen():
+    with hub.subscribe(CHANNEL) as events:
+        while True:
+            event = await events.get()
+            if event.get("type") == "doctor" and event.get("origin") != hub.worker_id:
+                catalog.apply(event["doctorId"], event["changes"])
+
+
+async def start_catalog(get_db):
+    global _listener
+    await catalog.load(get_db())
+    _listener = asyncio.create_task(_listen())
+    print(f"📚 Catalog loaded: {len(catalog.doctors)} doctors, {len(catalog.specializations)} specializations")
+
+
+async def stop_catalog():
+    global _listener
+    if _listener:
+        _listener.cancel()
+        _listener = None
+
+
+def catalog_stats() -> dict:
+    return catalog.stats()
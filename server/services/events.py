@@ -0,0 +1,173 @@
+"""
+Pub/sub hub for session and user events.
+Channels are plain strings ("session:<id>", "user:<id>"); subscribers get their own
+bounded queue, so a slow consumer drops its oldest events instead of blocking publishers.
+
+Events are always delivered to subscribers in this process. A broker fans them out to
+the other uvicorn workers:
+- LocalBroker — in-process stand-in; hubs attached to the same broker see each other's events
+- MongoChangeStreamBroker — writes events to the `events` collection and tails it with a
+  change stream (needs a replica set)
+"""
+import asyncio
+import os
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from config import settings
+
+QUEUE_SIZE = 100
+
+
+class LocalBroker:
+    def __init__(self):
+        self._hubs = []
+
+    async def start(self, hub: "EventHub"):
+        self._hubs.append(hub)
+
+    async def publish(self, origin: "EventHub", channel: str, event: dict):
+        for hub in self._hubs:
+            if hub is not origin:
+                hub.deliver(channel, event)
+
+    async def stop(self, hub: "EventHub"):
+        if hub in self._hubs:
+            self._hubs.remove(hub)
+
+
+class MongoChangeStreamBroker:
+    def __init__(self, get_db, ttl_seconds: int = 3600):
+        self.get_db = get_db
+        self.ttl_seconds = ttl_seconds
+        self._task = None
+
+    async def start(self, hub: "EventHub"):
+        db = self.get_db()
+        await db.events.create_index("createdAt", expireAfterSeconds=self.ttl_seconds)
+        self._task = asyncio.create_task(self._watch(hub))
+
+    async def publish(self, origin: "EventHub", channel: str, event: dict):
+        await self.get_db().events.insert_one({
+            "channel": channel,
+            "event": event,
+            "origin": origin.worker_id,
+            "createdAt": datetime.utcnow(),
+        })
+
+    async def _watch(self, hub: "EventHub"):
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": hub.worker_id}}}]
+        while True:
+            try:
+                async with self.get_db().events.watch(pipeline) as stream:
+                    async for change in stream:
+                        doc = change["fullDocument"]
+                        hub.deliver(doc["channel"], doc["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Event change stream interrupted, retrying: {e}")
+                await asyncio.sleep(2)
+
+    async def stop(self, hub: "EventHub"):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+class EventHub:
+    def __init__(self, broker=None):
+        self.broker = broker
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._subscribers = defaultdict(set)
+        self._pending = set()
+        self.published = 0
+        self.delivered = 0
+
+    def deliver(self, channel: str, event: dict):
+        """Hand an event to this process's subscribers."""
+        for queue in list(self._subscribers.get(channel, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    def publish(self, channel: str, event: dict):
+        self.published += 1
+        self.deliver(channel, event)
+        if self.broker:
+            task = asyncio.create_task(self._forward(channel, event))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _forward(self, channel: str, event: dict):
+        try:
+            await self.broker.publish(self, channel, event)
+        except Exception as e:
+            print(f"⚠️ Event fan-out failed on {channel}: {e}")
+
+    @contextmanager
+    def subscribe(self, channel: str):
+        """Yield a queue receiving every event published on `channel` while the block is open."""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[channel].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[channel].discard(queue)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def subscriber_count(self, channel: str = None) -> int:
+        if channel:
+            return len(self._subscribers.get(channel, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def start(self, broker=None):
+        if broker is not None:
+            self.broker = broker
+        if self.broker:
+            await self.broker.start(self)
+
+    async def stop(self):
+        if self.broker:
+            await self.broker.stop(self)
+        for task in list(self._pending):
+            task.cancel()
+
+
+hub = EventHub()
+
+
+async def start_event_hub():
+    """Attach the configured broker (EVENT_BROKER=local|mongo) to the process hub."""
+    if settings.EVENT_BROKER == "mongo":
+        from database.connection import get_db, supports_transactions
+        if supports_transactions:
+            await hub.start(MongoChangeStreamBroker(get_db))
+            print("📡 Event hub fan-out: Mongo change stream")
+            return
+        print("⚠️ EVENT_BROKER=mongo needs a replica set — events stay in this worker")
+    await hub.start(LocalBroker())
+
+
+async def stop_event_hub():
+    await hub.stop()
+
+
+def publish_user_event(user_id: str, kind: str, **data):
+    """Push an event to everything a user has open (e.g. "notification")."""
+    if user_id:
+        hub.publish(f"user:{user_id}", {"type": kind, **data})
+
+
+def publish_session_event(session_id: str, kind: str, user_id: str = None, **data):
+    """Announce a change to a session ("message" or "status") to its watchers and its owner."""
+    event = {"type": kind, "sessionId": session_id, **data}
+    hub.publish(f"session:{session_id}", event)
+    if user_id:
+        hub.publish(f"user:{user_id}", event)
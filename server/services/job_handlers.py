@@ -0,0 +1,120 @@
+"""
+Follow-up work moved out of the chat and review requests.
+Every handler may run more than once for the same job, so each one checks what is already
+done (deterministic ids, dedupe keys, guarded updates) before writing.
+"""
+from datetime import datetime
+from bson import ObjectId
+from database.connection import write_transaction
+from database.messages import append_message, load_messages
+from services.events import publish_session_event
+from services.jobs import job_handler, enqueue
+from services.notifications import build_notification, insert_notification, announce_notification
+from services.prewarm import prepare_specialist_session, expire_prewarmed_session
+from services.reports import build_report, report_created_payload
+from services.users import get_doctor_user
+
+
+@job_handler("report.created")
+async def notify_doctor_of_report(db, payload: dict):
+    """Tell the assigned doctor a new report is waiting for review."""
+    doctor_user = await get_doctor_user(db, payload["assignedDoctor"])
+    if not doctor_user:
+        return
+    notification = await insert_notification(db, build_notification(
+        doctor_user["id"],
+        "new_report",
+        "New Report for Review",
+        f"A new {payload['specialization']} report from {payload['patientName']} needs your review.",
+        payload["reportId"],
+        dedupe_key=f"new_report:{payload['reportId']}",
+    ))
+    if notification:
+        announce_notification(notification)
+
+
+@job_handler("report.generate")
+async def generate_missing_report(db, payload: dict):
+    """Write the report a specialist reply left out (the reply itself has already gone out)."""
+    from agents.specialist_agent import generate_specialist_report
+
+    session_id = payload["sessionId"]
+    session = await db.sessions.find_one(
+        {"_id": ObjectId(session_id)},
+        {"userId": 1, "specialization": 1, "reportId": 1, "contextSummary": 1},
+    )
+    if not session or session.get("reportId"):
+        return
+
+    summary = session.get("contextSummary") or {}
+    messages = await load_messages(db, session_id, after_seq=summary.get("coveredSeq", 0), include_hidden=True)
+    report_data = await generate_specialist_report(
+        session.get("specialization", "general"), messages, payload["patientName"], session.get("contextSummary")
+    )
+    now = datetime.utcnow().isoformat()
+    report = build_report(session_id, session, report_data, now, ObjectId(payload["reportId"]))
+
+    async with write_transaction() as txn:
+        # Only the first report for a session is kept (a later turn may have produced one)
+        linked = await db.sessions.update_one(
+            {"_id": ObjectId(session_id), "reportId": None},
+            {"$set": {"reportId": payload["reportId"], "status": "awaiting_review", "updatedAt": now}},
+            session=txn,
+        )
+        if linked.modified_count == 0:
+            return
+        await db.reports.insert_one(report, session=txn)
+        await enqueue(db, "report.created", report_created_payload(report, payload["patientName"]),
+                      dedupe_key=f"report.created:{payload['reportId']}", session=txn)
+
+    publish_session_event(session_id, "status", session.get("userId"), status="awaiting_review",
+                          reportId=payload["reportId"])
+
+
+@job_handler("report.reviewed")
+async def announce_review(db, payload: dict):
+    """Post the "report reviewed" message in the patient's chat and notify them."""
+    report_id = payload["reportId"]
+    session_id = payload.get("sessionId")
+    user_id = payload["userId"]
+
+    if session_id:
+        message_id = f"review-{report_id}"
+        if not await db.messages.find_one({"sessionId": session_id, "id": message_id}, {"_id": 1}):
+            system_msg = {
+                "id": message_id,
+                "sender": "system",
+                "senderName": "System",
+                "text": f"✅ **Your report has been reviewed by {payload['doctorName']}!**\n\nThe doctor has provided their notes, any corrections, and recommendations. You can view the complete report in your Reports section.",
+                "type": "system",
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+            session, system_msg = await append_message(
+                db, session_id, system_msg, {"status": "completed", "updatedAt": datetime.utcnow().isoformat()}
+            )
+            if system_msg:
+                publish_session_event(session_id, "message", user_id, message=system_msg)
+                publish_session_event(session_id, "status", user_id, status="completed")
+
+    notification = await insert_notification(db, build_notification(
+        user_id,
+        "report_ready",
+        "Your Report is Ready",
+        f"{payload['doctorName']} has reviewed your {payload['specialization']} report.",
+        report_id,
+        dedupe_key=f"report_ready:{report_id}",
+    ))
+    if notification:
+        announce_notification(notification)
+
+
+@job_handler("specialist.prewarm")
+async def prewarm_specialist(db, payload: dict):
+    """Prepare the specialist chat the patient was just routed to (see services.prewarm)."""
+    await prepare_specialist_session(db, payload)
+
+
+@job_handler("specialist.prewarm.expire")
+async def expire_prewarm(db, payload: dict):
+    """Remove a prepared specialist chat that was never opened."""
+    await expire_prewarmed_session(db, payload)
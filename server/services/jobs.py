@@ -0,0 +1,216 @@
+"""
+Durable background jobs backed by the `jobs` collection.
+
+Request handlers commit their primary write and enqueue a job (inside the same transaction
+when one is available); a pool of asyncio workers in every API process claims jobs with an
+atomic find_one_and_update and runs the registered handler.
+
+- At-least-once: a claim is a lease (`lockedUntil`). A worker that dies mid-job leaves the
+  lease to expire and another worker picks the job up, so handlers must be idempotent.
+- Retries: a failed run is re-queued with exponential backoff until `maxAttempts`, then
+  marked failed with its last error.
+- Restarts: nothing lives only in memory — queued and expired running jobs are picked up
+  as soon as a worker starts.
+- `dedupeKey` (unique) makes enqueueing the same follow-up twice a no-op.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from config import settings
+
+handlers = {}
+
+
+def job_handler(kind: str):
+    """Register the coroutine `handler(db, payload)` that runs jobs of this kind."""
+    def register(fn):
+        handlers[kind] = fn
+        return fn
+    return register
+
+
+def backoff_seconds(attempts: int) -> float:
+    base = settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return min(base, settings.JOB_RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+
+
+async def enqueue(db, kind: str, payload: dict, dedupe_key: str = None, delay: float = 0,
+                  max_attempts: int = None, session=None):
+    """Queue a job (optionally inside a transaction) — returns its id, or None if already queued."""
+    now = datetime.utcnow()
+    job = {
+        "kind": kind,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "maxAttempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+        "runAt": now + timedelta(seconds=delay),
+        "lockedBy": None,
+        "lockedUntil": None,
+        "lastError": None,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    if dedupe_key:
+        job["dedupeKey"] = dedupe_key
+    try:
+        result = await db.jobs.insert_one(job, session=session)
+    except DuplicateKeyError:
+        return None
+    if queue:
+        queue.wake()
+    return result.inserted_id
+
+
+class JobQueue:
+    def __init__(self, get_db, concurrency: int = 4, poll_seconds: float = 1.0, lease_seconds: int = 120):
+        self.get_db = get_db
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.worker_id = None
+        self._workers = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.counters = {"completed": 0, "retried": 0, "failed": 0, "recovered": 0}
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def claim(self):
+        """Take the next due job: queued and due, or running with an expired lease."""
+        now = datetime.utcnow()
+        job = await self.get_db().jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "runAt": {"$lte": now}},
+                {"status": "running", "lockedUntil": {"$lt": now}},
+            ]},
+            {"$set": {
+                "status": "running",
+                "lockedBy": self.worker_id,
+                "lockedUntil": now + timedelta(seconds=self.lease_seconds),
+                "updatedAt": now,
+            }, "$inc": {"attempts": 1}},
+            sort=[("runAt", 1)],
+        )
+        if job is None:
+            return None
+        if job["status"] == "running":
+            # Its previous worker died or stalled past the lease
+            self.counters["recovered"] += 1
+        job.update(status="running", lockedBy=self.worker_id, attempts=job["attempts"] + 1)
+        return job
+
+    async def run_one(self, job: dict):
+        db = self.get_db()
+        now = datetime.utcnow()
+        owned = {"_id": job["_id"], "lockedBy": self.worker_id}
+        handler = handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise RuntimeError(f"no handler registered for {job['kind']}")
+            await asyncio.wait_for(handler(db, job["payload"]), timeout=self.lease_seconds)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job["attempts"] >= job["maxAttempts"]:
+                self.counters["failed"] += 1
+                print(f"❌ Job {job['kind']} {job['_id']} failed after {job['attempts']} attempts: {error}")
+                update = {"status": "failed", "lastError": error, "lockedUntil": None, "finishedAt": now}
+            else:
+                self.counters["retried"] += 1
+                update = {
+                    "status": "queued",
+                    "lastError": error,
+                    "lockedUntil": None,
+                    "runAt": now + timedelta(seconds=backoff_seconds(job["attempts"])),
+                }
+            await db.jobs.update_one(owned, {"$set": {**update, "updatedAt": now}})
+            return
+        self.counters["completed"] += 1
+        await db.jobs.update_one(owned, {"$set": {
+            "status": "done",
+            "lockedUntil": None,
+            "finishedAt": now,
+            "updatedAt": now,
+            # Finished jobs are kept for a while for inspection, then dropped by the TTL index
+            "expireAt": now + timedelta(days=settings.JOB_RETENTION_DAYS),
+        }})
+
+    async def _work(self):
+        while not self._stopping:
+            try:
+                job = await self.claim()
+            except Exception as e:
+                print(f"⚠️ Job claim failed: {e}")
+                job = None
+            if job:
+                await self.run_one(job)
+                continue
+            # Nothing due — sleep until enqueue() wakes us or the next poll
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self, worker_id: str):
+        self.worker_id = worker_id
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        self._stopping = True
+        self.wake()
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._workers = []
+
+    async def drain(self, timeout: float = 5.0):
+        """Wait until no job is queued-and-due or running (used by scripts and benchmarks)."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            busy = await self.get_db().jobs.count_documents({"$or": [
+                {"status": "running"},
+                {"status": "queued", "runAt": {"$lte": datetime.utcnow()}},
+            ]})
+            if not busy:
+                return True
+            self.wake()
+            await asyncio.sleep(0.01)
+        return False
+
+    async def stats(self) -> dict:
+        db = self.get_db()
+        by_status = {}
+        for status in ("queued", "running", "failed"):
+            by_status[status] = await db.jobs.count_documents({"status": status})
+        return {"workers": len(self._workers), **self.counters, **by_status}
+
+
+queue: JobQueue = None
+
+
+async def start_job_queue(get_db, worker_id: str) -> JobQueue:
+    global queue
+    # Handlers register themselves on import
+    import services.job_handlers  # noqa: F401
+    queue = JobQueue(get_db, settings.JOB_WORKERS, settings.JOB_POLL_SECONDS, settings.JOB_LEASE_SECONDS)
+    await queue.start(worker_id)
+    return queue
+
+
+async def stop_job_queue():
+    global queue
+    if queue:
+        await queue.stop()
+        queue = None
+
+
+async def job_stats() -> dict:
+    return await queue.stats() if queue else {}
@@ -0,0 +1,224 @@
+"""
+Admission control for LLM calls.
+
+Every agent call (triage, specialist, report, summarizer) takes a slot on its model's lane
+before talking to the provider. Each lane has its own concurrency limit (LLM_MAX_CONCURRENCY,
+overridable per model with LLM_MODEL_CONCURRENCY="model=n,..."); calls beyond it wait in
+per-caller queues served round-robin, so one busy chat cannot starve the others. The caller
+is the chat session (set by the chat routes through `llm_caller`); background work shares
+the "background" caller.
+
+Overload is shed early instead of letting every request slow down together:
+- 429 + Retry-After when one chat already has LLM_QUEUE_MAX_PER_CALLER calls pending
+- 503 + Retry-After when LLM_QUEUE_MAX calls are queued in total, or a call has waited
+  LLM_QUEUE_MAX_WAIT_SECONDS without getting a slot
+The chat routes run the same checks before saving the patient's message.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from fastapi import HTTPException
+from config import settings
+from services.metrics import registry
+
+# Background work (jobs, context folds) is already bounded by its worker pools, so it only
+# shares the queue fairly and is not held to the per-caller limit
+BACKGROUND_CALLER = "background"
+llm_caller: ContextVar[str] = ContextVar("llm_caller", default=BACKGROUND_CALLER)
+
+queue_wait = registry.histogram(
+    "healthbot_llm_queue_wait_seconds", "Time LLM calls waited for a slot.", ("model",),
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+rejections = registry.counter(
+    "healthbot_llm_rejections_total", "LLM calls shed by the scheduler.", ("model", "reason"))
+
+
+def parse_limits(spec: str) -> dict:
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model, limit = item.split("=", 1)
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+class Lane:
+    """Slots and waiting callers for one model."""
+
+    def __init__(self, model: str, limit: int):
+        self.model = model
+        self.limit = limit
+        self.active = 0
+        self.queued = 0
+        self.waiting = OrderedDict()  # caller -> deque of futures, in round-robin order
+        self.service_seconds = 2.0  # running estimate of how long a slot is held
+        self.counters = {"admitted": 0, "waited": 0, "timedOut": 0, "rejected": 0}
+        self.wait_total = 0.0
+
+    def dispatch(self):
+        """Hand free slots to waiting callers, one call per caller per round."""
+        while self.active < self.limit and self.waiting:
+            caller, futures = next(iter(self.waiting.items()))
+            future = futures.popleft()
+            if futures:
+                self.waiting.move_to_end(caller)
+            else:
+                del self.waiting[caller]
+            self.queued -= 1
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(None)
+
+    def remove(self, caller: str, future) -> bool:
+        futures = self.waiting.get(caller)
+        if futures is None or future not in futures:
+            return False
+        futures.remove(future)
+        if not futures:
+            del self.waiting[caller]
+        self.queued -= 1
+        return True
+
+    def stats(self) -> dict:
+        admitted = self.counters["admitted"]
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "callersWaiting": len(self.waiting),
+            **self.counters,
+            "avgWaitMs": round(self.wait_total / admitted * 1000, 1) if admitted else 0.0,
+        }
+
+
+class LLMScheduler:
+    def __init__(self, default_limit: int = 16, limits: dict = None, max_queue: int = 64,
+                 max_per_caller: int = 2, max_wait: float = 20.0):
+        self.default_limit = default_limit
+        self.limits = limits or {}
+        self.max_queue = max_queue
+        self.max_per_caller = max_per_caller
+        self.max_wait = max_wait
+        self.lanes = {}
+        self.pending = {}  # caller -> calls queued or running, across lanes
+
+    def lane(self, model: str) -> Lane:
+        lane = self.lanes.get(model)
+        if lane is None:
+            lane = self.lanes[model] = Lane(model, self.limits.get(model, self.default_limit))
+        return lane
+
+    def retry_after(self, lane: Lane = None) -> int:
+        lanes = [lane] if lane else list(self.lanes.values())
+        estimate = max((l.queued / l.limit * l.service_seconds for l in lanes), default=1.0)
+        return max(1, min(60, math.ceil(estimate)))
+
+    def _reject(self, status: int, reason: str, detail: str, lane: Lane = None):
+        model = lane.model if lane else "any"
+        rejections.inc(model, reason)
+        if lane:
+            lane.counters["rejected"] += 1
+        raise HTTPException(status_code=status, detail=detail,
+                            headers={"Retry-After": str(self.retry_after(lane))})
+
+    def check(self, caller: str, lane: Lane = None):
+        """Raise 429/503 if a new call from this caller would be shed."""
+        if caller != BACKGROUND_CALLER and self.pending.get(caller, 0) >= self.max_per_caller:
+            self._reject(429, "caller_limit", "Still working on your previous message, please wait a moment", lane)
+        if sum(l.queued for l in self.lanes.values()) >= self.max_queue:
+            self._reject(503, "queue_full", "The assistant is very busy right now, please try again shortly", lane)
+
+    @asynccontextmanager
+    async def slot(self, model: str, caller: str = None):
+        """Hold one of the model's concurrency slots for the duration of the block."""
+        caller = caller or llm_caller.get()
+        lane = self.lane(model)
+        self.check(caller, lane)
+        self.pending[caller] = self.pending.get(caller, 0) + 1
+        started = time.perf_counter()
+        try:
+            if lane.active < lane.limit and not lane.waiting:
+                lane.active += 1
+            else:
+                await self._wait(lane, caller)
+            waited = time.perf_counter() - started
+            lane.counters["admitted"] += 1
+            lane.wait_total += waited
+            queue_wait.observe(waited, model)
+
+            held = time.perf_counter()
+            try:
+                yield
+            finally:
+                lane.service_seconds += 0.2 * ((time.perf_counter() - held) - lane.service_seconds)
+                lane.active -= 1
+                lane.dispatch()
+        finally:
+            self.pending[caller] -= 1
+            if not self.pending[caller]:
+                del self.pending[caller]
+
+    async def _wait(self, lane: Lane, caller: str):
+        future = asyncio.get_running_loop().create_future()
+        lane.waiting.setdefault(caller, deque()).append(future)
+        lane.queued += 1
+        lane.counters["waited"] += 1
+        try:
+            await asyncio.wait({future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot handed over in the meantime
+            if not lane.remove(caller, future) and future.done() and not future.cancelled():
+                lane.active -= 1
+                lane.dispatch()
+            future.cancel()
+            raise
+        if future.done():
+            return
+        lane.remove(caller, future)
+        future.cancel()
+        lane.counters["timedOut"] += 1
+        self._reject(503, "max_wait", "The assistant is very busy right now, please try again shortly", lane)
+
+    def stats(self) -> dict:
+        return {
+            "callers": len(self.pending),
+            "queued": sum(l.queued for l in self.lanes.values()),
+            "models": {model: lane.stats() for model, lane in self.lanes.items()},
+        }
+
+
+scheduler = LLMScheduler(
+    settings.LLM_MAX_CONCURRENCY,
+    parse_limits(settings.LLM_MODEL_CONCURRENCY),
+    settings.LLM_QUEUE_MAX,
+    settings.LLM_QUEUE_MAX_PER_CALLER,
+    settings.LLM_QUEUE_MAX_WAIT_SECONDS,
+)
+
+registry.gauge("healthbot_llm_active_calls", "LLM calls holding a slot.", ("model",),
+               lambda: {(m,): lane.active for m, lane in scheduler.lanes.items()})
+registry.gauge("healthbot_llm_queue_depth", "LLM calls waiting for a slot.", ("model",),
+               lambda: {(m,): lane.queued for m, lane in scheduler.lanes.items()})
+
+
+def llm_slot(model: str):
+    return scheduler.slot(model)
+
+
+def check_llm_admission(caller: str):
+    """Fail fast (before any writes) when this caller's next LLM call would be shed."""
+    scheduler.check(caller)
+
+
+def llm_has_capacity(model: str) -> bool:
+    """Whether a call on this model would get a slot right away (speculative work skips otherwise)."""
+    lane = scheduler.lanes.get(model)
+    return lane is None or (lane.active < lane.limit and not lane.waiting)
+
+
+def llm_scheduler_stats() -> dict:
+    return scheduler.stats()
@@ -0,0 +1,231 @@
+"""
+Prometheus metrics without a client library or a sidecar.
+
+A small in-process registry of counters and histograms rendered in the Prometheus text
+exposition format at GET /metrics. Instrumented:
+- HTTP requests, per method / route template / status (ASGI middleware)
+- LLM calls per agent and model, plus token usage from the response's usage_metadata
+- MongoDB commands per collection and command (a pymongo CommandListener)
+- password hashing on the process pool
+
+Observations are a dict lookup, a bisect and a few additions under a lock (the Mongo
+listener runs on motor's driver threads), so the per-request cost stays in the low
+microseconds — see benchmarks/bench_metrics.py.
+"""
+import threading
+import time
+from bisect import bisect_left
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name, self.doc, self.label_names = name, doc, labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets: tuple = HTTP_BUCKETS):
+        self.name, self.doc, self.label_names = name, doc, labels
+        self.buckets = buckets
+        self.series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                le = bound if bound == "+Inf" else _number(bound)
+                bucket_labels = _labels(self.label_names, labels, 'le="' + le + '"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {repr(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Gauge:
+    """Current values read from `collect()` (returning {label values: value}) at render time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labels: tuple, collect):
+        self.name, self.doc, self.label_names = name, doc, labels
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, doc: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, doc, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, doc: str, labels: tuple = (), buckets: tuple = HTTP_BUCKETS) -> Histogram:
+        metric = Histogram(name, doc, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, doc: str, labels: tuple, collect) -> Gauge:
+        metric = Gauge(name, doc, labels, collect)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "healthbot_http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_latency = registry.histogram(
+    "healthbot_http_request_duration_seconds", "HTTP request latency, until the last body byte.",
+    ("method", "route"))
+llm_latency = registry.histogram(
+    "healthbot_llm_request_duration_seconds", "LLM call latency (streams: until the last chunk).",
+    ("agent", "model"), LLM_BUCKETS)
+llm_errors = registry.counter("healthbot_llm_errors_total", "LLM calls that raised.", ("agent", "model"))
+llm_tokens = registry.counter(
+    "healthbot_llm_tokens_total", "LLM tokens reported in usage metadata.", ("agent", "model", "type"))
+mongo_latency = registry.histogram(
+    "healthbot_mongo_command_duration_seconds", "MongoDB command latency.", ("collection", "command"),
+    MONGO_BUCKETS)
+mongo_failures = registry.counter(
+    "healthbot_mongo_command_failures_total", "MongoDB commands that failed.", ("collection", "command"))
+password_latency = registry.histogram(
+    "healthbot_password_hash_duration_seconds", "Password hash/verify time including pool queueing.",
+    ("op",), MONGO_BUCKETS[3:] + (2.5, 5.0))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware), so streaming responses pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_latency.observe(time.perf_counter() - started, scope["method"], path)
+            http_requests.inc(scope["method"], path, str(status))
+
+
+def usage_tokens(message) -> tuple[int, int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0) or 0, usage.get("output_tokens", 0) or 0
+
+
+def observe_llm(agent: str, model: str, seconds: float, input_tokens: int = 0, output_tokens: int = 0):
+    model = model or "unknown"
+    llm_latency.observe(seconds, agent, model)
+    if input_tokens:
+        llm_tokens.inc(agent, model, "input", amount=input_tokens)
+    if output_tokens:
+        llm_tokens.inc(agent, model, "output", amount=output_tokens)
+
+
+def observe_llm_error(agent: str, model: str):
+    llm_errors.inc(agent, model or "unknown")
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends; the collection comes from the started event."""
+
+    IGNORED = frozenset({"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions"})
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        if event.command_name in self.IGNORED:
+            return
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection")  # getMore
+        self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else "-"
+
+    def _collection(self, event) -> str | None:
+        return self._collections.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        collection = self._collection(event)
+        if collection is not None:
+            mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        if collection is not None:
+            mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+            mongo_failures.inc(collection, event.command_name)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,84 @@
+"""
+Notification write path shared by chat and report routes.
+Inserts the document, keeps the recipient's materialized unread counter in step,
+and pushes it to the recipient's open WebSocket connections.
+"""
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from config import settings
+from services.events import publish_user_event
+
+
+def build_notification(user_id: str, kind: str, title: str, message: str, report_id: str = None,
+                       dedupe_key: str = None) -> dict:
+    notification = {
+        "userId": user_id,
+        "type": kind,
+        "title": title,
+        "message": message,
+        "reportId": report_id,
+        "read": False,
+        "createdAt": datetime.utcnow().isoformat(),
+    }
+    if dedupe_key:
+        # Unique — a retried job cannot notify twice
+        notification["dedupeKey"] = dedupe_key
+    return notification
+
+
+async def insert_notification(db, notification: dict, session=None) -> dict:
+    """
+    Store a notification (optionally inside a transaction) — call announce_notification after commit.
+    Returns None when a notification with the same dedupeKey already exists.
+    """
+    try:
+        await db.notifications.insert_one(notification, session=session)
+    except DuplicateKeyError:
+        return None
+    result = await db.notification_counters.update_one(
+        {"_id": notification["userId"]}, {"$inc": {"unread": 1}}, session=session
+    )
+    if result.matched_count == 0:
+        # No counter yet: seed it from the unread documents (this one included) rather than
+        # creating it at 1 and hiding what the user already had unread
+        await _seed_counter(db, notification["userId"], session=session)
+    return notification
+
+
+def announce_notification(notification: dict):
+    payload = {k: v for k, v in notification.items() if k != "_id"}
+    if "_id" in notification:
+        payload["id"] = str(notification["_id"])
+    publish_user_event(notification["userId"], "notification", notification=payload)
+
+
+def read_fields() -> dict:
+    """Fields set when a notification is read — read notifications expire via the TTL index."""
+    now = datetime.utcnow()
+    return {
+        "read": True,
+        "readAt": now.isoformat(),
+        "expireAt": now + timedelta(days=settings.NOTIFICATION_READ_TTL_DAYS),
+    }
+
+
+async def decrement_unread(db, user_id: str, count: int = 1):
+    if count:
+        await db.notification_counters.update_one({"_id": user_id}, {"$inc": {"unread": -count}})
+
+
+async def _seed_counter(db, user_id: str, session=None) -> int:
+    """Create a missing counter from the user's unread notifications (no-op if it exists)."""
+    count = await db.notifications.count_documents({"userId": user_id, "read": False}, session=session)
+    await db.notification_counters.update_one(
+        {"_id": user_id}, {"$setOnInsert": {"unread": count}}, upsert=True, session=session
+    )
+    return count
+
+
+async def unread_count(db, user_id: str) -> int:
+    counter = await db.notification_counters.find_one({"_id": user_id})
+    if counter is None:
+        # Users from before the counter existed — backfill once
+        return await _seed_counter(db, user_id)
+    return max(0, counter.get("unread", 0))
@@ -0,0 +1,49 @@
+"""
+Keyset (cursor) pagination helpers.
+Cursors are opaque URL-safe strings encoding the sort key of the last item returned,
+so each page is an indexed range scan instead of an ever-growing skip.
+"""
+import base64
+import json
+from bson import ObjectId
+from fastapi import HTTPException
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(sort_value, doc_id) -> str:
+    raw = json.dumps([sort_value, str(doc_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, ObjectId(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, cursor: str, descending: bool = True) -> dict:
+    """Query clause selecting items strictly after the cursor in (field, _id) order."""
+    if not cursor:
+        return {}
+    sort_value, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: sort_value}},
+        {field: sort_value, "_id": {op: doc_id}},
+    ]}
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def build_page(docs: list[dict], limit: int, field: str) -> tuple[list[dict], str | None]:
+    """Split a limit+1 fetch into the page and the cursor for the next one."""
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1].get(field), docs[-1]["_id"]) if has_more and docs else None
+    return docs, next_cursor
@@ -0,0 +1,127 @@
+"""
+Password hashing off the event loop.
+
+pbkdf2_sha256 costs tens of milliseconds of pure CPU per call; run inline it stalls every
+request on the worker (streaming chats included). Hashes and verifications run on a small
+process pool instead, behind an admission limit: once PASSWORD_HASH_MAX_PENDING calls are
+queued or running, new ones are turned away with 429 + Retry-After rather than piling up.
+
+Workers start from a forkserver (spawn where there is none), never by forking the app: by the
+time the first login comes in, the process runs Motor's and the event loop's threads, and a
+fork would copy their locks in whatever state they happen to be.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.hash import pbkdf2_sha256
+from config import settings
+from services.metrics import password_latency
+
+
+def _hash(password: str) -> str:
+    return pbkdf2_sha256.hash(password)
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    try:
+        return pbkdf2_sha256.verify(password, password_hash)
+    except ValueError:
+        # Missing or malformed stored hash
+        return False
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class PasswordPool:
+    def __init__(self, workers: int = 2, max_pending: int = 32, retry_after: int = 1):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.executor = None
+        self.pending = 0
+        self.counters = {"hashed": 0, "verified": 0, "rejected": 0}
+        self.total_ms = 0.0
+
+    def start(self):
+        if self.executor is None:
+            try:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+            except (OSError, NotImplementedError):
+                # No process support (some sandboxes) — threads still keep the loop responsive
+                # for the parts of pbkdf2 that release the GIL
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def stop(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _run(self, fn, *args):
+        op = "hash" if fn is _hash else "verify"
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many sign-in attempts right now, please retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.start()
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            elapsed = time.perf_counter() - started
+            self.total_ms += elapsed * 1000
+            password_latency.observe(elapsed, op)
+
+    async def hash(self, password: str) -> str:
+        result = await self._run(_hash, password)
+        self.counters["hashed"] += 1
+        return result
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        result = await self._run(_verify, password, password_hash)
+        self.counters["verified"] += 1
+        return result
+
+    def stats(self) -> dict:
+        done = self.counters["hashed"] + self.counters["verified"]
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "maxPending": self.max_pending,
+            **self.counters,
+            "avgMs": round(self.total_ms / done, 1) if done else 0.0,
+        }
+
+
+pool = PasswordPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING,
+                    settings.PASSWORD_HASH_RETRY_AFTER)
+
+
+def start_password_pool():
+    pool.start()
+
+
+def stop_password_pool():
+    pool.stop()
+
+
+async def hash_password(password: str) -> str:
+    return await pool.hash(password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await pool.verify(password, password_hash)
+
+
+def password_stats() -> dict:
+    return pool.stats()
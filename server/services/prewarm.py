@@ -0,0 +1,152 @@
+"""
+Speculative specialist chats.
+
+When a triage turn routes the patient, the routing write also queues a `specialist.prewarm`
+job. Its handler creates the specialist session (status "prewarmed", hidden from session
+lists) with the triage handoff pinned and the specialist's opening message already written
+by the LLM. Opening the specialist chat (POST /api/sessions) claims that session with one
+find_one_and_update, alongside the handoff lookup; if it isn't ready yet the chat opens as a
+fresh session right away — the warm-up never delays the request it is meant to speed up.
+
+Speculation never competes with real chats: the job is skipped when the specialist model
+has no free slot. Abandoned work is cleaned up:
+- a job that finishes after the patient opened the chat sees their session and drops its result
+- routing again to the same specialty replaces an unclaimed prewarmed session
+- an unclaimed session is deleted SPECIALIST_PREWARM_TTL_SECONDS later (`specialist.prewarm.expire`)
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from config import settings
+from agents.handoff import handoff_message
+from database.messages import insert_messages, load_messages, new_session
+from database.seed import get_specialization, get_doctor_for_specialization
+from services.jobs import enqueue
+
+counters = {"prepared": 0, "claimed": 0, "skipped": 0, "abandoned": 0, "expired": 0}
+
+
+def prewarm_job(session_id: str, session: dict, route_to: str, handoff: dict, patient_name: str) -> tuple:
+    """(kind, payload, dedupe key) for the job queued by the routing triage turn."""
+    payload = {
+        "triageSessionId": session_id,
+        "userId": session.get("userId"),
+        "specialization": route_to,
+        "patientName": patient_name,
+        "handoff": handoff,
+        "routedAt": datetime.utcnow().isoformat(),
+    }
+    return "specialist.prewarm", payload, f"specialist.prewarm:{session_id}"
+
+
+def _opened_since(user_id: str, spec_id: str, since: str) -> dict:
+    """Specialist sessions the patient opened without the prewarm (after routing)."""
+    return {"userId": user_id, "type": "specialist", "specialization": spec_id,
+            "status": {"$ne": "prewarmed"}, "createdAt": {"$gte": since}}
+
+
+async def _discard(db, query: dict) -> int:
+    """Delete prewarmed sessions matching `query` together with their messages."""
+    ids = [doc["_id"] async for doc in db.sessions.find({**query, "status": "prewarmed"}, {"_id": 1})]
+    if ids:
+        await db.sessions.delete_many({"_id": {"$in": ids}, "status": "prewarmed"})
+        await db.messages.delete_many({"sessionId": {"$in": [str(i) for i in ids]}})
+    return len(ids)
+
+
+async def prepare_specialist_session(db, payload: dict):
+    """Create the prewarmed specialist session with its opening message (job handler body)."""
+    from agents.specialist_agent import generate_specialist_greeting, get_specialist_llm
+    from services.llm_scheduler import BACKGROUND_CALLER, llm_caller, llm_has_capacity
+
+    user_id, spec_id = payload["userId"], payload["specialization"]
+    spec = get_specialization(spec_id)
+    if not spec or not llm_has_capacity(getattr(get_specialist_llm(), "model", None)):
+        counters["skipped"] += 1
+        return
+    opened = _opened_since(user_id, spec_id, payload["routedAt"])
+    if await db.sessions.find_one(opened, {"_id": 1}):
+        counters["abandoned"] += 1
+        return
+
+    llm_caller.set(BACKGROUND_CALLER)
+    hidden = handoff_message(payload["handoff"], spec["name"])
+    try:
+        text = await generate_specialist_greeting(spec_id, [hidden], payload["patientName"])
+    except Exception as e:
+        # Speculative: no retries, the patient just gets the regular greeting
+        print(f"⚠️ Specialist prewarm failed for user {user_id}: {e}")
+        counters["skipped"] += 1
+        return
+    greeting = {
+        "id": str(ObjectId()),
+        "sender": "agent",
+        "senderName": f"{spec['name']} Assistant",
+        "text": text,
+        "type": "text",
+        "timestamp": datetime.utcnow().isoformat(),
+        "seq": 2,
+    }
+    # The patient may have opened the chat while the greeting was being written
+    if await db.sessions.find_one(opened, {"_id": 1}):
+        counters["abandoned"] += 1
+        return
+
+    session_id = ObjectId()
+    session = new_session(user_id, "specialist", spec_id, [hidden, greeting],
+                          get_doctor_for_specialization(spec_id), status="prewarmed")
+    session["prewarm"] = {
+        "triageSessionId": payload["triageSessionId"],
+        "expiresAt": datetime.utcnow() + timedelta(seconds=settings.SPECIALIST_PREWARM_TTL_SECONDS),
+    }
+    # Messages first, so a claimed session always has them
+    await insert_messages(db, str(session_id), [hidden, greeting])
+    await db.sessions.insert_one({"_id": session_id, **session})
+    # Checking before the insert is not enough: a chat opened in between found nothing to
+    # claim, so check again now that ours is visible and give way if it lost the race
+    if await db.sessions.find_one({**opened, "_id": {"$ne": session_id}}, {"_id": 1}):
+        counters["abandoned"] += await _discard(db, {"_id": session_id})
+        return
+    # Routing again to the same specialty replaces an earlier, unclaimed prewarm; only older
+    # ones go, so two jobs finishing together keep the newer session rather than neither
+    counters["abandoned"] += await _discard(
+        db, {"userId": user_id, "type": "specialist", "specialization": spec_id, "_id": {"$lt": session_id}}
+    )
+    await enqueue(db, "specialist.prewarm.expire", {"sessionId": str(session_id)},
+                  dedupe_key=f"specialist.prewarm.expire:{session_id}",
+                  delay=settings.SPECIALIST_PREWARM_TTL_SECONDS)
+    counters["prepared"] += 1
+
+
+async def expire_prewarmed_session(db, payload: dict):
+    """Drop a prewarmed session nobody claimed (job handler body)."""
+    counters["expired"] += await _discard(db, {"_id": ObjectId(payload["sessionId"])})
+
+
+async def claim_prewarmed_session(db, user_id: str, spec_id: str) -> dict:
+    """
+    Hand over the patient's prepared specialist session if it is ready — one write, no waiting.
+
+    Returns:
+        The session (now active) with its messages, or None — the caller creates one as usual
+    """
+    if not settings.SPECIALIST_PREWARM or not spec_id:
+        return None
+    now = datetime.utcnow()
+    session = await db.sessions.find_one_and_update(
+        {"userId": user_id, "type": "specialist", "specialization": spec_id, "status": "prewarmed",
+         "prewarm.expiresAt": {"$gt": now}},
+        {"$set": {"status": "active", "updatedAt": now.isoformat()}, "$unset": {"prewarm": ""}},
+        projection={"contextSummary": 0, "turnLock": 0},
+        sort=[("createdAt", -1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if session is None:
+        return None
+    counters["claimed"] += 1
+    session["messages"] = await load_messages(db, str(session["_id"]))
+    return session
+
+
+def prewarm_stats() -> dict:
+    return dict(counters)
@@ -0,0 +1,32 @@
+"""
+Report documents and the follow-up work around them (see services/job_handlers.py).
+"""
+from bson import ObjectId
+from database.seed import get_doctor_for_specialization
+
+
+def build_report(session_id: str, session: dict, report_data: dict, now: str, report_id: ObjectId = None) -> dict:
+    """A new AI-generated report for a specialist session, assigned to the specialization's doctor."""
+    return {
+        "_id": report_id or ObjectId(),
+        "sessionId": session_id,
+        "userId": session["userId"],
+        "status": "ai_generated",
+        "aiReport": report_data,
+        "doctorReview": None,
+        "finalReport": None,
+        "assignedDoctor": get_doctor_for_specialization(session.get("specialization", "general")),
+        "specialization": session.get("specialization"),
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def report_created_payload(report: dict, patient_name: str) -> dict:
+    return {
+        "reportId": str(report["_id"]),
+        "sessionId": report["sessionId"],
+        "assignedDoctor": report["assignedDoctor"],
+        "specialization": report.get("specialization") or "",
+        "patientName": patient_name,
+    }
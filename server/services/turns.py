@@ -0,0 +1,337 @@
+"""
+Single-flight chat turns.
+
+A turn (save the patient's message, run the agent, save the reply) holds a lease lock on
+its session — `turnLock` on the session document, taken with an atomic find_one_and_update
+and renewed while the agent runs — so turns of one session never overlap, whichever worker
+they land on. A worker that dies mid-turn leaves the lease to expire.
+
+Every turn is recorded in the `turns` collection under its idempotency key (the client's
+`Idempotency-Key` header, or a generated one), before the session is touched:
+- a send whose key already finished gets the stored response, without another LLM call
+- a send arriving while a turn with the same key — or, without a key, the same message —
+  is running attaches to it and returns its response when it finishes
+- any other send waits for the lock, up to TURN_WAIT_SECONDS, then gets 409 + Retry-After
+- a failed turn can be retried with the same key
+Finished turns are kept for TURN_RETENTION_HOURS, then dropped by a TTL index.
+
+The lock rides on the turn's own session writes: taking it applies the turn's first
+update (begin_turn `update`), and Turn.commit releases it and records the response inside
+the turn's final write transaction.
+"""
+import asyncio
+import hashlib
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config import settings
+from services.events import hub
+
+# How often waiters re-read the turn when no event arrives (events may be lost between workers)
+POLL_SECONDS = 1.0
+
+
+def max_turn_seconds() -> float:
+    """
+    Renewal stops after this long, so a stuck turn can't hold the session: a turn is one LLM
+    call, which waits at most LLM_QUEUE_MAX_WAIT_SECONDS for a slot and LLM_TIMEOUT_SECONDS for
+    the provider.
+    """
+    return settings.LLM_QUEUE_MAX_WAIT_SECONDS + settings.LLM_TIMEOUT_SECONDS
+
+counters = {"started": 0, "replayed": 0, "attached": 0, "serialized": 0, "recovered": 0, "failed": 0,
+            "conflicts": 0}
+
+
+def fingerprint(sender: str, text: str) -> str:
+    return hashlib.sha256(f"{sender}\n{text}".encode()).hexdigest()[:32]
+
+
+def _conflict(detail: str, retry_after: int):
+    counters["conflicts"] += 1
+    raise HTTPException(status_code=409, detail=detail, headers={"Retry-After": str(max(1, retry_after))})
+
+
+class Turn:
+    """
+    The outcome of begin_turn: either `replay` (a finished response to return as is) or a
+    running turn this request owns. Use `async with turn:` around the work and set
+    `turn.response` once the reply is saved; leaving the block records the turn and
+    releases the session (unless Turn.commit already did, with the reply's own writes).
+    `session` is the session document returned when the lock was taken.
+    """
+
+    def __init__(self, db, session_id: str, key: str, token: str = None, replay: dict = None):
+        self.db = db
+        self.session_id = session_id
+        self.key = key
+        self.token = token
+        self.replay = replay
+        self.response = None
+        self.session = None
+        self._heartbeat = None
+        self._finished = False
+        self._committed = False
+        self._blocked_since = None
+
+    @property
+    def turn_id(self) -> str:
+        return f"{self.session_id}:{self.key}"
+
+    def _start(self):
+        self._heartbeat = asyncio.create_task(self._renew())
+
+    async def _renew(self):
+        """Keep the lease alive while the agent is still working."""
+        for _ in range(math.ceil(max_turn_seconds() * 3 / settings.TURN_LEASE_SECONDS)):
+            await asyncio.sleep(settings.TURN_LEASE_SECONDS / 3)
+            if self._blocked_since and time.monotonic() - self._blocked_since > settings.TURN_LEASE_SECONDS:
+                # A streaming client that stopped reading doesn't keep the session; the lease runs out
+                print(f"⚠️ Turn stream stalled for session {self.session_id}, letting the lease expire")
+                return
+            until = datetime.utcnow() + timedelta(seconds=settings.TURN_LEASE_SECONDS)
+            try:
+                renewed = await self.db.sessions.update_one(
+                    {"_id": ObjectId(self.session_id), "turnLock.token": self.token},
+                    {"$set": {"turnLock.until": until}},
+                )
+                await self.db.turns.update_one({"_id": self.turn_id, "token": self.token},
+                                               {"$set": {"leaseUntil": until}})
+            except Exception as e:
+                print(f"⚠️ Turn lease renewal failed for session {self.session_id}: {e}")
+                continue
+            if not renewed.matched_count:
+                print(f"⚠️ Turn lease lost for session {self.session_id}")
+                return
+
+    async def leased(self, events):
+        """
+        Pass a streaming response's events through, renewing the lease only while the client
+        keeps reading them; the turn is finished when the stream ends or is closed.
+        """
+        try:
+            async for event in events:
+                self._blocked_since = time.monotonic()
+                yield event
+                self._blocked_since = None
+        finally:
+            await asyncio.shield(self.finish())
+            await events.aclose()
+
+    async def commit(self, update: dict, response: dict, session=None):
+        """
+        Apply the turn's last session `update` with the lock released in the same write, and
+        record `response` — pass the reply's write transaction as `session`.
+        """
+        if self._heartbeat:
+            self._heartbeat.cancel()
+        now = datetime.utcnow()
+        released = await self.db.sessions.update_one(
+            {"_id": ObjectId(self.session_id), "turnLock.token": self.token},
+            {**update, "$unset": {**update.get("$unset", {}), "turnLock": ""}},
+            session=session,
+        )
+        if not released.matched_count:
+            # The lease ran out (another turn may hold the session now): leave the lock alone
+            await self.db.sessions.update_one({"_id": ObjectId(self.session_id)}, update, session=session)
+        await self.db.turns.update_one({"_id": self.turn_id, "token": self.token}, {"$set": {
+            "status": "done", "response": response, "finishedAt": now,
+            "expireAt": now + timedelta(hours=settings.TURN_RETENTION_HOURS),
+        }}, session=session)
+        self._committed = True
+
+    async def finish(self, error: BaseException = None):
+        """Record the turn's outcome, release the session and wake anyone waiting on it."""
+        if self._finished:
+            return
+        self._finished = True
+        if self._heartbeat:
+            self._heartbeat.cancel()
+        now = datetime.utcnow()
+        if self.response is not None and self._committed:
+            hub.publish(f"turn:{self.session_id}", {"key": self.key, "status": "done"})
+            return
+        if self.response is not None:
+            status, extra = "done", {"response": self.response}
+        else:
+            counters["failed"] += 1
+            detail = getattr(error, "detail", None) or (f"{type(error).__name__}: {error}" if error else "no reply")
+            status, extra = "failed", {"error": str(detail)}
+        try:
+            await asyncio.gather(
+                self.db.turns.update_one({"_id": self.turn_id, "token": self.token}, {"$set": {
+                    "status": status, **extra, "finishedAt": now,
+                    "expireAt": now + timedelta(hours=settings.TURN_RETENTION_HOURS),
+                }}),
+                self.db.sessions.update_one({"_id": ObjectId(self.session_id), "turnLock.token": self.token},
+                                            {"$unset": {"turnLock": ""}}),
+            )
+        except Exception as e:
+            # The lease runs out on its own
+            print(f"⚠️ Could not release turn for session {self.session_id}: {e}")
+        hub.publish(f"turn:{self.session_id}", {"key": self.key, "status": status})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Shielded so a cancelled request still records the turn and frees the session
+        await asyncio.shield(self.finish(exc))
+        return False
+
+
+async def _acquire(db, session_id: str, lock: dict, update: dict, projection: dict) -> dict:
+    now = datetime.utcnow()
+    update = dict(update or {})
+    update["$set"] = {**update.get("$set", {}),
+                      "turnLock": {**lock, "until": now + timedelta(seconds=settings.TURN_LEASE_SECONDS)}}
+    return await db.sessions.find_one_and_update(
+        {"_id": ObjectId(session_id), "$or": [{"turnLock": None}, {"turnLock.until": {"$lt": now}}]},
+        update,
+        projection=projection or {"_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _record(db, turn: Turn, digest: str, now: datetime) -> dict:
+    """
+    Insert the turn, or take over a failed / abandoned one with the same key.
+
+    Returns:
+        None when this request owns the turn, otherwise the earlier turn (status, fingerprint, response)
+    """
+    doc = {
+        "sessionId": turn.session_id,
+        "key": turn.key,
+        "fingerprint": digest,
+        "token": turn.token,
+        "status": "running",
+        "owner": hub.worker_id,
+        # Long enough to wait for the session; the heartbeat shortens it once the turn runs
+        "leaseUntil": now + timedelta(seconds=settings.TURN_WAIT_SECONDS + settings.TURN_LEASE_SECONDS),
+        "createdAt": now,
+    }
+    try:
+        await db.turns.insert_one({"_id": turn.turn_id, **doc})
+        return None
+    except DuplicateKeyError:
+        pass
+    previous = await db.turns.find_one_and_update(
+        {"_id": turn.turn_id, "$or": [{"status": "failed"},
+                                      {"status": "running", "leaseUntil": {"$lt": now}}]},
+        {"$set": {**doc, "error": None}},
+        projection={"status": 1},
+    )
+    if previous is not None:
+        counters["recovered"] += 1
+        return None
+    return await db.turns.find_one({"_id": turn.turn_id}, {"status": 1, "fingerprint": 1, "response": 1})
+
+
+async def _wait_for(db, session_id: str, key: str, changes, deadline: float) -> dict:
+    """Wait for another request's turn with this key to finish and return its response."""
+    loop = asyncio.get_running_loop()
+    while True:
+        doc = await db.turns.find_one({"_id": f"{session_id}:{key}"},
+                                      {"status": 1, "response": 1, "error": 1, "leaseUntil": 1})
+        if doc and doc["status"] == "done":
+            return doc["response"]
+        if doc and doc["status"] == "failed":
+            _conflict(f"The original request for this message failed ({doc.get('error')}), please send it again", 1)
+        if doc and doc["leaseUntil"] < datetime.utcnow():
+            _conflict("The original request for this message was interrupted, please send it again", 1)
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            _conflict("This message is still being answered", settings.TURN_LEASE_SECONDS)
+        try:
+            await asyncio.wait_for(changes.get(), min(remaining, POLL_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+
+
+def _replay(turn: Turn, finished: dict, digest: str) -> Turn:
+    if finished.get("fingerprint") != digest:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different message")
+    counters["replayed"] += 1
+    turn.replay = finished["response"]
+    return turn
+
+
+async def begin_turn(db, session_id: str, idempotency_key: str, sender: str, text: str, update: dict = None,
+                     projection: dict = None, admit=None) -> Turn:
+    """
+    Take the session for a new turn, or resolve this send against an earlier one.
+
+    Args:
+        update: Session update applied in the same write that takes the lock
+        projection: Session fields to return (as `turn.session`)
+        admit: Called before each attempt to take the lock — raise to turn the send away
+
+    Returns:
+        Turn — `replay` holds the response when the send was a duplicate
+    """
+    key = idempotency_key or str(ObjectId())
+    digest = fingerprint(sender, text)
+    turn = Turn(db, session_id, key, token=uuid.uuid4().hex)
+    lock = {"token": turn.token, "key": key, "fingerprint": digest, "owner": hub.worker_id}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.TURN_WAIT_SECONDS
+
+    # Subscribe before looking so a turn finishing in between isn't missed
+    with hub.subscribe(f"turn:{session_id}") as changes:
+        earlier = await _record(db, turn, digest, datetime.utcnow())
+        if earlier is not None:
+            if earlier["status"] == "done":
+                return _replay(turn, earlier, digest)
+            if earlier.get("fingerprint") != digest:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different message")
+            counters["attached"] += 1
+            turn.replay = await _wait_for(db, session_id, key, changes, deadline)
+            return turn
+
+        try:
+            waited = False
+            while True:
+                if admit:
+                    admit()
+                turn.session = await _acquire(db, session_id, lock, update, projection)
+                if turn.session is not None:
+                    break
+                holder = await db.sessions.find_one({"_id": ObjectId(session_id)}, {"turnLock": 1})
+                if not holder:
+                    raise HTTPException(status_code=404, detail="Session not found")
+                holder = holder.get("turnLock")
+                if holder and not idempotency_key and holder["fingerprint"] == digest:
+                    # The same message re-sent without a key while it is being answered
+                    await db.turns.delete_one({"_id": turn.turn_id, "token": turn.token})
+                    counters["attached"] += 1
+                    turn.replay = await _wait_for(db, session_id, holder["key"], changes, deadline)
+                    return turn
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    _conflict("Another message in this chat is still being answered", settings.TURN_LEASE_SECONDS)
+                waited = True
+                try:
+                    await asyncio.wait_for(changes.get(), min(remaining, POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            # Nothing ran: drop the record so the same key can be sent again
+            if turn.replay is None:
+                await asyncio.shield(db.turns.delete_one({"_id": turn.turn_id, "token": turn.token}))
+            raise
+        if waited:
+            counters["serialized"] += 1
+
+    counters["started"] += 1
+    turn._start()
+    return turn
+
+
+def turn_stats() -> dict:
+    return dict(counters)
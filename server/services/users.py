@@ -0,0 +1,115 @@
+"""
+Compact user records for hot paths.
+
+Chat turns only need the patient's first name and follow-up jobs only need the doctor's
+user id, so instead of a users.find_one per request this keeps a small per-process LRU of
+{id, firstName, lastName, role, doctorId}, bounded by USER_CACHE_MAX_ENTRIES and
+USER_CACHE_TTL_SECONDS. register/login/update_profile write through to it; the TTL bounds
+how long another worker can serve a name changed elsewhere.
+"""
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from bson.errors import InvalidId
+from config import settings
+
+PROFILE_PROJECTION = {"firstName": 1, "lastName": 1, "role": 1, "doctorId": 1}
+
+
+def compact_user(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "firstName": doc.get("firstName"),
+        "lastName": doc.get("lastName"),
+        "role": doc.get("role", "patient"),
+        "doctorId": doc.get("doctorId"),
+    }
+
+
+class UserCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._by_doctor = {}
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def get(self, user_id: str):
+        entry = self._entries.get(user_id)
+        if entry:
+            profile, expires = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.counters["hits"] += 1
+                return profile
+            self.forget(user_id)
+        self.counters["misses"] += 1
+        return None
+
+    def get_doctor(self, doctor_id: str):
+        user_id = self._by_doctor.get(doctor_id)
+        if user_id and user_id in self._entries:
+            return self.get(user_id)
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, doc: dict) -> dict:
+        profile = compact_user(doc)
+        self._entries[profile["id"]] = (profile, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(profile["id"])
+        if profile["doctorId"]:
+            self._by_doctor[profile["doctorId"]] = profile["id"]
+        self.counters["writes"] += 1
+        while len(self._entries) > self.max_entries:
+            oldest, _ = next(iter(self._entries.items()))
+            self.forget(oldest)
+            self.counters["evictions"] += 1
+        return profile
+
+    def forget(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry and entry[0]["doctorId"]:
+            self._by_doctor.pop(entry[0]["doctorId"], None)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "hitRate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+cache = UserCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
+
+
+def remember_user(doc: dict) -> dict:
+    """Write a freshly read or written user document through to the cache."""
+    return cache.put(doc)
+
+
+async def get_user_profile(db, user_id: str):
+    """Compact profile for a user id (None if unknown) — a memory read when cached."""
+    if not user_id:
+        return None
+    profile = cache.get(user_id)
+    if profile:
+        return profile
+    try:
+        doc = await db.users.find_one({"_id": ObjectId(user_id)}, PROFILE_PROJECTION)
+    except InvalidId:
+        return None
+    return cache.put(doc) if doc else None
+
+
+async def get_doctor_user(db, doctor_id: str):
+    """Compact profile of the user account linked to a doctor id."""
+    profile = cache.get_doctor(doctor_id)
+    if profile:
+        return profile
+    doc = await db.users.find_one({"doctorId": doctor_id}, PROFILE_PROJECTION)
+    return cache.put(doc) if doc else None
+
+
+def user_cache_stats() -> dict:
+    return cache.stats()
@@ -0,0 +1,54 @@
+"""
+Rolling-summary folds run as background LLM work, not on the chat session's own slots.
+
+Usage (from server/):
+    python -m pytest tests
+"""
+import asyncio
+
+from agents import llm
+from benchmarks.fakes import FakeChatModel, FakeDatabase
+from routes import chat
+from services.llm_scheduler import BACKGROUND_CALLER, llm_caller, scheduler
+
+
+class RecordingModel(FakeChatModel):
+    """Notes which callers hold scheduler slots while it is being called."""
+
+    def __init__(self):
+        super().__init__("Patient reports chest tightness.", first_token_latency=0.0, tokens_per_second=1e6)
+        self.pending = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.pending.append(dict(scheduler.pending))
+        return await super().ainvoke(messages, **kwargs)
+
+
+def test_fold_does_not_use_the_callers_slot():
+    model = RecordingModel()
+    llm.init_llm_registry(lambda **kwargs: model)
+    db = FakeDatabase()
+    context = {
+        "summary": None,
+        "fold": [{"sender": "user", "text": "My chest feels tight.", "seq": 1}],
+        "foldUpto": 1,
+        "foldTokens": 5,
+    }
+
+    async def turn() -> str:
+        inserted = await db.sessions.insert_one({"contextSummary": None})
+        session_id = str(inserted.inserted_id)
+        # As the chat routes do for the turn that schedules the fold
+        llm_caller.set(session_id)
+        chat.schedule_context_fold(db, session_id, None, context)
+        await asyncio.gather(*chat._background_tasks)
+        assert llm_caller.get() == session_id
+        return session_id
+
+    try:
+        session_id = asyncio.run(turn())
+    finally:
+        llm.registry = None
+
+    assert model.pending == [{BACKGROUND_CALLER: 1}]
+    assert session_id not in scheduler.pending
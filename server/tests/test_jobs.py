@@ -0,0 +1,129 @@
+"""
+Durable jobs: dedupe keys, retries with backoff, dead-lettering, lease recovery and delays.
+
+Workers are driven by hand (claim, then run_one) so every step is deterministic.
+
+Usage (from server/):
+    python -m pytest tests
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.fakes import FakeDatabase
+from config import settings
+from services import jobs
+
+
+@pytest.fixture
+def db():
+    db = FakeDatabase()
+    asyncio.run(db.jobs.create_index("dedupeKey", unique=True))
+    return db
+
+
+def worker(db, worker_id: str = "worker-a") -> jobs.JobQueue:
+    queue = jobs.JobQueue(lambda: db, concurrency=1, lease_seconds=60)
+    queue.worker_id = worker_id
+    return queue
+
+
+async def make_due(db, job_id):
+    await db.jobs.update_one({"_id": job_id}, {"$set": {"runAt": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_duplicate_dedupe_key_is_a_no_op(db):
+    async def run():
+        first = await jobs.enqueue(db, "test.noop", {"n": 1}, dedupe_key="test:1")
+        second = await jobs.enqueue(db, "test.noop", {"n": 2}, dedupe_key="test:1")
+        return first, second, await db.jobs.find({}).to_list(None)
+
+    first, second, queued = asyncio.run(run())
+    assert first is not None
+    assert second is None
+    assert [job["payload"] for job in queued] == [{"n": 1}]
+
+
+def test_failed_job_is_retried_with_backoff_then_dead_lettered(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BASE_SECONDS", 10.0)
+    calls = []
+
+    async def flaky(db, payload):
+        calls.append(payload)
+        raise ValueError("provider down")
+
+    monkeypatch.setitem(jobs.handlers, "test.flaky", flaky)
+    queue = worker(db)
+
+    async def run():
+        job_id = await jobs.enqueue(db, "test.flaky", {}, max_attempts=2)
+        await queue.run_one(await queue.claim())
+        retried = await db.jobs.find_one({"_id": job_id})
+        # Not due again until the backoff has passed
+        early = await queue.claim()
+        await make_due(db, job_id)
+        await queue.run_one(await queue.claim())
+        return retried, early, await db.jobs.find_one({"_id": job_id})
+
+    started = datetime.utcnow()
+    retried, early, failed = asyncio.run(run())
+    assert retried["status"] == "queued"
+    assert retried["lastError"] == "ValueError: provider down"
+    assert timedelta(seconds=8) <= retried["runAt"] - started <= timedelta(seconds=13)
+    assert early is None
+    assert len(calls) == 2
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 2
+    assert queue.counters["retried"] == 1
+    assert queue.counters["failed"] == 1
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(db, monkeypatch):
+    done = []
+
+    async def record(db, payload):
+        done.append(payload)
+
+    monkeypatch.setitem(jobs.handlers, "test.record", record)
+    first, second = worker(db, "worker-a"), worker(db, "worker-b")
+
+    async def run():
+        job_id = await jobs.enqueue(db, "test.record", {"n": 1})
+        stalled = await first.claim()
+        # Still leased: nobody else may take it
+        assert await second.claim() is None
+        await db.jobs.update_one({"_id": job_id},
+                                 {"$set": {"lockedUntil": datetime.utcnow() - timedelta(seconds=1)}})
+        reclaimed = await second.claim()
+        await second.run_one(reclaimed)
+        # The first worker finishing late cannot overwrite the job it lost
+        await first.run_one(stalled)
+        return reclaimed, await db.jobs.find_one({"_id": job_id})
+
+    reclaimed, job = asyncio.run(run())
+    assert reclaimed["lockedBy"] == "worker-b"
+    assert reclaimed["attempts"] == 2
+    assert second.counters["recovered"] == 1
+    assert job["status"] == "done"
+    assert job["lockedBy"] == "worker-b"
+    # At-least-once: both runs happened, which is why handlers must be idempotent
+    assert done == [{"n": 1}, {"n": 1}]
+
+
+def test_delay_is_honoured(db, monkeypatch):
+    monkeypatch.setitem(jobs.handlers, "test.later", lambda db, payload: asyncio.sleep(0))
+    queue = worker(db)
+
+    async def run():
+        job_id = await jobs.enqueue(db, "test.later", {}, delay=60)
+        queued = await db.jobs.find_one({"_id": job_id})
+        early = await queue.claim()
+        await make_due(db, job_id)
+        return queued, early, await queue.claim()
+
+    started = datetime.utcnow()
+    queued, early, due = asyncio.run(run())
+    assert timedelta(seconds=59) <= queued["runAt"] - started <= timedelta(seconds=61)
+    assert early is None
+    assert due is not None
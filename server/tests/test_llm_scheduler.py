@@ -0,0 +1,113 @@
+"""
+LLM admission control: per-caller limits, round-robin between callers, and load shedding.
+
+Usage (from server/):
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services.llm_scheduler import BACKGROUND_CALLER, LLMScheduler
+
+MODEL = "fake-model"
+
+
+async def hold(scheduler: LLMScheduler, caller: str, release: asyncio.Event, order: list = None):
+    async with scheduler.slot(MODEL, caller):
+        if order is not None:
+            order.append(caller)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_one_caller_cannot_take_every_slot():
+    scheduler = LLMScheduler(default_limit=4, max_per_caller=2)
+
+    async def run():
+        release = asyncio.Event()
+        busy = [asyncio.create_task(hold(scheduler, "chat-a", release)) for _ in range(2)]
+        await settle()
+        with pytest.raises(HTTPException) as raised:
+            async with scheduler.slot(MODEL, "chat-a"):
+                pass
+        # Another chat still gets a slot straight away
+        other = asyncio.create_task(hold(scheduler, "chat-b", release))
+        await settle()
+        active = scheduler.lane(MODEL).active
+        release.set()
+        await asyncio.gather(*busy, other)
+        return raised.value, active
+
+    rejected, active = asyncio.run(run())
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert active == 3
+
+
+def test_waiting_callers_are_served_round_robin():
+    scheduler = LLMScheduler(default_limit=1)
+
+    async def run():
+        release, order = asyncio.Event(), []
+        first = asyncio.create_task(hold(scheduler, "chat-a", release))
+        await settle()
+        # Background work queues three calls before the chat's one arrives
+        queued = [asyncio.create_task(hold(scheduler, BACKGROUND_CALLER, release, order)) for _ in range(3)]
+        await settle()
+        queued.append(asyncio.create_task(hold(scheduler, "chat-b", release, order)))
+        await settle()
+        release.set()
+        await asyncio.gather(first, *queued)
+        return order
+
+    assert asyncio.run(run()) == [BACKGROUND_CALLER, "chat-b", BACKGROUND_CALLER, BACKGROUND_CALLER]
+
+
+def test_full_queue_is_shed_with_retry_after():
+    scheduler = LLMScheduler(default_limit=1, max_queue=1)
+
+    async def run():
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, "chat-a", release))
+        waiting = asyncio.create_task(hold(scheduler, "chat-b", release))
+        await settle()
+        with pytest.raises(HTTPException) as raised:
+            async with scheduler.slot(MODEL, "chat-c"):
+                pass
+        release.set()
+        await asyncio.gather(running, waiting)
+        return raised.value
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 503
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert scheduler.lane(MODEL).counters["rejected"] == 1
+
+
+def test_call_that_waits_too_long_gets_503():
+    scheduler = LLMScheduler(default_limit=1, max_wait=0.05)
+
+    async def run():
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, "chat-a", release))
+        await settle()
+        with pytest.raises(HTTPException) as raised:
+            async with scheduler.slot(MODEL, "chat-b"):
+                pass
+        release.set()
+        await running
+        return raised.value
+
+    rejected = asyncio.run(run())
+    lane = scheduler.lane(MODEL)
+    assert rejected.status_code == 503
+    assert "Retry-After" in rejected.headers
+    assert lane.counters["timedOut"] == 1
+    assert (lane.active, lane.queued) == (0, 0)
+    assert scheduler.pending == {}
@@ -0,0 +1,116 @@
+"""
+Single-flight chat turns: duplicates share one LLM call, other sends wait or get 409, and a
+lapsed lease can be taken over.
+
+Usage (from server/):
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from agents import llm
+from benchmarks.fakes import FakeChatModel, FakeDatabase
+from config import settings
+from database import connection
+from models.session import MessageCreate
+from routes import chat
+from services import turns
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(connection, "db", db)
+    monkeypatch.setattr(settings, "LLM_CACHE_AGENTS", "")
+    yield db
+    llm.registry = None
+
+
+@pytest.fixture
+def model():
+    model = FakeChatModel("When did the headache start?", first_token_latency=0.1, tokens_per_second=1000)
+    llm.init_llm_registry(lambda **kwargs: model)
+    return model
+
+
+async def new_session(db) -> str:
+    inserted = await db.sessions.insert_one({"type": "triage", "userId": "u", "status": "active",
+                                             "messageCount": 0, "contextSummary": None})
+    return str(inserted.inserted_id)
+
+
+def send(session_id: str, text: str, key: str = None):
+    return chat.send_message(session_id, MessageCreate(sender="user", text=text), key)
+
+
+def test_concurrent_sends_with_one_key_share_the_llm_call(db, model):
+    async def run():
+        session_id = await new_session(db)
+        return await asyncio.gather(send(session_id, "I have a headache", "k1"),
+                                    send(session_id, "I have a headache", "k1"))
+
+    first, second = asyncio.run(run())
+    assert model.calls == 1
+    assert first == second
+
+
+def test_replay_after_commit_returns_the_stored_response(db, model):
+    async def run():
+        session_id = await new_session(db)
+        first = await send(session_id, "I have a headache", "k1")
+        return first, await send(session_id, "I have a headache", "k1")
+
+    first, replayed = asyncio.run(run())
+    assert model.calls == 1
+    assert replayed == first
+
+
+def test_key_reused_for_another_message_is_rejected(db, model):
+    async def run():
+        session_id = await new_session(db)
+        await send(session_id, "I have a headache", "k1")
+        await send(session_id, "Something else", "k1")
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(run())
+    assert raised.value.status_code == 422
+
+
+def test_other_key_gets_409_while_the_lease_is_held(db, monkeypatch):
+    monkeypatch.setattr(settings, "TURN_WAIT_SECONDS", 0.2)
+
+    async def run():
+        session_id = await new_session(db)
+        held = await turns.begin_turn(db, session_id, "k1", "user", "I have a headache")
+        try:
+            await turns.begin_turn(db, session_id, "k2", "user", "Another question")
+        finally:
+            await held.finish()
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(run())
+    assert raised.value.status_code == 409
+    assert raised.value.headers["Retry-After"] == str(settings.TURN_LEASE_SECONDS)
+
+
+def test_lease_that_expires_mid_turn_is_taken_over(db, monkeypatch):
+    monkeypatch.setattr(settings, "TURN_LEASE_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "TURN_WAIT_SECONDS", 2.0)
+
+    async def run():
+        session_id = await new_session(db)
+        stuck = await turns.begin_turn(db, session_id, "k1", "user", "I have a headache")
+        # The worker running it stops renewing (it died or hung)
+        stuck._heartbeat.cancel()
+        taken = await turns.begin_turn(db, session_id, "k2", "user", "Are you there?")
+        # The old turn finishing late must not release the new holder's lock
+        await stuck.commit({"$set": {"status": "active"}}, {"late": True})
+        lock = (await db.sessions.find_one({}))["turnLock"]
+        await taken.finish()
+        return taken, lock
+
+    taken, lock = asyncio.run(run())
+    assert taken.replay is None
+    assert lock["token"] == taken.token